@@ -0,0 +1,72 @@
+"""
+MLAPS v2: Macro-Liquidity Aligned Property Score
+=================================================
+
+Importable scoring pipeline. Submodules (and pandas/NumPy/SciPy behind
+them) load on first attribute access, so `import mlaps` stays cheap for
+worker processes and the dashboard server.
+
+    import mlaps
+    transactions, stock = mlaps.load_data()
+    results = mlaps.run_pipeline(transactions, stock)
+    results['mlaps'].head()
+
+Command line: python -m mlaps --help
+"""
+
+import importlib
+
+# Public name -> submodule that defines it
+_EXPORTS = {
+    'load_data': 'pipeline',
+    'run_pipeline': 'pipeline',
+    'run_pipeline_streaming': 'pipeline',
+    'run_pipeline_update': 'pipeline',
+    'print_report': 'pipeline',
+    'read_transactions': 'loaders',
+    'read_gnaf': 'loaders',
+    'load_dwelling_stock': 'stock',
+    'build_stock_index': 'stock',
+    'StageCache': 'cache',
+    'TransactionStore': 'store',
+    'stream_components': 'streaming',
+    'QuantileSketch': 'sketches',
+    'sketch_benchmark': 'sketches',
+    'build_quarterly_panel': 'panel',
+    'pack_panel': 'panel',
+    'dwelling_stock': 'metrics',
+    'calculate_lml_v2': 'metrics',
+    'calculate_momentum_v2': 'metrics',
+    'calculate_drawdown_v2': 'metrics',
+    'get_macro_proxy': 'macro',
+    'synthetic_macro': 'macro',
+    'read_macro_file': 'macro',
+    'macro_quarterly': 'macro',
+    'MacroLibrary': 'macro',
+    'calculate_mla_v2': 'mla',
+    'calculate_mla_lead_sweep': 'mla',
+    'calculate_mla_multi': 'mla',
+    'combine_components': 'composite',
+    'cap_and_normalize': 'composite',
+    'score_mlaps': 'composite',
+    'calculate_mlaps_rolling': 'rolling',
+    'run_backtest': 'backtest',
+    'bootstrap_ranks': 'bootstrap',
+    'write_results': 'results',
+    'read_latest': 'results',
+    'read_results_history': 'results',
+    'ScoresAPI': 'api',
+    'build_bundle': 'bundle',
+}
+
+__all__ = sorted(_EXPORTS)
+
+def __getattr__(name):
+    if name in _EXPORTS:
+        value = getattr(importlib.import_module(f'.{_EXPORTS[name]}', __name__), name)
+        globals()[name] = value
+        return value
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+def __dir__():
+    return sorted(set(globals()) | set(__all__))
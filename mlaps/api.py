@@ -0,0 +1,588 @@
+"""
+MLAPS v2: Scores API
+- The latest scores are loaded into memory once (mlaps_results/latest.arrow, else
+  mlaps_scores_v2.csv) and reloaded only when that file changes
+- JSON responses: top N, one suburb, filtered, sorted, paginated rankings, and
+  pre-aggregated chart data (top-N bars, binned histogram and scatter grids)
+- /api/score: the composite recomputed from the raw components held in memory,
+  with custom weights, cap_z and a minimum sample size
+- Each response is cached per data version and query, with its ETag and a gzip copy,
+  so repeat requests cost a dictionary lookup (or a 304)
+- watch(): when a new run lands, subscribers get one small notice naming the
+  suburbs whose scores or ranks changed (sent as Server-Sent Events by
+  run_dashboard.py); clients refetch only the views it touches
+"""
+
+import gzip
+import hashlib
+import json
+import math
+import queue
+import threading
+import time
+from collections import OrderedDict, namedtuple
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from .composite import WEIGHTS, WEIGHTS_NO_MLA, component_scores_batch, describe_weights
+from .results import CSV_FILENAME, LATEST_FILENAME, RESULTS_DIRNAME, read_latest
+
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 500
+GZIP_MIN_BYTES = 1024
+SCATTER_MAX_POINTS = 200
+RESPONSE_CACHE_SIZE = 512
+RESCORE_CACHE_SIZE = 64
+WATCH_INTERVAL_SECONDS = 1.0
+
+# Compared between snapshots to find the rows a new run changed
+DIFF_COLUMNS = ['LML', 'MOM', 'DDR', 'MLA', 'LML_score', 'MOM_score', 'DDR_score', 'MLA_score', 'MLAPS', 'rank']
+
+# Above this many changed suburbs (e.g. a full rerun, where normalisation moves
+# almost every score) the notice sends only the count
+DIFF_MAX_SUBURBS = 500
+
+Response = namedtuple('Response', ['status', 'body', 'gzip_body', 'etag'])
+
+class APIError(Exception):
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+
+def _finite(value):
+    """NaN and ±inf -> None, through nested dicts and lists (JSON has no non-finite numbers)"""
+    if isinstance(value, float):
+        return value if math.isfinite(value) else None
+    if isinstance(value, dict):
+        return {key: _finite(item) for key, item in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [_finite(item) for item in value]
+    return value
+
+def _json_bytes(payload):
+    try:
+        return json.dumps(payload, separators=(',', ':'), allow_nan=False).encode()
+    except ValueError:
+        # A non-finite value got past the cleaning (e.g. inf from a zero denominator)
+        return json.dumps(_finite(payload), separators=(',', ':'), allow_nan=False).encode()
+
+def _records(df):
+    """Rows as JSON-ready dicts (to_dict gives Python scalars; NaN -> null)"""
+    return [{key: None if isinstance(value, float) and math.isnan(value) else value for key, value in row.items()}
+            for row in df.to_dict('records')]
+
+def _nullable(values):
+    """Floats as a list, NaN -> None"""
+    return [None if np.isnan(v) else float(v) for v in np.asarray(values, dtype=float).ravel()]
+
+def _column_kind(series):
+    """'flag', 'number' or 'text' (booleans with nulls load as object columns)"""
+    values = series.dropna()
+    if pd.api.types.is_bool_dtype(series) or (len(values) > 0 and values.map(type).eq(bool).all()):
+        return 'flag'
+    if pd.api.types.is_numeric_dtype(series):
+        return 'number'
+    return 'text'
+
+def _histogram(values, bins):
+    values = values.to_numpy(dtype=float)
+    values = values[np.isfinite(values)]
+    if len(values) == 0:
+        return {'edges': [], 'counts': []}
+    counts, edges = np.histogram(values, bins=bins)
+    return {'edges': edges.tolist(), 'counts': counts.tolist()}
+
+def _bounds(values):
+    # 1st-99th percentile, so a few outliers do not squash the grid
+    low, high = np.percentile(values, [1, 99])
+    return (low - 0.5, high + 0.5) if low == high else (low, high)
+
+def _scatter(df, x, y, bins):
+    """Points for small sets; above SCATTER_MAX_POINTS, counts and mean MLAPS per grid cell"""
+    data = df[['suburb', x, y, 'MLAPS']].dropna(subset=[x, y])
+    if len(data) <= SCATTER_MAX_POINTS:
+        return {'x': x, 'y': y, 'points': {
+            'suburb': data['suburb'].astype(str).tolist(),
+            'x': _nullable(data[x]), 'y': _nullable(data[y]), 'MLAPS': _nullable(data['MLAPS'])}}
+    
+    x_values, y_values = data[x].to_numpy(dtype=float), data[y].to_numpy(dtype=float)
+    x_range, y_range = _bounds(x_values), _bounds(y_values)
+    grid_args = dict(x=np.clip(x_values, *x_range), y=np.clip(y_values, *y_range), bins=bins,
+                     range=[x_range, y_range])
+    counts, x_edges, y_edges = np.histogram2d(**grid_args)
+    totals, _, _ = np.histogram2d(**grid_args, weights=data['MLAPS'].fillna(0).to_numpy(dtype=float))
+    with np.errstate(invalid='ignore', divide='ignore'):
+        mean = np.where(counts > 0, totals / counts, np.nan)
+    
+    # Row-major by y, as Plotly heatmaps expect
+    return {'x': x, 'y': y, 'grid': {
+        'x_edges': x_edges.tolist(), 'y_edges': y_edges.tolist(),
+        'counts': counts.T.astype(int).tolist(),
+        'mean_MLAPS': [_nullable(row) for row in mean.T]}}
+
+def _int_param(query, name, default, low, high):
+    try:
+        value = int(query.pop(name, default))
+    except ValueError:
+        raise APIError(400, f"{name} must be an integer")
+    if not low <= value <= high:
+        raise APIError(400, f"{name} must be between {low} and {high}")
+    return value
+
+def _float_param(query, name, default, low, high):
+    try:
+        value = float(query.pop(name, default))
+    except ValueError:
+        raise APIError(400, f"{name} must be a number")
+    if not low <= value <= high:
+        raise APIError(400, f"{name} must be between {low} and {high}")
+    return value
+
+def _weight_params(query):
+    """
+    Component weights from w_MLA, w_LML, w_MOM, w_DDR (unspecified ones keep
+    their default), rescaled to sum to 1; None when none is given
+    """
+    given = {name: _float_param(query, f'w_{name}', weight, 0, 1e6)
+             for name, weight in WEIGHTS.items() if f'w_{name}' in query}
+    if not given:
+        return None
+    weights = {name: given.get(name, weight) for name, weight in WEIGHTS.items()}
+    total = sum(weights.values())
+    if total == 0:
+        raise APIError(400, "at least one weight must be positive")
+    return {name: weight / total for name, weight in weights.items()}
+
+def _components(df):
+    """Raw component arrays (1 × suburbs, as cap_and_normalize_batch takes them) for rescoring"""
+    components = {name: df[name].to_numpy(dtype=float)[None, :] for name in WEIGHTS}
+    components['MLA_significant'] = df['MLA_significant'].fillna(False).to_numpy(dtype=bool)[None, :]
+    components['sales_12m'] = df['sales_12m'].to_numpy(dtype=float)
+    return components
+
+def etag_matches(if_none_match, etag):
+    """
+    Whether an If-None-Match header matches an ETag
+    - Comma-separated entity tags, compared exactly after dropping any W/
+      prefix (weak comparison, as RFC 9110 asks for If-None-Match); * matches any
+    """
+    if etag is None or not if_none_match:
+        return False
+    def opaque(tag):
+        return tag[2:] if tag.startswith('W/') else tag
+    
+    tags = [tag.strip() for tag in if_none_match.split(',')]
+    return '*' in tags or any(opaque(tag) == opaque(etag) for tag in tags)
+
+def sse_message(event, payload, event_id=None):
+    """One Server-Sent Events message"""
+    lines = [f'event: {event}']
+    if event_id is not None:
+        lines.append(f'id: {event_id}')
+    lines.append(f'data: {json.dumps(payload, separators=(",", ":"), allow_nan=False)}')
+    return ('\n'.join(lines) + '\n\n').encode()
+
+def snapshot_diff(previous, current, max_suburbs=DIFF_MAX_SUBURBS):
+    """
+    Notice of what changed between two snapshots: names only, no rows
+    - changed: suburbs whose scores or ranks differ (NaN equals NaN) or that
+      appeared; None when there are more than max_suburbs of them
+    - changed_count / removed: how many changed, and the suburbs that disappeared
+    """
+    before = previous['df'].assign(suburb=previous['df']['suburb'].astype(str)).set_index('suburb')
+    after = current['df'].assign(suburb=current['df']['suburb'].astype(str)).set_index('suburb')
+    common = after.index.intersection(before.index)
+    
+    differs = pd.Series(False, index=common)
+    for column in DIFF_COLUMNS:
+        if column in before.columns and column in after.columns:
+            old, new = before.loc[common, column], after.loc[common, column]
+            differs |= ~((old == new) | (old.isna() & new.isna()))
+    changed = after.index[after.index.isin(differs.index[differs]) | ~after.index.isin(before.index)]
+    removed = before.index.difference(after.index)
+    
+    return {
+        'version': current['version'],
+        'previous_version': previous['version'],
+        'run_date': current['meta'].get('run_date'),
+        'weighting': current['meta'].get('weighting'),
+        'suburbs': len(after),
+        'changed_count': len(changed),
+        'changed': list(changed) if len(changed) <= max_suburbs else None,
+        'removed': sorted(removed) if len(removed) <= max_suburbs else None,
+        'removed_count': len(removed),
+    }
+
+class ScoresAPI:
+    """
+    Read-only JSON API over the latest MLAPS scores
+    - get(path, query) -> Response; query as from urllib.parse.parse_qs
+    - Safe to share between request threads: the scores frame is replaced, never
+      modified, and the response cache is guarded by a lock
+    """
+    
+    def __init__(self, results_dir, cache_size=RESPONSE_CACHE_SIZE):
+        self.results_dir = Path(results_dir)
+        self.cache_size = cache_size
+        self._lock = threading.Lock()
+        self._snapshot = None
+        self._responses = OrderedDict()
+        self._published = None
+        self._subscribers = set()
+    
+    def _source(self):
+        latest = self.results_dir / RESULTS_DIRNAME / LATEST_FILENAME
+        path = latest if latest.exists() else self.results_dir / CSV_FILENAME
+        try:
+            stat = path.stat()
+        except OSError:
+            raise APIError(503, f"no scores yet: run the analysis to create {CSV_FILENAME}")
+        return path, f'{stat.st_mtime_ns:x}-{stat.st_size:x}'
+    
+    def _load(self, path, version):
+        if path.suffix == '.arrow':
+            df = read_latest(self.results_dir)
+            meta = dict(df.attrs)
+        else:
+            df = pd.read_csv(path)
+            meta = {'run_date': None, 'weighting': None}
+        df = df.sort_values('rank', kind='stable').reset_index(drop=True)
+        df.attrs = {}
+        
+        kinds = {column: _column_kind(df[column]) for column in df.columns}
+        states = sorted(df['state'].dropna().astype(str).unique()) if 'state' in df.columns else []
+        meta.update({'source': path.name, 'version': version, 'suburbs': len(df),
+                     'columns': {c: str(t) for c, t in df.dtypes.items()}, 'states': states})
+        return {'version': version, 'df': df, 'meta': meta, 'kinds': kinds,
+                'components': _components(df), 'score_matrices': {}, 'rescored': OrderedDict(),
+                'by_name': dict(zip(df['suburb'].astype(str).str.upper(), df.index))}
+    
+    def snapshot(self):
+        """Current scores, reloaded if the results file changed since the last request"""
+        path, version = self._source()
+        snapshot = self._snapshot
+        if snapshot is not None and snapshot['version'] == version:
+            return snapshot
+        with self._lock:
+            if self._snapshot is None or self._snapshot['version'] != version:
+                self._snapshot = self._load(path, version)
+                self._responses.clear()
+            return self._snapshot
+    
+    def subscribe(self):
+        """Queue that receives every snapshot event from now on"""
+        subscription = queue.Queue()
+        with self._lock:
+            self._subscribers.add(subscription)
+        return subscription
+    
+    def unsubscribe(self, subscription):
+        with self._lock:
+            self._subscribers.discard(subscription)
+    
+    @property
+    def version(self):
+        snapshot = self._snapshot
+        return None if snapshot is None else snapshot['version']
+    
+    @property
+    def version_published(self):
+        return None if self._published is None else self._published['version']
+    
+    def poll(self):
+        """
+        Reload if the results file changed and publish the difference to the
+        last published snapshot; returns the event, or None
+        """
+        try:
+            current = self.snapshot()
+        except APIError:
+            return None
+        previous, self._published = self._published, current
+        if previous is None or previous is current:
+            return None
+        
+        event = snapshot_diff(previous, current)
+        with self._lock:
+            subscribers = list(self._subscribers)
+        for subscription in subscribers:
+            subscription.put(event)
+        return event
+    
+    def watch(self, interval=WATCH_INTERVAL_SECONDS, stop=None):
+        """
+        Poll the results file every interval seconds until stop (a threading.Event) is set
+        - A change is picked up once the file has stopped changing for one
+          interval, so a CSV still being written is not read half-way
+        """
+        stop = stop or threading.Event()
+        self.poll()
+        seen = None
+        while not stop.wait(interval):
+            try:
+                _, version = self._source()
+            except APIError:
+                continue
+            if version == seen and version != self.version_published:
+                self.poll()
+            seen = version
+    
+    def get(self, path, query=None):
+        """Response for a decoded /api/... path (errors become 4xx/5xx responses)"""
+        try:
+            snapshot = self.snapshot()
+            query = {name: values[-1] for name, values in (query or {}).items()}
+            key = (snapshot['version'], path, tuple(sorted(query.items())))
+            
+            with self._lock:
+                response = self._responses.get(key)
+                if response is not None:
+                    self._responses.move_to_end(key)
+                    return response
+            
+            response = self._respond(200, self._route(snapshot, path, dict(query)), key)
+            with self._lock:
+                self._responses[key] = response
+                while len(self._responses) > self.cache_size:
+                    self._responses.popitem(last=False)
+            return response
+        except APIError as e:
+            return self._respond(e.status, {'error': str(e)})
+    
+    @staticmethod
+    def _respond(status, payload, key=None):
+        body = _json_bytes(payload)
+        gzip_body = gzip.compress(body, compresslevel=6, mtime=0) if len(body) >= GZIP_MIN_BYTES else None
+        etag = None if key is None else '"' + hashlib.sha1(repr(key).encode()).hexdigest()[:20] + '"'
+        return Response(status, body, gzip_body, etag)
+    
+    def _route(self, snapshot, path, query):
+        parts = [part for part in path.split('/') if part][1:]
+        if parts == ['meta']:
+            return self._meta(snapshot, query)
+        if parts == ['top']:
+            return self._top(snapshot, query)
+        if parts == ['scores']:
+            return self._scores(snapshot, query)
+        if parts == ['charts']:
+            return self._charts(snapshot, query)
+        if parts == ['score']:
+            return self._score(snapshot, query)
+        if len(parts) == 2 and parts[0] == 'suburb':
+            return self._suburb(snapshot, parts[1])
+        raise APIError(404, f"unknown endpoint {path}")
+    
+    @staticmethod
+    def _unused(query):
+        if query:
+            raise APIError(400, f"unknown parameter(s): {', '.join(sorted(query))}")
+    
+    def _meta(self, snapshot, query):
+        self._unused(query)
+        return snapshot['meta']
+    
+    def _top(self, snapshot, query):
+        n = _int_param(query, 'n', 10, 1, MAX_PAGE_SIZE)
+        self._unused(query)
+        return {'rows': _records(snapshot['df'].head(n))}
+    
+    def _suburb(self, snapshot, name):
+        row = snapshot['by_name'].get(name.upper())
+        if row is None:
+            raise APIError(404, f"no scores for suburb {name!r}")
+        return _records(snapshot['df'].loc[[row]])[0]
+    
+    def _filtered(self, snapshot, query, df=None):
+        """
+        Suburbs matching the filter parameters (consumed from query)
+        - q: case-insensitive suburb substring
+        - min_<col> / max_<col>: bounds on a numeric column, e.g. a price band
+          via min_latest_price and max_latest_price
+        - <flag>=true|false for boolean columns; <col>=value (case-insensitive)
+          for text columns, e.g. state=NSW
+        """
+        df = snapshot['df'] if df is None else df
+        kinds = {column: snapshot['kinds'].get(column) or _column_kind(df[column]) for column in df.columns}
+        mask = pd.Series(True, index=df.index)
+        text = query.pop('q', None)
+        if text:
+            mask &= df['suburb'].astype(str).str.contains(text, case=False, regex=False)
+        for name, value in list(query.items()):
+            bound, _, column = name.partition('_')
+            if bound in ('min', 'max') and kinds.get(column) == 'number':
+                try:
+                    value = float(value)
+                except ValueError:
+                    raise APIError(400, f"{name} must be a number")
+                mask &= df[column] >= value if bound == 'min' else df[column] <= value
+            elif kinds.get(name) == 'flag':
+                if value not in ('true', 'false'):
+                    raise APIError(400, f"{name} must be true or false")
+                mask &= df[name] == (value == 'true')
+            elif kinds.get(name) == 'text' and name != 'suburb':
+                mask &= df[name].astype(str).str.upper() == value.upper()
+            else:
+                continue
+            del query[name]
+        return df[mask]
+    
+    def _scores(self, snapshot, query):
+        """
+        Filtered, sorted, paginated rankings
+        - page (1-based), page_size (max MAX_PAGE_SIZE), sort (any column,
+          default rank), order (asc / desc)
+        - Filters as in _filtered
+        - fields: comma-separated columns to return (default all)
+        """
+        return self._page(snapshot, snapshot['df'], query)
+    
+    def _page(self, snapshot, df, query):
+        page = _int_param(query, 'page', 1, 1, 10 ** 9)
+        page_size = _int_param(query, 'page_size', DEFAULT_PAGE_SIZE, 1, MAX_PAGE_SIZE)
+        sort = query.pop('sort', 'rank')
+        order = query.pop('order', 'asc')
+        if sort not in df.columns:
+            raise APIError(400, f"cannot sort by unknown column {sort!r}")
+        if order not in ('asc', 'desc'):
+            raise APIError(400, "order must be asc or desc")
+        fields = query.pop('fields', None)
+        fields = list(df.columns) if fields is None else fields.split(',')
+        unknown = [field for field in fields if field not in df.columns]
+        if unknown:
+            raise APIError(400, f"unknown field(s): {', '.join(unknown)}")
+        
+        matched = self._filtered(snapshot, query, df)
+        self._unused(query)
+        if sort != 'rank' or order != 'asc':
+            matched = matched.sort_values([sort, 'rank'], ascending=[order == 'asc', True],
+                                          kind='stable', na_position='last')
+        total = len(matched)
+        first = (page - 1) * page_size
+        return {
+            'total': total,
+            'page': page,
+            'page_size': page_size,
+            'pages': -(-total // page_size),
+            'rows': _records(matched.iloc[first:first + page_size][fields])
+        }
+    
+    def _charts(self, snapshot, query):
+        """
+        Pre-aggregated chart data for the filtered suburbs (filters as in _filtered)
+        - summary: suburb count, best suburb, mean LML and MOM
+        - top: the best `top` suburbs (default 15) with their component scores
+        - histogram: MLAPS counts in `bins` equal-width bins (default 20)
+        - scatter: LML vs MOM and DDR vs latest_price, as points up to
+          SCATTER_MAX_POINTS suburbs and as a bins × bins grid above that
+        - Size depends on top and bins only, not on the number of suburbs
+        """
+        top = _int_param(query, 'top', 15, 1, 50)
+        bins = _int_param(query, 'bins', 20, 2, 100)
+        matched = self._filtered(snapshot, query)
+        self._unused(query)
+        
+        best = matched.head(1)
+        top_columns = [c for c in ['suburb', 'rank', 'MLAPS', 'MLA_score', 'LML_score', 'MOM_score', 'DDR_score']
+                       if c in matched.columns]
+        return {
+            'summary': {
+                'suburbs': len(matched),
+                'top_suburb': best['suburb'].iloc[0] if len(best) else None,
+                'top_MLAPS': _nullable(best['MLAPS'].to_numpy(dtype=float))[0] if len(best) else None,
+                'mean_LML': _nullable([matched['LML'].mean()])[0],
+                'mean_MOM': _nullable([matched['MOM'].mean()])[0],
+            },
+            'top': _records(matched.head(top)[top_columns]),
+            'histogram': _histogram(matched['MLAPS'], bins),
+            'scatter': {
+                'LML_MOM': _scatter(matched, 'LML', 'MOM', bins),
+                'DDR_price': _scatter(matched, 'DDR', 'latest_price', bins),
+            }
+        }
+    
+    def _score_matrix(self, snapshot, cap_z, min_sales):
+        """
+        Component scores (WEIGHTS order × suburbs) for one cap_z and sample threshold
+        - Suburbs with fewer than min_sales sales in the last 12 months are left out
+          of the cross-section, so they do not shift anyone else's scores
+        """
+        key = (cap_z, min_sales)
+        cached = snapshot['score_matrices'].get(key)
+        if cached is None:
+            components = snapshot['components']
+            included = components['sales_12m'][None, :] >= min_sales
+            scores = component_scores_batch(components, components['MLA_significant'], included, cap_z=cap_z)
+            has_mla = bool((included & ~np.isnan(components['MLA'])).any())
+            cached = (np.vstack([scores[name] for name in WEIGHTS]), included[0], has_mla)
+            snapshot['score_matrices'][key] = cached
+        return cached
+    
+    def _rescored(self, snapshot, weights, cap_z, min_sales):
+        """Ranked frame for one weight vector, memoised per (weights, cap_z, min_sales)"""
+        key = (None if weights is None else tuple(round(w, 12) for w in weights.values()), cap_z, min_sales)
+        with self._lock:
+            cached = snapshot['rescored'].get(key)
+            if cached is not None:
+                snapshot['rescored'].move_to_end(key)
+                return cached
+        
+        matrix, included, has_mla = self._score_matrix(snapshot, cap_z, min_sales)
+        if has_mla:
+            weights = weights or WEIGHTS
+            weighting = describe_weights(weights)
+        else:
+            # Same fallback as score_mlaps; custom weights are rescaled without MLA
+            if weights is None:
+                weights = WEIGHTS_NO_MLA
+            else:
+                total = sum(w for name, w in weights.items() if name != 'MLA')
+                if total == 0:
+                    raise APIError(400, "no suburb has an MLA, so LML, MOM or DDR needs a positive weight")
+                weights = {name: w / total for name, w in weights.items() if name != 'MLA'}
+            weighting = describe_weights(weights) + " (no MLA)"
+        
+        # The composite: one weight vector times the preloaded score matrix
+        vector = np.array([weights.get(name, 0.0) for name in WEIGHTS])
+        mlaps = vector @ matrix[:, included]
+        
+        frame = snapshot['df'][included].copy()
+        for row, name in enumerate(WEIGHTS):
+            frame[f'{name}_score'] = matrix[row, included]
+        frame['MLAPS'] = mlaps
+        frame['previous_rank'] = frame['rank']
+        frame = frame.sort_values(['MLAPS', 'previous_rank'], ascending=[False, True], kind='stable')
+        frame['rank'] = np.arange(1, len(frame) + 1)
+        frame['rank_change'] = frame['previous_rank'] - frame['rank']
+        frame = frame.reset_index(drop=True)
+        
+        result = (frame, weighting, weights)
+        with self._lock:
+            snapshot['rescored'][key] = result
+            while len(snapshot['rescored']) > RESCORE_CACHE_SIZE:
+                snapshot['rescored'].popitem(last=False)
+        return result
+    
+    def _score(self, snapshot, query):
+        """
+        MLAPS recomputed with custom settings, without rerunning the pipeline
+        - w_MLA, w_LML, w_MOM, w_DDR: weights (unspecified ones keep their
+          default; rescaled to sum to 1)
+        - cap_z: z-score cap before normalising (default 2.5)
+        - min_sales: minimum sales in the last 12 months to be scored (default 0)
+        - Paging, sorting, filters and fields as in _scores; rows gain
+          previous_rank and rank_change against the published ranking
+        """
+        weights = _weight_params(query)
+        cap_z = _float_param(query, 'cap_z', 2.5, 0.1, 10)
+        min_sales = _int_param(query, 'min_sales', 0, 0, 10 ** 6)
+        frame, weighting, weights = self._rescored(snapshot, weights, cap_z, min_sales)
+        return {
+            'weighting': weighting,
+            'weights': weights,
+            'cap_z': cap_z,
+            'min_sales': min_sales,
+            'suburbs': len(frame),
+            **self._page(snapshot, frame, query)
+        }
@@ -0,0 +1,200 @@
+"""
+MLAPS v2: Bootstrap rank stability
+- Resamples every suburb's transactions with replacement, B times
+- Recomputes LML, MOM, DDR, MLA and the composite for every replicate
+- A chunk of replicates is one batch: suburb labels become (replicate,
+  suburb) groups, so each stage function runs once for the whole chunk
+- Chunk size comes from the number of transactions and a per-worker memory
+  budget (CHUNK_MEMORY_BYTES)
+- Chunks run in parallel on a process pool; each replicate has its own seed,
+  so results do not depend on the worker count or the chunk size
+"""
+
+import multiprocessing as mp
+import os
+import warnings
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from .composite import WEIGHTS, WEIGHTS_NO_MLA, component_scores_batch
+from .metrics import calculate_drawdown_v2, calculate_momentum_v2, dwelling_stock
+from .mla import calculate_mla_v2
+from .panel import build_quarterly_panel
+
+BOOTSTRAP_REPLICATES = 1000
+
+# Most replicates per chunk (larger batches stop paying off)
+CHUNK_REPLICATES = 25
+
+# Working memory per worker for one chunk, and the peak bytes per resampled
+# transaction (batch frame, stage intermediates and the draws; ~160 B/row measured
+# with tracemalloc in score_replicates, plus the index draw)
+CHUNK_MEMORY_BYTES = 512 * 1024 ** 2
+BYTES_PER_RESAMPLED_ROW = 200
+
+# Read-only inputs shared with bootstrap workers (inherited on fork, sent once per worker otherwise)
+_bootstrap_data = {}
+
+def _prepare(transactions_df, gnaf_df, macro_df):
+    """Transactions laid out by (suburb, date), plus the per-suburb inputs every replicate needs"""
+    df = transactions_df[['suburb', 'dat', 'price']].dropna(subset=['suburb', 'dat'])
+    df = df.sort_values('dat', kind='stable')
+    codes, suburbs = pd.factorize(df['suburb'].astype(str), sort=True)
+    order = np.argsort(codes, kind='stable')
+    
+    n = np.bincount(codes, minlength=len(suburbs))
+    stock = dwelling_stock(gnaf_df)
+    stock = stock.assign(suburb=stock['suburb'].astype(str)).set_index('suburb')['dwelling_stock']
+    as_of = df['dat'].max()
+    
+    return {
+        'suburbs': np.asarray(suburbs),
+        'codes': codes[order],
+        'dat': df['dat'].to_numpy()[order],
+        'price': df['price'].to_numpy(dtype=float)[order],
+        'start': np.concatenate([[0], np.cumsum(n)[:-1]]),
+        'n': n,
+        'stock': stock.reindex(suburbs).to_numpy(dtype=float),
+        'cutoff': np.datetime64(as_of - pd.DateOffset(months=12)),
+        'macro': macro_df
+    }
+
+def resample_indices(rng, codes, start, n, replicates):
+    """
+    Within-suburb bootstrap rows, replicate × transaction
+    - Row i of a replicate draws from its own suburb's block of the layout
+    - Sorting each replicate keeps every suburb block in place (each block
+      only draws from itself) and puts draws back in date order
+    """
+    draws = np.floor(rng.random((replicates, len(codes))) * n[codes]).astype(np.int64)
+    return np.sort(start[codes] + draws, axis=1)
+
+def score_replicates(data, idx):
+    """
+    Component and MLAPS matrices (replicate × suburb) for the resampled rows idx
+    - Same rules as run_pipeline: suburbs need LML, MOM and DDR; MLA is
+      neutral (50) unless significant; weights as in composite
+    - Returns {'MLAPS', 'rank'} with NaN where a suburb drops out of a replicate
+    """
+    replicates, n_rows = idx.shape
+    n_suburbs = len(data['suburbs'])
+    
+    # Replicate r, suburb s is group r * n_suburbs + s
+    label = (np.arange(replicates)[:, None] * n_suburbs + data['codes'][None, :]).ravel()
+    flat = idx.ravel()
+    batch = pd.DataFrame({'suburb': label, 'dat': data['dat'][flat], 'price': data['price'][flat]})
+    
+    def as_matrix(groups, values):
+        matrix = np.full(replicates * n_suburbs, np.nan)
+        matrix[np.asarray(groups, dtype=np.int64)] = values
+        return matrix.reshape(replicates, n_suburbs)
+    
+    # LML: 12-month sales over dwelling stock (window end fixed at the observed latest sale)
+    sales_12m = np.bincount(label[data['dat'][flat] >= data['cutoff']],
+                            minlength=replicates * n_suburbs).reshape(replicates, n_suburbs)
+    stock = np.where(np.isnan(data['stock']), sales_12m * 10, data['stock'])
+    with np.errstate(invalid='ignore', divide='ignore'):
+        lml = np.where(sales_12m > 0, sales_12m / stock * 100, np.nan)
+    
+    mom = calculate_momentum_v2(batch)
+    panel = build_quarterly_panel(batch)
+    ddr = calculate_drawdown_v2(None, panel=panel)
+    mla = calculate_mla_v2(None, data['macro'], panel=panel)
+    del batch, panel
+    
+    components = {
+        'LML': lml,
+        'MOM': as_matrix(mom['suburb'], mom['MOM'].to_numpy(dtype=float)),
+        'DDR': as_matrix(ddr['suburb'], ddr['DDR'].to_numpy(dtype=float)),
+    }
+    mla_value = as_matrix(mla['suburb'], mla['MLA'].to_numpy(dtype=float))
+    mla_significant = as_matrix(mla['suburb'], mla['MLA_significant'].to_numpy(dtype=float)) == 1
+    
+    included = ~np.isnan(components['LML']) & ~np.isnan(components['MOM']) & ~np.isnan(components['DDR'])
+    scores = component_scores_batch({**components, 'MLA': mla_value}, mla_significant, included)
+    
+    has_mla = (included & ~np.isnan(mla_value)).any(axis=1, keepdims=True)
+    with_mla = sum(weight * scores[name] for name, weight in WEIGHTS.items())
+    without_mla = sum(weight * scores[name] for name, weight in WEIGHTS_NO_MLA.items())
+    mlaps = np.where(included, np.where(has_mla, with_mla, without_mla), np.nan)
+    
+    # Rank 1 = highest MLAPS among the suburbs scored in that replicate
+    order = np.argsort(np.where(included, -mlaps, np.inf), axis=1, kind='stable')
+    rank = np.empty_like(mlaps)
+    np.put_along_axis(rank, order, np.arange(1, n_suburbs + 1, dtype=float)[None, :].repeat(replicates, 0), axis=1)
+    rank = np.where(included, rank, np.nan)
+    
+    return {'MLAPS': mlaps, 'rank': rank}
+
+def chunk_replicates(n_rows, memory_bytes=CHUNK_MEMORY_BYTES):
+    """
+    Replicates per chunk so that one chunk of n_rows-transaction replicates fits
+    memory_bytes (between 1 and CHUNK_REPLICATES)
+    - At one replicate per chunk the peak is still ~BYTES_PER_RESAMPLED_ROW × n_rows
+    """
+    return int(min(CHUNK_REPLICATES, max(1, memory_bytes // (BYTES_PER_RESAMPLED_ROW * max(n_rows, 1)))))
+
+def _run_chunk(seeds):
+    data = _bootstrap_data
+    idx = np.concatenate([resample_indices(np.random.default_rng(seed), data['codes'], data['start'],
+                                           data['n'], 1) for seed in seeds])
+    return score_replicates(data, idx)
+
+def _init_worker(data):
+    """Spawned workers get the shared inputs once, at start-up"""
+    _bootstrap_data.update(data)
+
+def bootstrap_ranks(transactions_df, gnaf_df, macro_df, replicates=BOOTSTRAP_REPLICATES, top_n=10,
+                    seed=0, workers=None, chunk_size=None, memory_bytes=CHUNK_MEMORY_BYTES):
+    """
+    Rank stability of MLAPS under within-suburb bootstrap resampling
+    - replicates: number of bootstrap samples B
+    - chunk_size: replicates per batch (default: chunk_replicates for the
+      number of transactions and memory_bytes per worker)
+    - workers: processes for the chunks (default: CPU count, 1 runs in-process)
+    - Returns one row per suburb: share of replicates in which it was scored,
+      5/50/95th rank percentiles, P(rank <= top_n) and the 5/95th MLAPS
+      percentiles, ordered by median rank
+    """
+    _bootstrap_data.clear()
+    _bootstrap_data.update(_prepare(transactions_df, gnaf_df, macro_df))
+    
+    if chunk_size is None:
+        chunk_size = chunk_replicates(len(_bootstrap_data['codes']), memory_bytes)
+    replicate_seeds = np.random.SeedSequence(seed).spawn(replicates)
+    chunk_seeds = [replicate_seeds[first:first + chunk_size] for first in range(0, replicates, chunk_size)]
+    workers = min(len(chunk_seeds), workers or os.cpu_count() or 1)
+    
+    if workers <= 1:
+        chunks = [_run_chunk(seeds) for seeds in chunk_seeds]
+    else:
+        if 'fork' in mp.get_all_start_methods():
+            pool = ProcessPoolExecutor(max_workers=workers, mp_context=mp.get_context('fork'))
+        else:
+            pool = ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                                       initargs=(dict(_bootstrap_data),))
+        with pool:
+            chunks = list(pool.map(_run_chunk, chunk_seeds))
+    
+    rank = np.concatenate([chunk['rank'] for chunk in chunks])
+    mlaps = np.concatenate([chunk['MLAPS'] for chunk in chunks])
+    scored = ~np.isnan(rank)
+    
+    with warnings.catch_warnings():
+        warnings.simplefilter('ignore', RuntimeWarning)  # suburbs never scored
+        rank_percentiles = np.nanpercentile(rank, [5, 50, 95], axis=0)
+        mlaps_percentiles = np.nanpercentile(mlaps, [5, 95], axis=0)
+    
+    result = pd.DataFrame({
+        'suburb': _bootstrap_data['suburbs'],
+        'scored_share': scored.mean(axis=0),
+        'rank_p05': rank_percentiles[0],
+        'rank_p50': rank_percentiles[1],
+        'rank_p95': rank_percentiles[2],
+        f'p_top{top_n}': (scored & (np.nan_to_num(rank, nan=np.inf) <= top_n)).mean(axis=0),
+        'MLAPS_p05': mlaps_percentiles[0],
+        'MLAPS_p95': mlaps_percentiles[1],
+    })
+    return result.sort_values(['rank_p50', 'suburb']).reset_index(drop=True)
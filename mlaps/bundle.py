@@ -0,0 +1,126 @@
+"""
+MLAPS v2: Offline dashboard bundle
+- vendor/: Plotly and PapaParse next to mlaps_dashboard.html, so the dashboard
+  loads without a CDN (downloaded once on a connected machine, or copied from
+  local files)
+- mlaps_snapshot.js: the first table page and the chart series (rankings,
+  components, distribution, both scatters) precomputed from the latest scores,
+  plus compact rows for filtering; the first render parses no CSV and makes no
+  request
+- Loaded with <script> tags, so it also works when the dashboard is opened as a file
+"""
+
+import json
+import math
+import os
+import urllib.error
+import urllib.request
+from pathlib import Path
+
+from .api import DEFAULT_PAGE_SIZE, ScoresAPI
+from .defaults import DASHBOARD_DIR
+
+VENDOR_DIRNAME = 'vendor'
+SNAPSHOT_FILENAME = 'mlaps_snapshot.js'
+
+# vendor/ file -> the CDN copy mlaps_dashboard.html falls back to without it
+VENDOR_ASSETS = {
+    'plotly.min.js': 'https://cdn.plot.ly/plotly-2.26.0.min.js',
+    'papaparse.min.js': 'https://cdnjs.cloudflare.com/ajax/libs/PapaParse/5.4.1/papaparse.min.js',
+}
+
+# As requested by the dashboard (TOP_N, BINS)
+SNAPSHOT_TOP = 15
+SNAPSHOT_BINS = 20
+
+# Columns the dashboard filters and aggregates on; rounded below display precision
+SNAPSHOT_COLUMNS = ['suburb', 'state', 'rank', 'MLAPS', 'LML', 'MOM', 'DDR', 'MLA', 'latest_price',
+                    'MLA_score', 'LML_score', 'MOM_score', 'DDR_score']
+SNAPSHOT_DECIMALS = 4
+
+def _write(path, data):
+    tmp_path = path.with_name(f'.{path.name}.{os.getpid()}.tmp')
+    tmp_path.write_bytes(data)
+    os.replace(tmp_path, path)
+
+def vendor_assets(dashboard_dir=DASHBOARD_DIR, sources=None, refresh=False):
+    """
+    Copy the dashboard's JavaScript libraries into <dashboard_dir>/vendor/
+    - sources: {file name: local path} to copy instead of downloading, e.g. on
+      an air-gapped machine {'plotly.min.js': '/media/usb/plotly-2.26.0.min.js'}
+    - Files already in vendor/ are kept unless refresh is true
+    - Returns {file name: path}
+    """
+    sources = sources or {}
+    unknown = set(sources) - set(VENDOR_ASSETS)
+    if unknown:
+        raise ValueError(f"unknown asset(s): {', '.join(sorted(unknown))}")
+    
+    vendor_dir = Path(dashboard_dir) / VENDOR_DIRNAME
+    vendor_dir.mkdir(parents=True, exist_ok=True)
+    paths = {}
+    for name, url in VENDOR_ASSETS.items():
+        path = vendor_dir / name
+        if name in sources:
+            _write(path, Path(sources[name]).read_bytes())
+        elif refresh or not path.exists():
+            try:
+                with urllib.request.urlopen(url, timeout=60) as response:
+                    _write(path, response.read())
+            except (urllib.error.URLError, TimeoutError) as e:
+                raise OSError(f"could not download {name} from {url} ({e}); "
+                              f"copy it from a connected machine instead") from e
+        paths[name] = path
+    return paths
+
+def snapshot_payload(results_dir, page_size=DEFAULT_PAGE_SIZE, top=SNAPSHOT_TOP, bins=SNAPSHOT_BINS):
+    """
+    What the dashboard requests on first load, from the latest scores in results_dir
+    - meta, page (rank order, no filters) and charts: the /api/meta, /api/scores
+      and /api/charts responses
+    - rows: SNAPSHOT_COLUMNS as row arrays, for filtering without the server
+    """
+    api = ScoresAPI(results_dir)
+    
+    def get(path, **query):
+        response = api.get(path, {name: [str(value)] for name, value in query.items()})
+        payload = json.loads(response.body)
+        if response.status != 200:
+            raise FileNotFoundError(payload['error'])
+        return payload
+    
+    payload = {
+        'meta': get('/api/meta'),
+        'page': get('/api/scores', page=1, page_size=page_size),
+        'charts': get('/api/charts', top=top, bins=bins),
+    }
+    df = api.snapshot()['df']
+    columns = [column for column in SNAPSHOT_COLUMNS if column in df.columns]
+    values = df[columns].round(SNAPSHOT_DECIMALS).to_dict('split')['data']
+    payload['rows'] = {
+        'columns': columns,
+        'values': [[None if isinstance(v, float) and math.isnan(v) else v for v in row] for row in values],
+    }
+    return payload
+
+def write_snapshot(payload, path):
+    """
+    The payload as a script that sets window.MLAPS_SNAPSHOT
+    - A JSON.parse of one string literal is faster to load than the same data
+      as a JavaScript object literal
+    """
+    text = json.dumps(payload, separators=(',', ':'), allow_nan=False)
+    literal = text.replace('\\', '\\\\').replace("'", "\\'")
+    _write(Path(path), f"window.MLAPS_SNAPSHOT = JSON.parse('{literal}');\n".encode())
+    return Path(path)
+
+def build_bundle(results_dir, dashboard_dir=DASHBOARD_DIR, sources=None, refresh_assets=False):
+    """
+    Vendor the libraries and precompute the snapshot next to mlaps_dashboard.html
+    - results_dir: where the analysis wrote mlaps_results/ (or mlaps_scores_v2.csv)
+    - Returns {file name: path} for the assets and {'snapshot': path}
+    """
+    dashboard_dir = Path(dashboard_dir)
+    paths = vendor_assets(dashboard_dir, sources, refresh_assets)
+    paths['snapshot'] = write_snapshot(snapshot_payload(results_dir), dashboard_dir / SNAPSHOT_FILENAME)
+    return paths
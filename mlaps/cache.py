@@ -0,0 +1,94 @@
+"""
+MLAPS v2: Content-addressed stage cache
+- Stage outputs (LML, MOM, panel, DDR, MLA) stored as parquet on local disk
+- Keyed by SHA-256 of the stage name, its parameters and the content of its inputs
+- Size-bounded: least recently used entries are evicted first
+"""
+
+import hashlib
+import json
+import os
+from pathlib import Path
+
+import pandas as pd
+
+from .defaults import CACHE_DIR, CACHE_MAX_BYTES
+
+# Bump when a stage's output changes for the same inputs and parameters
+CACHE_VERSION = 1
+
+def frame_fingerprint(df):
+    """SHA-256 of a frame's columns, dtypes and values (index ignored)"""
+    digest = hashlib.sha256()
+    digest.update(json.dumps([[str(c), str(t)] for c, t in df.dtypes.items()]).encode())
+    digest.update(pd.util.hash_pandas_object(df, index=False).to_numpy().tobytes())
+    return digest.hexdigest()
+
+class StageCache:
+    """
+    Parquet-backed cache of pipeline stage outputs
+    - key(stage, inputs, params) -> get(key) / put(key, frame); run_stages looks
+      up every stage first and dispatches only the misses
+    - Entries are touched on every hit; eviction removes the oldest first
+    - hits / misses record stage names for the run summary
+    """
+    
+    def __init__(self, cache_dir=CACHE_DIR, max_bytes=CACHE_MAX_BYTES):
+        self.cache_dir = Path(cache_dir)
+        self.max_bytes = max_bytes
+        self.hits = []
+        self.misses = []
+        self._fingerprints = {}
+    
+    def fingerprint(self, df):
+        # Inputs are shared across stages, so hash each frame once per run
+        key = id(df)
+        if key not in self._fingerprints:
+            self._fingerprints[key] = (df, frame_fingerprint(df))
+        return self._fingerprints[key][1]
+    
+    def key(self, stage, inputs, params):
+        payload = {
+            'version': CACHE_VERSION,
+            'stage': stage,
+            'params': params,
+            'inputs': [self.fingerprint(df) for df in inputs]
+        }
+        return hashlib.sha256(json.dumps(payload, sort_keys=True, default=str).encode()).hexdigest()
+    
+    def path(self, key):
+        return self.cache_dir / f'{key}.parquet'
+    
+    def get(self, key):
+        path = self.path(key)
+        try:
+            df = pd.read_parquet(path)
+        except (OSError, ValueError):
+            return None
+        os.utime(path)
+        return df
+    
+    def put(self, key, df):
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        path = self.path(key)
+        tmp_path = path.with_suffix(f'.{os.getpid()}.tmp')
+        df.to_parquet(tmp_path, index=False)
+        os.replace(tmp_path, path)
+        self.evict()
+    
+    def evict(self):
+        """Remove least recently used entries until the cache fits in max_bytes"""
+        entries = []
+        for path in self.cache_dir.glob('*.parquet'):
+            try:
+                stat = path.stat()
+            except FileNotFoundError:
+                continue
+            entries.append((stat.st_mtime_ns, stat.st_size, path))
+        
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in sorted(entries, key=lambda entry: entry[0]):
+            if total <= self.max_bytes:
+                break
+            path.unlink(missing_ok=True)
+            total -= size
@@ -0,0 +1,341 @@
+"""
+MLAPS v2: Command line entry point
+Usage: python -m mlaps [--lead-sweep] [--rolling] [--backtest]
+       python -m mlaps update NEW_SALES.parquet [...]
+       python -m mlaps bundle [--plotly FILE] [--papaparse FILE]
+"""
+
+import argparse
+import sys
+import warnings
+from pathlib import Path
+
+from .defaults import CACHE_DIR, CACHE_MAX_BYTES, DATA_DIR, STORE_DIR
+
+def build_parser():
+    parser = argparse.ArgumentParser(
+        prog='mlaps',
+        description='MLAPS v2: Macro-Liquidity Aligned Property Score'
+    )
+    parser.add_argument('--data-dir', type=Path, default=DATA_DIR,
+                        help='directory with transactions.parquet and gnaf_prop.parquet')
+    parser.add_argument('--output-dir', type=Path, default=None,
+                        help='where result files are written (default: --data-dir)')
+    parser.add_argument('--run-date', default=None,
+                        help='partition the typed results (mlaps_results/) under this date (YYYY-MM-DD, default: today)')
+    parser.add_argument('--start', default=None,
+                        help='only use sales on or after this date (YYYY-MM-DD)')
+    parser.add_argument('--end', default=None,
+                        help='only use sales on or before this date (YYYY-MM-DD)')
+    parser.add_argument('--suburb', action='append', dest='suburbs', default=None,
+                        help='only score this suburb (repeatable)')
+    parser.add_argument('--rebuild-stock', action='store_true',
+                        help='rebuild the dwelling stock index from gnaf_prop.parquet')
+    parser.add_argument('--shards', type=int, default=None,
+                        help='hash-partition suburbs into N shards scored in parallel')
+    parser.add_argument('--stream', action='store_true',
+                        help='stream transactions.parquet in batches instead of loading it (larger-than-memory files)')
+    parser.add_argument('--batch-rows', type=int, default=1_000_000,
+                        help='rows per batch in --stream mode, and per spilled suburb partition (peak memory)')
+    parser.add_argument('--sketch-error', type=float, default=None, metavar='ALPHA',
+                        help='--stream only: quarterly medians and winsorization bounds from quantile sketches '
+                             'with relative error ALPHA (e.g. 0.005) instead of exact quantiles of prices '
+                             'spilled to the temp directory')
+    parser.add_argument('--macro', default=None, metavar='FILE_OR_NAME',
+                        help='macro index instead of the seeded synthetic proxy: a CSV/parquet file '
+                             '(saved to mlaps/macro_series under its file name) or a saved NAME[@VERSION]')
+    parser.add_argument('--macro-column', default=None,
+                        help='value column of the --macro file (default: first numeric column)')
+    parser.add_argument('--macro-kind', choices=['level', 'return'], default='level',
+                        help='--macro file holds index levels/prices (default) or periodic returns')
+    parser.add_argument('--factor', action='append', dest='factors', default=None, metavar='FILE_OR_NAME',
+                        help='also correlate suburbs with this macro series (repeatable; file or saved '
+                             'NAME[@VERSION], like --macro) and fit multi-factor betas (mlaps_mla_factors.csv)')
+    parser.add_argument('--cache-dir', type=Path, default=CACHE_DIR,
+                        help='stage cache directory (default: mlaps/.mlaps_cache)')
+    parser.add_argument('--cache-max-mb', type=int, default=CACHE_MAX_BYTES // 1024 ** 2,
+                        help='evict least recently used stage outputs above this size')
+    parser.add_argument('--no-cache', action='store_true',
+                        help='recompute every stage without reading or writing the cache')
+    parser.add_argument('--lead-sweep', action='store_true',
+                        help='also compute MLA for leads of 0-52 weeks (mlaps_lead_sweep.csv)')
+    parser.add_argument('--rolling', action='store_true',
+                        help='also build the monthly MLAPS history (mlaps_scores_rolling.csv)')
+    parser.add_argument('--backtest', action='store_true',
+                        help='also run the forward-validation backtest (mlaps_backtest.csv)')
+    parser.add_argument('--bootstrap', type=int, default=None, metavar='B',
+                        help='also bootstrap transactions within suburbs B times (e.g. 1000) for rank '
+                             'percentiles and top-10 probabilities (mlaps_rank_stability.csv)')
+    parser.add_argument('--sketch-benchmark', action='store_true',
+                        help='also measure quantile sketch accuracy against the exact path (mlaps_sketch_benchmark.csv)')
+    parser.add_argument('--workers', type=int, default=None,
+                        help='worker processes for the metric stages, backtest and bootstrap (default: CPU count)')
+    return parser
+
+def build_update_parser():
+    parser = argparse.ArgumentParser(
+        prog='mlaps update',
+        description='Append new transactions to the store and rescore only the suburbs they touch'
+    )
+    parser.add_argument('files', type=Path, nargs='+',
+                        help='parquet files of new transactions (dat, suburb, price), loaded in order')
+    parser.add_argument('--store', type=Path, default=STORE_DIR,
+                        help='update store directory (seeded from DATA_DIR/transactions.parquet when empty)')
+    parser.add_argument('--data-dir', type=Path, default=DATA_DIR,
+                        help='directory with transactions.parquet and gnaf_prop.parquet')
+    parser.add_argument('--output-dir', type=Path, default=None,
+                        help='where to write mlaps_scores_v2.csv and mlaps_results/ (default: --data-dir)')
+    parser.add_argument('--run-date', default=None,
+                        help='partition the typed results under this date (YYYY-MM-DD, default: today)')
+    parser.add_argument('--rebuild-stock', action='store_true',
+                        help='rebuild the dwelling stock index from GNAF even if it is current')
+    return parser
+
+def build_bundle_parser():
+    parser = argparse.ArgumentParser(
+        prog='mlaps bundle',
+        description='Copy the dashboard libraries next to mlaps_dashboard.html and precompute its first view, '
+                    'so it loads without network access'
+    )
+    parser.add_argument('--results-dir', type=Path, default=DATA_DIR,
+                        help='where the analysis wrote its results (its --output-dir, default: --data-dir)')
+    parser.add_argument('--plotly', type=Path, default=None,
+                        help='local copy of plotly-2.26.0.min.js (default: downloaded once into mlaps/vendor)')
+    parser.add_argument('--papaparse', type=Path, default=None,
+                        help='local copy of papaparse 5.4.1 papaparse.min.js (default: downloaded once)')
+    parser.add_argument('--refresh-assets', action='store_true',
+                        help='download the libraries again even if mlaps/vendor has them')
+    return parser
+
+def bundle(argv):
+    parser = build_bundle_parser()
+    args = parser.parse_args(argv)
+    
+    from .bundle import build_bundle
+    
+    sources = {name: path for name, path in (('plotly.min.js', args.plotly), ('papaparse.min.js', args.papaparse))
+               if path is not None}
+    try:
+        paths = build_bundle(args.results_dir, sources=sources, refresh_assets=args.refresh_assets)
+    except OSError as e:
+        parser.error(str(e))
+    for name, path in paths.items():
+        print(f"  ✓ {name}: {path} ({path.stat().st_size / 1024:,.0f} KB)")
+
+def update(argv):
+    args = build_update_parser().parse_args(argv)
+    output_dir = args.output_dir or args.data_dir
+    warnings.filterwarnings('ignore')
+    
+    from .pipeline import print_report, run_pipeline_update
+    from .stock import load_dwelling_stock
+    from .store import TransactionStore
+    
+    print("=" * 80)
+    print("MLAPS v2: INCREMENTAL UPDATE")
+    print("=" * 80)
+    
+    gnaf = load_dwelling_stock(args.data_dir / 'gnaf_prop.parquet', rebuild=args.rebuild_stock)
+    results = run_pipeline_update(TransactionStore(args.store), args.files, gnaf,
+                                  seed_path=args.data_dir / 'transactions.parquet')
+    
+    write_scores(results, output_dir, args.run_date, [args.data_dir / 'transactions.parquet', *args.files])
+    
+    print_report(results['mlaps'], results['weighting'])
+
+def write_scores(results, output_dir, run_date=None, transaction_files=(), suburbs=None):
+    from .loaders import suburb_states
+    from .results import write_results
+    
+    # State of each suburb (for filtering in the dashboard), from the transactions' state column
+    mlaps = results['mlaps'].copy()
+    states = suburb_states([path for path in transaction_files if Path(path).exists()], suburbs)
+    if len(states) > 0:
+        mlaps.insert(1, 'state', mlaps['suburb'].astype(str).map(states))
+    
+    paths = write_results(mlaps, output_dir, run_date=run_date, weighting=results['weighting'])
+    print(f"\n✅ Full results saved to: {paths['csv'].name}")
+    print(f"  ✓ Typed snapshot: {paths['arrow'].relative_to(output_dir)} "
+          f"(run history: {paths['parquet'].parent.relative_to(output_dir)})")
+
+def load_macro(spec, value_column=None, kind='level'):
+    """Weekly macro returns from a file (persisted on read) or a saved series NAME[@VERSION]"""
+    from .macro import MacroLibrary, read_macro_file
+    
+    library = MacroLibrary()
+    path = Path(spec)
+    if path.is_file():
+        macro = read_macro_file(path, value_column=value_column, kind=kind)
+        name, version = path.stem, library.save(path.stem, macro, source=path)
+    else:
+        name, _, version = spec.partition('@')
+        macro = library.load(name, version or None)
+        version = version or library.versions(name)[-1]['version']
+    
+    print(f"  ✓ Macro series {name}@{version}: {len(macro)} weeks, "
+          f"{macro['date'].min().date()} to {macro['date'].max().date()}")
+    return macro
+
+def write_lead_sweep(results, transactions, output_dir):
+    from .mla import calculate_mla_lead_sweep
+    
+    lead_table, best_leads = calculate_mla_lead_sweep(transactions, results['macro'], leads=range(0, 53),
+                                                      panel=results['panel'])
+    lead_table.to_csv(output_dir / 'mlaps_lead_sweep.csv')
+    print(f"  ✓ Lead sweep: {lead_table.shape[1]} leads × {len(lead_table)} suburbs saved to mlaps_lead_sweep.csv")
+    if len(best_leads) > 0:
+        print(f"  ✓ Most common best lead: {best_leads['best_lead_weeks'].mode().iloc[0]} weeks")
+
+def write_factors(results, factors, value_column, kind, output_dir):
+    from .mla import calculate_mla_multi
+    
+    print("\n[+] Multi-factor macro alignment...")
+    series = {}
+    for spec in factors:
+        macro = load_macro(spec, value_column, kind)
+        series[Path(spec).stem if Path(spec).is_file() else spec] = macro
+    corr_table, factor_stats = calculate_mla_multi(None, series, panel=results['panel'], betas=True)
+    factor_stats.to_csv(output_dir / 'mlaps_mla_factors.csv', index=False)
+    print(f"  ✓ {corr_table.shape[1]} factors × {len(corr_table)} suburbs")
+    for name, rows in factor_stats.groupby('factor', sort=False):
+        print(f"  ✓ {name}: mean MLA {rows['MLA'].mean():.3f}, "
+              f"significant {rows['MLA_significant'].sum()}/{len(rows)}, mean beta {rows['beta'].mean():.3f}")
+    print(f"  ✓ Factor alignment saved to: mlaps_mla_factors.csv")
+
+def write_rolling(results, transactions, gnaf, output_dir):
+    from .rolling import calculate_mlaps_rolling
+    
+    print("\n[+] Building rolling monthly MLAPS history...")
+    rolling = calculate_mlaps_rolling(transactions, gnaf, results['macro'], window_months=36)
+    rolling.to_csv(output_dir / 'mlaps_scores_rolling.csv', index=False)
+    print(f"  ✓ {rolling['as_of'].nunique() if len(rolling) else 0} month-ends, {len(rolling):,} suburb-months")
+    print(f"  ✓ Rolling history saved to: mlaps_scores_rolling.csv")
+
+def write_backtest(results, transactions, gnaf, output_dir, workers=None):
+    import pandas as pd
+    from .backtest import run_backtest
+    
+    print("\n[+] Running forward-validation backtest...")
+    cutoffs = list(pd.date_range(transactions['dat'].min() + pd.DateOffset(months=36),
+                                 transactions['dat'].max() - pd.DateOffset(months=12),
+                                 freq=pd.offsets.QuarterEnd(), normalize=True))
+    results_df, seconds = run_backtest(transactions, gnaf, results['macro'], cutoffs, workers=workers)
+    results_df.to_csv(output_dir / 'mlaps_backtest.csv', index=False)
+    
+    if len(results_df) > 0:
+        stage_cols = [c for c in results_df.columns if c.startswith('time_')]
+        print(f"  ✓ {len(results_df)} cut-offs in {seconds:.1f}s wall-clock")
+        print(f"  ✓ Mean IC: {results_df['IC'].mean():.3f} (IC > 0 in {(results_df['IC'] > 0).mean():.0%} of cut-offs)")
+        print(f"  ✓ Mean top-bottom decile spread: {results_df['decile_spread'].mean():.2f}% over 12 months")
+        print("  ✓ Mean seconds per cut-off by stage: " +
+              ", ".join(f"{c[5:]}={results_df[c].mean():.3f}" for c in stage_cols))
+    print(f"  ✓ Backtest saved to: mlaps_backtest.csv")
+
+def write_bootstrap(results, transactions, gnaf, replicates, output_dir, workers=None):
+    import time
+    from .bootstrap import bootstrap_ranks
+    
+    print(f"\n[+] Bootstrapping rank stability ({replicates:,} replicates)...")
+    start = time.perf_counter()
+    stability = bootstrap_ranks(transactions, gnaf, results['macro'], replicates=replicates, workers=workers)
+    stability.to_csv(output_dir / 'mlaps_rank_stability.csv', index=False)
+    print(f"  ✓ {replicates:,} replicates in {time.perf_counter() - start:.1f}s wall-clock")
+    
+    point = results['mlaps'].assign(suburb=results['mlaps']['suburb'].astype(str)).set_index('suburb')['rank']
+    for row in stability.head(10).itertuples():
+        rank = f"#{int(point[row.suburb])}" if row.suburb in point.index else "unranked"
+        print(f"  ✓ {row.suburb}: {rank}, 90% rank interval {row.rank_p05:.0f}-{row.rank_p95:.0f}, "
+              f"P(top 10) {row.p_top10:.0%}")
+    print(f"  ✓ Rank stability saved to: mlaps_rank_stability.csv")
+
+def write_sketch_benchmark(transactions, output_dir):
+    from .sketches import sketch_benchmark
+    
+    print("\n[+] Benchmarking quantile sketches against exact quantiles...")
+    benchmark = sketch_benchmark(transactions)
+    benchmark.to_csv(output_dir / 'mlaps_sketch_benchmark.csv', index=False)
+    for relative_error, rows in benchmark.groupby('relative_error'):
+        print(f"  ✓ α={relative_error:g}: max error {rows['max_error'].max():.4%}, "
+              f"{rows['sketch_rows_per_value'].iloc[0]:.2f} sketch rows per sale, "
+              f"built in {rows['build_seconds'].iloc[0]:.2f}s")
+    print(f"  ✓ Sketch benchmark saved to: mlaps_sketch_benchmark.csv")
+
+def main(argv=None):
+    argv = sys.argv[1:] if argv is None else list(argv)
+    if argv[:1] == ['update']:
+        return update(argv[1:])
+    if argv[:1] == ['bundle']:
+        return bundle(argv[1:])
+    
+    parser = build_parser()
+    args = parser.parse_args(argv)
+    if args.stream and (args.rolling or args.backtest or args.bootstrap or args.sketch_benchmark):
+        parser.error("--rolling, --backtest, --bootstrap and --sketch-benchmark need the transactions in memory; "
+                     "drop --stream")
+    if args.sketch_error is not None and not args.stream:
+        parser.error("--sketch-error applies to --stream mode only")
+    output_dir = args.output_dir or args.data_dir
+    warnings.filterwarnings('ignore')
+    
+    from .cache import StageCache
+    from .pipeline import load_data, print_report, run_pipeline, run_pipeline_streaming
+    from .stock import load_dwelling_stock
+    
+    print("=" * 80)
+    print("MLAPS v2: IMPROVED MACRO-LIQUIDITY ALIGNED PROPERTY SCORE")
+    print("=" * 80)
+    
+    macro_proxy = None
+    if args.macro is not None:
+        try:
+            macro_proxy = load_macro(args.macro, args.macro_column, args.macro_kind)
+        except ValueError as e:
+            parser.error(f"--macro {args.macro}: {e}")
+    
+    # Filters that match no transaction are reported as usage errors
+    if args.stream:
+        transactions = None
+        gnaf = load_dwelling_stock(args.data_dir / 'gnaf_prop.parquet', suburbs=args.suburbs,
+                                   rebuild=args.rebuild_stock)
+        try:
+            results = run_pipeline_streaming(args.data_dir / 'transactions.parquet', gnaf, macro_proxy,
+                                             batch_rows=args.batch_rows,
+                                             start=args.start, end=args.end, suburbs=args.suburbs,
+                                             relative_error=args.sketch_error)
+        except ValueError as e:
+            parser.error(str(e))
+    else:
+        try:
+            transactions, gnaf = load_data(args.data_dir, start=args.start, end=args.end, suburbs=args.suburbs,
+                                           rebuild_stock=args.rebuild_stock)
+        except ValueError as e:
+            parser.error(str(e))
+        cache = None if args.no_cache else StageCache(args.cache_dir, args.cache_max_mb * 1024 ** 2)
+        results = run_pipeline(transactions, gnaf, macro_proxy, cache=cache, workers=args.workers,
+                               shards=args.shards)
+    
+    if args.lead_sweep:
+        write_lead_sweep(results, transactions, output_dir)
+    if args.factors:
+        write_factors(results, args.factors, args.macro_column, args.macro_kind, output_dir)
+    
+    print("\n" + "=" * 80)
+    print("RESULTS")
+    print("=" * 80)
+    
+    write_scores(results, output_dir, args.run_date, [args.data_dir / 'transactions.parquet'], args.suburbs)
+    
+    print_report(results['mlaps'], results['weighting'])
+    
+    if args.rolling:
+        write_rolling(results, transactions, gnaf, output_dir)
+    if args.backtest:
+        write_backtest(results, transactions, gnaf, output_dir, workers=args.workers)
+    if args.bootstrap:
+        write_bootstrap(results, transactions, gnaf, args.bootstrap, output_dir, workers=args.workers)
+    if args.sketch_benchmark:
+        write_sketch_benchmark(transactions, output_dir)
+    
+    print("\n" + "=" * 80)
+    print("✅ ANALYSIS COMPLETE (v2 - IMPROVED)")
+    print("=" * 80)
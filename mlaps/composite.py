@@ -0,0 +1,113 @@
+"""
+MLAPS v2: Composite score
+- Merge components, normalize with z-score capping, weight and rank
+"""
+
+import numpy as np
+import pandas as pd
+
+# Component weights, in the order they are summed
+WEIGHTS = {'MLA': 0.40, 'LML': 0.35, 'MOM': 0.15, 'DDR': 0.10}
+WEIGHTS_NO_MLA = {'LML': 0.50, 'MOM': 0.30, 'DDR': 0.20}
+
+def combine_components(lml_data, mom_data, ddr_data, mla_data):
+    """Merge the four components per suburb, dropping suburbs without LML, MOM or DDR"""
+    mlaps = lml_data.copy()
+    mlaps = mlaps.merge(mom_data[['suburb', 'MOM', 'latest_price', 'mom_reliable']], on='suburb', how='left')
+    mlaps = mlaps.merge(ddr_data[['suburb', 'DDR', 'lookback_quarters', 'ddr_reliable']], on='suburb', how='left')
+    mlaps = mlaps.merge(mla_data[['suburb', 'MLA', 'MLA_pvalue', 'MLA_significant', 'MLA_n']], on='suburb', how='left')
+    
+    # Remove suburbs with missing critical data
+    return mlaps.dropna(subset=['LML', 'MOM', 'DDR'])
+
+# Cap z-scores at ±2.5σ before normalization
+def cap_and_normalize(series, higher_is_better=True, cap_z=2.5):
+    """
+    Robust normalization with z-score capping
+    """
+    # Calculate z-scores
+    mean = series.mean()
+    std = series.std()
+    if std == 0:
+        return pd.Series([50] * len(series), index=series.index)
+    
+    z_scores = (series - mean) / std
+    
+    # Cap at ±2.5σ
+    z_capped = z_scores.clip(-cap_z, cap_z)
+    
+    # Normalize to 0-100
+    if higher_is_better:
+        normalized = 100 * (z_capped - z_capped.min()) / (z_capped.max() - z_capped.min())
+    else:
+        normalized = 100 * (z_capped.max() - z_capped) / (z_capped.max() - z_capped.min())
+    
+    return normalized
+
+def cap_and_normalize_batch(values, included, higher_is_better=True, cap_z=2.5):
+    """
+    cap_and_normalize for many cross-sections at once
+    - values: replicate × suburb matrix; included: which cells take part
+    - Each row is normalized on its own; excluded cells come back NaN
+    """
+    x = np.where(included, values, np.nan)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        mean = np.nanmean(x, axis=1, keepdims=True)
+        std = np.sqrt(np.nansum((x - mean) ** 2, axis=1, keepdims=True) / (included.sum(axis=1, keepdims=True) - 1))
+        z_capped = np.clip((x - mean) / std, -cap_z, cap_z)
+        low = np.where(included, z_capped, np.inf).min(axis=1, keepdims=True)
+        high = np.where(included, z_capped, -np.inf).max(axis=1, keepdims=True)
+        if higher_is_better:
+            normalized = 100 * (z_capped - low) / (high - low)
+        else:
+            normalized = 100 * (high - z_capped) / (high - low)
+    return np.where(included, np.where(std == 0, 50.0, normalized), np.nan)
+
+def component_scores_batch(components, mla_significant, included, cap_z=2.5):
+    """
+    Component scores for many cross-sections, with the score_mlaps rules
+    - components: {'LML', 'MOM', 'DDR', 'MLA'} matrices (rows × suburbs)
+    - Non-significant MLA scored as neutral (50); excluded cells come back NaN
+    """
+    scores = {name: cap_and_normalize_batch(components[name], included, cap_z=cap_z)
+              for name in ('LML', 'MOM', 'DDR')}
+    mla_normalized = cap_and_normalize_batch(np.nan_to_num(components['MLA'], nan=0.0), included, cap_z=cap_z)
+    scores['MLA'] = np.where(included, np.where(mla_significant, mla_normalized, 50.0), np.nan)
+    return scores
+
+def describe_weights(weights):
+    return " + ".join(f"{weight:.0%} {component}" for component, weight in weights.items())
+
+def score_mlaps(mlaps):
+    """
+    MLAPS composite from the combined components
+    - Component scores via cap_and_normalize
+    - Non-significant MLA scored as neutral (50)
+    - Reweights without MLA when no suburb has one
+    - Returns (ranked frame, weighting description)
+    """
+    mlaps = mlaps.copy()
+    mlaps['LML_score'] = cap_and_normalize(mlaps['LML'], higher_is_better=True)
+    mlaps['MOM_score'] = cap_and_normalize(mlaps['MOM'], higher_is_better=True)
+    mlaps['DDR_score'] = cap_and_normalize(mlaps['DDR'], higher_is_better=True)
+    
+    # Dynamic MLA weighting based on significance
+    has_mla = mlaps['MLA'].notna().sum() > 0
+    
+    if has_mla:
+        # For non-significant MLA, set score to neutral (50)
+        mlaps['MLA_score'] = cap_and_normalize(mlaps['MLA'].fillna(0), higher_is_better=True)
+        mlaps.loc[~mlaps['MLA_significant'].fillna(False).astype(bool), 'MLA_score'] = 50.0
+        
+        # Calculate MLAPS with full weighting
+        mlaps['MLAPS'] = sum(weight * mlaps[f'{component}_score'] for component, weight in WEIGHTS.items())
+        weighting_used = describe_weights(WEIGHTS)
+    else:
+        # Reweight without MLA
+        mlaps['MLAPS'] = sum(weight * mlaps[f'{component}_score'] for component, weight in WEIGHTS_NO_MLA.items())
+        weighting_used = describe_weights(WEIGHTS_NO_MLA) + " (no MLA)"
+    
+    mlaps = mlaps.sort_values('MLAPS', ascending=False)
+    mlaps['rank'] = range(1, len(mlaps) + 1)
+    
+    return mlaps, weighting_used
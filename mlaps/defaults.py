@@ -0,0 +1,21 @@
+"""
+MLAPS v2: Default locations and limits
+- Standard library only, so the command line can build its parsers (and
+  answer --help) without importing pandas or pyarrow
+"""
+
+from pathlib import Path
+
+PACKAGE_DIR = Path(__file__).resolve().parent
+
+# Input data (transactions.parquet, gnaf_prop.parquet) and default output directory
+DATA_DIR = PACKAGE_DIR
+
+CACHE_DIR = PACKAGE_DIR / '.mlaps_cache'
+CACHE_MAX_BYTES = 512 * 1024 ** 2
+
+STORE_DIR = PACKAGE_DIR / 'mlaps_store'
+MACRO_DIR = PACKAGE_DIR / 'macro_series'
+
+# Where mlaps_dashboard.html lives (vendor/ and mlaps_snapshot.js go next to it)
+DASHBOARD_DIR = PACKAGE_DIR
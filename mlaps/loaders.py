@@ -0,0 +1,94 @@
+"""
+MLAPS v2: Parquet data access
+- Reads only the columns the pipeline uses (pyarrow column pruning)
+- Date-range and suburb filters are pushed down to parquet row groups
+- suburb / locality_name load as categoricals straight from the dictionary pages
+"""
+
+import pandas as pd
+import pyarrow.dataset as ds
+import pyarrow.parquet as pq
+
+TRANSACTION_COLUMNS = ['dat', 'suburb', 'price']
+GNAF_COLUMNS = ['locality_name']
+
+def _filters(suburb_column, suburbs=None, date_column=None, start=None, end=None):
+    """pyarrow filter list (AND of all given conditions), or None"""
+    filters = []
+    if suburbs is not None:
+        filters.append((suburb_column, 'in', sorted(set(suburbs))))
+    if start is not None:
+        filters.append((date_column, '>=', pd.Timestamp(start)))
+    if end is not None:
+        filters.append((date_column, '<=', pd.Timestamp(end)))
+    return filters or None
+
+def _read(path, columns, filters, categorical):
+    """Read a pruned, filtered parquet file into pandas"""
+    table = pq.read_table(path, columns=columns, filters=filters,
+                          read_dictionary=categorical)
+    df = table.to_pandas()
+    
+    # The dictionary follows the file (and survives filtering); keep only the
+    # values present, sorted, so groupby output matches plain string columns
+    for column in categorical:
+        values = df[column].cat.remove_unused_categories()
+        df[column] = values.cat.reorder_categories(sorted(values.cat.categories))
+    return df
+
+def require_transactions(n_transactions, path, start=None, end=None, suburbs=None):
+    """ValueError naming the file and the filters when none of its transactions match them"""
+    if n_transactions > 0:
+        return
+    filters = [f"{name}={value}" for name, value in (('start', start), ('end', end)) if value is not None]
+    if suburbs is not None:
+        filters.append(f"suburbs={', '.join(sorted(set(suburbs)))}")
+    if filters:
+        raise ValueError(f"no transactions in {path} match {'; '.join(filters)}")
+    raise ValueError(f"no transactions in {path}")
+
+def read_transactions(path, columns=TRANSACTION_COLUMNS, start=None, end=None, suburbs=None,
+                      categorical=True):
+    """
+    Transactions for the scoring pipeline
+    - columns: defaults to dat, suburb, price
+    - start / end: inclusive sale-date bounds, pushed down to row groups
+    - suburbs: keep only these suburbs, pushed down to row groups
+    - categorical: load suburb as a pandas categorical
+    """
+    filters = _filters('suburb', suburbs, 'dat', start, end)
+    df = _read(path, list(columns), filters,
+               ['suburb'] if categorical and 'suburb' in columns else [])
+    if 'dat' in df.columns:
+        df['dat'] = pd.to_datetime(df['dat'])
+    return df
+
+def read_gnaf(path, columns=GNAF_COLUMNS, suburbs=None, categorical=True):
+    """
+    GNAF addresses for the dwelling stock proxy
+    - columns: defaults to locality_name (all dwelling_stock needs)
+    - suburbs: keep only these localities, pushed down to row groups
+    - categorical: load locality_name as a pandas categorical
+    """
+    filters = _filters('locality_name', suburbs)
+    return _read(path, list(columns), filters,
+                 ['locality_name'] if categorical and 'locality_name' in columns else [])
+
+def suburb_states(paths, suburbs=None):
+    """
+    Most common state per suburb across transaction files (ties: first alphabetically)
+    - Files without a state column are skipped
+    - Returns a Series of states indexed by suburb
+    """
+    counts = []
+    for path in paths:
+        if 'state' not in ds.dataset(path).schema.names:
+            continue
+        df = _read(path, ['suburb', 'state'], _filters('suburb', suburbs), []).dropna()
+        counts.append(df.astype(str).value_counts())
+    if not counts:
+        return pd.Series(dtype=str)
+    
+    counts = pd.concat(counts).groupby(level=['suburb', 'state']).sum().rename('count').reset_index()
+    counts = counts.sort_values(['suburb', 'count', 'state'], ascending=[True, False, True])
+    return counts.drop_duplicates('suburb').set_index('suburb')['state']
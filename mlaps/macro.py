@@ -0,0 +1,184 @@
+"""
+MLAPS v2: Macro liquidity series
+- Seeded synthetic proxy (same series for the same date range and seed)
+- Loaders for real indices (e.g. M2, BTC) from CSV or parquet files
+- Weekly returns are the common form; quarterly aggregates per lead are memoised
+- MacroLibrary: persisted, content-versioned weekly series
+"""
+
+import functools
+import hashlib
+import json
+import os
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from .defaults import MACRO_DIR
+
+MACRO_SEED = 0
+MACRO_COLUMNS = ['date', 'macro_return']
+
+def synthetic_macro(start, end, seed=MACRO_SEED):
+    """
+    Synthetic weekly macro returns between two dates
+    - Two-year and half-year cycles plus Gaussian noise
+    - Noise from np.random.RandomState(seed): the same draws the original
+      script got after np.random.seed(seed), and a later end date only
+      appends weeks
+    """
+    dates = pd.date_range(start=start, end=end, freq='W')
+    
+    t = np.arange(len(dates))
+    long_cycle = 0.05 * np.sin(2 * np.pi * t / 104)
+    medium_cycle = 0.03 * np.sin(2 * np.pi * t / 26)
+    noise = 0.02 * np.random.RandomState(seed).randn(len(dates))
+    macro_returns = long_cycle + medium_cycle + noise
+    
+    return pd.DataFrame({'date': dates, 'macro_return': macro_returns})
+
+def get_macro_proxy(transactions_df, seed=MACRO_SEED):
+    """Generate macro liquidity proxy (seeded, covers the transactions' date range plus a 10-week lead)"""
+    start_date = transactions_df['dat'].min() - pd.DateOffset(weeks=10)
+    end_date = transactions_df['dat'].max()
+    return synthetic_macro(start_date, end_date, seed)
+
+def _read_table(path):
+    path = Path(path)
+    if path.suffix.lower() in ('.parquet', '.pq'):
+        return pd.read_parquet(path)
+    return pd.read_csv(path)
+
+def _first_column(df, columns, test, what, option):
+    """First of columns whose values mostly (> 90%) pass test, or a ValueError naming the file's columns"""
+    for c in columns:
+        if test(df[c]).notna().mean() > 0.9:
+            return c
+    raise ValueError(f"no {what} column among {', '.join(map(str, df.columns))}; "
+                     f"name it with {option}")
+
+def read_macro_file(path, date_column=None, value_column=None, kind='level'):
+    """
+    Weekly macro returns from a CSV or parquet file of a real index
+    - date_column: default the first non-numeric column that parses as dates
+      (numbers would parse as epoch offsets)
+    - value_column: default the first other numeric column
+    - kind='level' (index level or price, e.g. M2 or BTC close): weekly
+      close, time-interpolated for monthly series, then week-on-week change
+    - kind='return' (periodic returns): compounded within each week
+    """
+    df = _read_table(path)
+    if date_column is None:
+        date_column = _first_column(df, [c for c in df.columns if not pd.api.types.is_numeric_dtype(df[c])],
+                                    lambda values: pd.to_datetime(values, errors='coerce'),
+                                    'date', 'date_column')
+    if value_column is None:
+        value_column = _first_column(df, [c for c in df.columns if c != date_column],
+                                     lambda values: pd.to_numeric(values, errors='coerce'),
+                                     'numeric value', '--macro-column (value_column)')
+    
+    values = pd.Series(pd.to_numeric(df[value_column], errors='coerce').to_numpy(),
+                       index=pd.to_datetime(df[date_column], errors='coerce')).dropna()
+    values = values[values.index.notna()].sort_index()
+    values = values[~values.index.duplicated(keep='last')]
+    
+    if kind == 'level':
+        weekly = values.resample('W').last().interpolate(method='time').pct_change()
+    elif kind == 'return':
+        weekly = (1 + values).resample('W').prod(min_count=1) - 1
+    else:
+        raise ValueError(f"kind must be 'level' or 'return', not {kind!r}")
+    
+    weekly = weekly.dropna()
+    return pd.DataFrame({'date': weekly.index, 'macro_return': weekly.to_numpy(dtype=float)})
+
+def series_version(macro_df):
+    """Content version of a weekly series: first 12 hex digits of a SHA-256 over dates and returns"""
+    digest = hashlib.sha256()
+    digest.update(pd.DatetimeIndex(macro_df['date']).asi8.tobytes())
+    digest.update(macro_df['macro_return'].to_numpy(dtype=float).tobytes())
+    return digest.hexdigest()[:12]
+
+class _Weekly:
+    """Hashable handle on a weekly series (by content), so lru_cache can key on it"""
+    
+    def __init__(self, macro_df):
+        self.df = macro_df
+        self.version = series_version(macro_df)
+    
+    def __hash__(self):
+        return hash(self.version)
+    
+    def __eq__(self, other):
+        return self.version == other.version
+
+@functools.lru_cache(maxsize=256)
+def _lead_quarterly(weekly, lead_weeks):
+    macro_df = weekly.df
+    year_quarter = (macro_df['date'] + pd.DateOffset(weeks=lead_weeks)).dt.to_period('Q')
+    return macro_df.groupby(year_quarter.rename('year_quarter'))['macro_return'].mean().reset_index()
+
+def macro_quarterly(macro_df, lead_weeks=10):
+    """
+    Quarterly mean macro return, with dates shifted forward by lead_weeks
+    - Memoised per series content and lead (lead sweeps, rolling history and
+      backtests reuse the same series many times)
+    """
+    return _lead_quarterly(_Weekly(macro_df), lead_weeks).copy()
+
+class MacroLibrary:
+    """
+    Persisted macro series, one directory per name
+    - <name>/<version>.parquet: weekly returns (quarterly means per lead come
+      from macro_quarterly, memoised per series version)
+    - <name>/versions.json: every saved version with its source, newest last
+    - Versions are content hashes, so saving the same series twice is a no-op
+    """
+    
+    def __init__(self, directory=MACRO_DIR):
+        self.directory = Path(directory)
+    
+    def _versions_path(self, name):
+        return self.directory / name / 'versions.json'
+    
+    def versions(self, name):
+        try:
+            return json.loads(self._versions_path(name).read_text())
+        except (OSError, ValueError):
+            return []
+    
+    def save(self, name, macro_df, source=None):
+        """Persist a weekly series; returns its version"""
+        macro_df = macro_df[MACRO_COLUMNS].sort_values('date').reset_index(drop=True)
+        version = series_version(macro_df)
+        versions = self.versions(name)
+        if any(entry['version'] == version for entry in versions):
+            return version
+        
+        series_dir = self.directory / name
+        series_dir.mkdir(parents=True, exist_ok=True)
+        path = series_dir / f'{version}.parquet'
+        tmp_path = path.with_suffix(f'.{os.getpid()}.tmp')
+        macro_df.to_parquet(tmp_path, index=False)
+        os.replace(tmp_path, path)
+        
+        versions.append({'version': version, 'source': None if source is None else str(source),
+                         'weeks': len(macro_df), 'first_week': str(macro_df['date'].min()),
+                         'last_week': str(macro_df['date'].max())})
+        tmp_path = self._versions_path(name).with_suffix(f'.{os.getpid()}.tmp')
+        tmp_path.write_text(json.dumps(versions, indent=2))
+        os.replace(tmp_path, self._versions_path(name))
+        return version
+    
+    def _version(self, name, version):
+        if version is None:
+            versions = self.versions(name)
+            if not versions:
+                raise FileNotFoundError(f"no saved macro series named {name!r} in {self.directory}")
+            version = versions[-1]['version']
+        return version
+    
+    def load(self, name, version=None):
+        """Weekly series (latest version by default)"""
+        return pd.read_parquet(self.directory / name / f'{self._version(name, version)}.parquet')
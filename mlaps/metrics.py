@@ -0,0 +1,202 @@
+"""
+MLAPS v2: Liquidity, momentum and drawdown components
+- LML: 12-month turnover (% per year)
+- MOM: annualized growth with 2.5/97.5 winsorization
+- DDR: smoothed, capped max drawdown over quarterly medians
+"""
+
+import numpy as np
+import pandas as pd
+
+from .panel import build_quarterly_panel, pack_panel
+
+def dwelling_stock(gnaf_df):
+    """Dwelling stock per suburb (GNAF address count per locality, or a precomputed stock index)"""
+    if 'dwelling_stock' in gnaf_df.columns:
+        return gnaf_df.groupby('suburb', observed=True)['dwelling_stock'].sum().reset_index()
+    stock = gnaf_df.groupby('locality_name', observed=True).size().reset_index(name='dwelling_stock')
+    return stock.rename(columns={'locality_name': 'suburb'})
+
+def calculate_lml_v2(transactions_df, gnaf_df, as_of=None):
+    """
+    LML = (12-month sales ÷ dwelling stock) × 100
+    Now displays as % per year (not just %)
+    - The 12 months end at as_of (default: latest sale in transactions_df)
+    """
+    if as_of is None:
+        as_of = transactions_df['dat'].max()
+    cutoff_date = as_of - pd.DateOffset(months=12)
+    recent_sales = transactions_df[transactions_df['dat'] >= cutoff_date]
+    
+    sales_12m = recent_sales.groupby('suburb', observed=True).size().reset_index(name='sales_12m')
+    return lml_from_sales(sales_12m, gnaf_df)
+
+def lml_from_sales(sales_12m, gnaf_df):
+    """LML from 12-month sales counts per suburb (suburb, sales_12m)"""
+    lml_df = sales_12m.merge(dwelling_stock(gnaf_df), on='suburb', how='left')
+    lml_df['dwelling_stock'] = lml_df['dwelling_stock'].fillna(lml_df['sales_12m'] * 10)
+    
+    # Express as % per year
+    lml_df['LML'] = (lml_df['sales_12m'] / lml_df['dwelling_stock']) * 100
+    
+    # Add reliability flag
+    lml_df['lml_reliable'] = lml_df['sales_12m'] >= 5
+    
+    return lml_df[['suburb', 'LML', 'sales_12m', 'dwelling_stock', 'lml_reliable']]
+
+def calculate_momentum_v2(transactions_df, min_sales=15):
+    """
+    MOM = Annualized price growth with winsorization
+    - Trims outliers at 2.5/97.5 percentiles
+    - Requires minimum 15 sales
+    - Uses 6-month rolling median for stability
+    - Single sort + grouped pass (no per-suburb filtering)
+    """
+    columns = ['suburb', 'MOM', 'latest_price', 'time_span_years', 'mom_reliable']
+    
+    # Suburb codes in order of first appearance, keeping suburbs with enough sales
+    codes, uniques = pd.factorize(transactions_df['suburb'])
+    counts = np.bincount(codes[codes >= 0], minlength=len(uniques))
+    keep = np.append(counts >= min_sales, False)[codes]  # code -1 (missing suburb) maps to False
+    if not keep.any():
+        return pd.DataFrame(columns=columns)
+    
+    # One stable sort by (suburb, date) replaces the per-suburb filter + sort
+    dat_ns = transactions_df['dat'].to_numpy().astype('datetime64[ns]').view('i8')[keep]
+    prices = transactions_df['price'].to_numpy(dtype=float)[keep]
+    suburbs = transactions_df['suburb'].to_numpy()[keep]
+    codes = codes[keep]
+    order = np.lexsort((dat_ns, codes))
+    codes, dat_ns, prices, suburbs = codes[order], dat_ns[order], prices[order], suburbs[order]
+    
+    _, group_start, group_n = np.unique(codes, return_index=True, return_counts=True)
+    group_idx = np.repeat(np.arange(len(group_n)), group_n)
+    position = np.arange(len(codes)) - group_start[group_idx]
+    
+    # Winsorize prices at 2.5/97.5 percentiles per suburb
+    grouped = pd.Series(prices).groupby(group_idx)
+    lower = grouped.quantile(0.025).to_numpy()
+    upper = grouped.quantile(0.975).to_numpy()
+    prices_winsorized = np.clip(prices, lower[group_idx], upper[group_idx])
+    
+    # First/last 30% of each suburb's sales (iloc[:k] and iloc[-k:], where iloc[-0:] is everything)
+    k = (group_n * 0.3).astype(int)
+    older_mask = position < k[group_idx]
+    recent_mask = position >= np.where(k > 0, group_n - k, 0)[group_idx]
+    
+    def window_median(values, mask):
+        medians = pd.Series(values[mask]).groupby(group_idx[mask]).median()
+        return medians.reindex(np.arange(len(group_n))).to_numpy()
+    
+    recent_median = window_median(prices_winsorized, recent_mask)
+    older_median = window_median(prices_winsorized, older_mask)
+    
+    time_span_ns = window_median(dat_ns, recent_mask) - window_median(dat_ns, older_mask)
+    
+    return momentum_from_windows(suburbs[group_start], recent_median, older_median, time_span_ns)
+
+def momentum_from_windows(suburbs, recent_median, older_median, time_span_ns):
+    """
+    Annualized MOM from per-suburb window medians
+    - recent_median / older_median: medians of winsorized prices in the last / first 30% of sales
+    - time_span_ns: difference of the windows' median sale dates
+    """
+    time_span_days = np.floor(time_span_ns / pd.Timedelta(days=1).value)
+    time_span_years = np.maximum(time_span_days / 365.25, 0.5)
+    
+    total_growth = (recent_median / older_median) - 1
+    annualized_growth = ((1 + total_growth) ** (1 / time_span_years)) - 1
+    
+    return pd.DataFrame({
+        'suburb': suburbs,
+        'MOM': annualized_growth * 100,
+        'latest_price': recent_median,
+        'time_span_years': time_span_years,
+        'mom_reliable': True
+    })
+
+def drawdown_batch(prices, lengths, smooth_window=3):
+    """
+    Smoothed max drawdown for many suburbs at once
+    - prices: padded suburb × quarter matrix from pack_panel
+    - Same centred moving average (min_periods=1) as pandas rolling
+    - Returns (DDR, peak_price) per row
+    """
+    n_rows, n_cols = prices.shape
+    valid = np.arange(n_cols) < lengths[:, None]
+    observed = valid & ~np.isnan(prices)
+    filled = np.where(observed, prices, 0.0)
+    
+    # Centred window covers [i - w//2, i + (w-1)//2], like rolling(center=True)
+    window_sum = np.zeros_like(filled)
+    window_count = np.zeros_like(filled)
+    for offset in range(-(smooth_window // 2), (smooth_window - 1) // 2 + 1):
+        src = slice(max(offset, 0), n_cols + min(offset, 0))
+        dst = slice(max(-offset, 0), n_cols - max(offset, 0))
+        window_sum[:, dst] += filled[:, src]
+        window_count[:, dst] += observed[:, src]
+    
+    with np.errstate(invalid='ignore', divide='ignore'):
+        smooth = np.where(valid & (window_count > 0), window_sum / window_count, np.nan)
+        
+        # Running peak and drawdown, padding stays NaN
+        running_max = np.where(valid, np.fmax.accumulate(smooth, axis=1), np.nan)
+        drawdown = (smooth - running_max) / running_max
+        max_drawdown = np.nanmin(np.where(valid, drawdown, np.inf), axis=1) * 100
+        
+        # Cap at -35% to avoid extreme outliers
+        max_drawdown = np.maximum(max_drawdown, -35.0)
+        
+        # If no significant drawdown, use price volatility (population std, like ndarray.std)
+        mean = np.nansum(smooth, axis=1) / lengths
+        std = np.sqrt(np.nansum((smooth - mean[:, None]) ** 2, axis=1) / lengths)
+        cv = (std / mean) * 100
+        max_drawdown = np.where(max_drawdown > -5, -np.minimum(cv, 35.0), max_drawdown)
+    
+    peak_price = np.nanmax(np.where(valid, running_max, -np.inf), axis=1)
+    
+    return max_drawdown, peak_price
+
+def calculate_drawdown_v2(transactions_df, min_quarters=8, smooth_window=3, panel=None, chunk_size=None):
+    """
+    DDR = Maximum drawdown with improvements:
+    - 3-quarter moving average for smoothing
+    - Winsorized prices
+    - Capped at -35% floor to avoid outliers
+    - 24-month lookback (8 quarters minimum)
+    - Reads quarterly medians from the shared panel when one is given
+    - All suburbs computed as one padded matrix, or chunk_size suburbs at a time
+    """
+    columns = ['suburb', 'DDR', 'peak_price', 'lookback_quarters', 'ddr_reliable']
+    
+    if panel is None:
+        panel = build_quarterly_panel(transactions_df)
+    
+    eligible = panel[panel['suburb_sales'] >= 15]
+    eligible = eligible[eligible.groupby('suburb', observed=True)['n_sales'].transform('size') >= min_quarters]
+    
+    # Keep each suburb's rows contiguous so chunks are plain row slices
+    codes, suburbs = pd.factorize(eligible['suburb'])
+    order = np.argsort(codes, kind='stable')
+    eligible, codes = eligible.iloc[order], codes[order]
+    
+    chunk_size = chunk_size or max(len(suburbs), 1)
+    drawdown_frames = []
+    
+    for start in range(0, len(suburbs), chunk_size):
+        lo, hi = np.searchsorted(codes, [start, start + chunk_size])
+        chunk_suburbs, lengths, prices = pack_panel(eligible.iloc[lo:hi], 'price_winsorized')
+        max_drawdown, peak_price = drawdown_batch(prices, lengths, smooth_window)
+        
+        drawdown_frames.append(pd.DataFrame({
+            'suburb': chunk_suburbs,
+            'DDR': max_drawdown,
+            'peak_price': peak_price,
+            'lookback_quarters': lengths,
+            'ddr_reliable': lengths >= min_quarters
+        }))
+    
+    if not drawdown_frames:
+        return pd.DataFrame(columns=columns)
+    
+    return pd.concat(drawdown_frames, ignore_index=True)
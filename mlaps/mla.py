@@ -0,0 +1,241 @@
+"""
+MLAPS v2: Macro Liquidity Alignment (MLA)
+- Correlation against a weekly macro series (see macro)
+- Batched correlation, significance and Fisher CI per suburb
+- Lead sweep over many macro leads in one pass
+- Multi-factor MLA (correlations and betas) against several macro series
+"""
+
+import numpy as np
+import pandas as pd
+
+from .macro import macro_quarterly
+from .panel import build_quarterly_panel, pack_panel, quarter_ordinal
+
+def mla_batch(returns, macro):
+    """
+    Pearson correlation of every row against the macro series at once
+    - returns: suburb × quarter matrix (NaN = no observation)
+    - macro: macro returns on the same quarters, 1-D or same shape as returns;
+      both may carry extra leading axes (e.g. suburb × factor × quarter)
+    - Uses pairwise-complete quarters, like an inner merge + dropna
+    - Returns (corr, p_value, ci_lower, ci_upper, n) per row
+    """
+    from scipy import stats
+    
+    returns, macro = np.broadcast_arrays(returns, macro)
+    valid = ~np.isnan(returns) & ~np.isnan(macro)
+    n = valid.sum(axis=-1)
+    
+    with np.errstate(invalid='ignore', divide='ignore'):
+        x = np.where(valid, returns, 0.0)
+        y = np.where(valid, macro, 0.0)
+        x = np.where(valid, x - (x.sum(axis=-1) / n)[..., None], 0.0)
+        y = np.where(valid, y - (y.sum(axis=-1) / n)[..., None], 0.0)
+        corr = (x * y).sum(axis=-1) / np.sqrt((x * x).sum(axis=-1) * (y * y).sum(axis=-1))
+        corr = np.clip(corr, -1.0, 1.0)
+        
+        # Two-sided t-test on n - 2 degrees of freedom
+        t_stat = corr * np.sqrt((n - 2) / (1 - corr ** 2))
+        p_value = 2 * stats.t.sf(np.abs(t_stat), n - 2)
+        
+        # Fisher z-transform for CI
+        z = np.arctanh(corr)
+        se = 1 / np.sqrt(n - 3)
+        ci_lower = np.tanh(z - 1.96 * se)
+        ci_upper = np.tanh(z + 1.96 * se)
+    
+    return corr, p_value, ci_lower, ci_upper, n
+
+def factor_betas(returns, factors):
+    """
+    Multi-factor OLS betas for every row at once
+    - returns: suburb × quarter; factors: suburb × factor × quarter
+    - Each suburb regresses on all factors plus an intercept, over the quarters
+      where its return and every factor are observed
+    - Solved as one batch of normal equations (X'X) b = X'y
+    - Returns (betas suburb × factor, r_squared, n); NaN where there are
+      fewer quarters than coefficients or X'X is singular
+    """
+    n_rows, n_factors, _ = factors.shape
+    valid = ~np.isnan(returns) & ~np.isnan(factors).any(axis=1)
+    n = valid.sum(axis=1)
+    
+    # Design matrix suburb × quarter × (intercept + factors), zero outside valid quarters
+    X = np.concatenate([np.ones_like(returns)[:, :, None], factors.transpose(0, 2, 1)], axis=2)
+    X = np.where(valid[:, :, None], X, 0.0)
+    y = np.where(valid, returns, 0.0)
+    
+    xtx = np.einsum('sqi,sqj->sij', X, X)
+    xty = np.einsum('sqi,sq->si', X, y)
+    solvable = (n > n_factors + 1) & (np.linalg.matrix_rank(xtx) == n_factors + 1)
+    coef = np.full((n_rows, n_factors + 1), np.nan)
+    if solvable.any():
+        coef[solvable] = np.linalg.solve(xtx[solvable], xty[solvable][:, :, None])[:, :, 0]
+    
+    with np.errstate(invalid='ignore', divide='ignore'):
+        fitted = np.einsum('sqi,si->sq', X, np.nan_to_num(coef))
+        mean = y.sum(axis=1) / n
+        ss_res = np.where(valid, (y - fitted) ** 2, 0.0).sum(axis=1)
+        ss_tot = np.where(valid, (y - mean[:, None]) ** 2, 0.0).sum(axis=1)
+        r_squared = np.where(solvable, 1 - ss_res / ss_tot, np.nan)
+    
+    return coef[:, 1:], r_squared, n
+
+def row_nanquantile(matrix, q):
+    """
+    Same as np.nanquantile(matrix, q, axis=1) (linear method), without the
+    per-row Python loop numpy falls back to for NaN-padded rows
+    """
+    ordered = np.sort(matrix, axis=1)  # NaN sorts last
+    count = (~np.isnan(matrix)).sum(axis=1)
+    position = q * (count - 1)
+    below = np.floor(position).astype(np.int64)
+    rows = np.arange(len(matrix))
+    low = ordered[rows, np.clip(below, 0, None)]
+    high = ordered[rows, np.clip(below + 1, 0, np.maximum(count - 1, 0))]
+    
+    # numpy's lerp: from the nearer end, so t = 0 and t = 1 are exact
+    t = position - below
+    with np.errstate(invalid='ignore'):
+        diff = high - low
+        result = np.where(t >= 0.5, high - diff * (1 - t), low + diff * t)
+    return np.where(count > 0, result, np.nan)
+
+def quarterly_returns(panel, min_sales=15, min_quarters=10):
+    """
+    Winsorized quarterly returns per suburb, as a padded matrix
+    - Returns between consecutive observed quarters
+    - Winsorized at 2.5/97.5 percentiles per suburb
+    - Returns (suburbs, quarter ordinals, returns) with NaN padding
+    """
+    eligible = panel[panel['suburb_sales'] >= min_sales]
+    eligible = eligible[eligible.groupby('suburb', observed=True)['n_sales'].transform('size') >= min_quarters]
+    eligible = eligible.assign(quarter=quarter_ordinal(eligible['year_quarter']))
+    
+    suburbs, lengths, prices = pack_panel(eligible, 'price')
+    _, _, quarters = pack_panel(eligible, 'quarter')
+    
+    price_return = np.full_like(prices, np.nan)
+    price_return[:, 1:] = prices[:, 1:] / prices[:, :-1] - 1
+    
+    lower = row_nanquantile(price_return, 0.025)
+    upper = row_nanquantile(price_return, 0.975)
+    
+    return suburbs, quarters, np.clip(price_return, lower[:, None], upper[:, None])
+
+def align_macro(macro_q, quarters):
+    """Macro return for each cell of a quarter matrix (NaN where the macro has no quarter)"""
+    macro_lookup = pd.Series(macro_q['macro_return'].to_numpy(dtype=float),
+                             index=quarter_ordinal(macro_q['year_quarter']))
+    return macro_lookup.reindex(quarters.ravel()).to_numpy().reshape(quarters.shape)
+
+def calculate_mla_v2(transactions_df, macro_df, lead_weeks=10, window_months=36, panel=None):
+    """
+    MLA with statistical significance testing
+    - Returns correlation, p-value, and confidence interval
+    - Flags non-significant correlations
+    - Reads quarterly medians from the shared panel when one is given
+    - All suburbs correlated in one batched matrix operation
+    """
+    if panel is None:
+        panel = build_quarterly_panel(transactions_df)
+    
+    suburbs, quarters, price_return_w = quarterly_returns(panel)
+    macro_aligned = align_macro(macro_quarterly(macro_df, lead_weeks), quarters)
+    
+    corr, p_value, ci_lower, ci_upper, n = mla_batch(price_return_w, macro_aligned)
+    
+    mla_df = pd.DataFrame({
+        'suburb': suburbs,
+        'MLA': np.nan_to_num(corr, nan=0.0),
+        'MLA_pvalue': p_value,
+        'MLA_ci_lower': ci_lower,
+        'MLA_ci_upper': ci_upper,
+        'MLA_significant': p_value < 0.10,  # Flag if significant at 10% level
+        'MLA_n': n,
+        'data_points': n
+    })
+    
+    return mla_df[n >= 10].reset_index(drop=True)
+
+def calculate_mla_multi(transactions_df, macro_series, lead_weeks=10, panel=None, betas=False):
+    """
+    MLA against K macro series at once (e.g. M2, rates, credit growth)
+    - macro_series: {name: weekly frame (date, macro_return)}
+    - Suburb returns are built once; factors are aligned into a
+      suburb × factor × quarter array and correlated in one batch
+    - betas: also fit every suburb's returns on all factors jointly (factor_betas)
+    - Returns (suburb × factor correlation table, long frame with one row per
+      suburb and factor: MLA, p-value, CI, significance, n [, beta, r_squared])
+    """
+    if panel is None:
+        panel = build_quarterly_panel(transactions_df)
+    
+    names = list(macro_series)
+    suburbs, quarters, price_return_w = quarterly_returns(panel)
+    factors = np.stack([align_macro(macro_quarterly(macro_series[name], lead_weeks), quarters)
+                        for name in names], axis=1)
+    
+    corr, p_value, ci_lower, ci_upper, n = mla_batch(price_return_w[:, None, :], factors)
+    corr = np.where(n >= 10, corr, np.nan)
+    
+    corr_table = pd.DataFrame(corr, index=pd.Index(suburbs, name='suburb'),
+                              columns=pd.Index(names, name='factor'))
+    
+    factor_stats = pd.DataFrame({
+        'suburb': np.repeat(suburbs, len(names)),
+        'factor': np.tile(names, len(suburbs)),
+        'MLA': corr.ravel(),
+        'MLA_pvalue': p_value.ravel(),
+        'MLA_ci_lower': ci_lower.ravel(),
+        'MLA_ci_upper': ci_upper.ravel(),
+        'MLA_significant': p_value.ravel() < 0.10,
+        'MLA_n': n.ravel()
+    })
+    if betas:
+        beta, r_squared, beta_n = factor_betas(price_return_w, factors)
+        beta = np.where((beta_n >= 10)[:, None], beta, np.nan)
+        factor_stats['beta'] = beta.ravel()
+        factor_stats['r_squared'] = np.repeat(np.where(beta_n >= 10, r_squared, np.nan), len(names))
+    
+    return corr_table, factor_stats[factor_stats['MLA_n'] >= 10].reset_index(drop=True)
+
+def calculate_mla_lead_sweep(transactions_df, macro_df, leads=range(0, 53), panel=None):
+    """
+    MLA for a range of macro leads (weeks) in one pass
+    - Suburb returns are built once and reused for every lead
+    - Only the weekly macro series is re-shifted and re-aggregated per lead
+    - Returns (suburb × lead correlation table, best lead per suburb)
+    """
+    if panel is None:
+        panel = build_quarterly_panel(transactions_df)
+    
+    leads = list(leads)
+    suburbs, quarters, price_return_w = quarterly_returns(panel)
+    
+    corr_by_lead = np.full((len(suburbs), len(leads)), np.nan)
+    pvalue_by_lead = np.full((len(suburbs), len(leads)), np.nan)
+    
+    for i, lead in enumerate(leads):
+        macro_aligned = align_macro(macro_quarterly(macro_df, lead), quarters)
+        corr, p_value, _, _, n = mla_batch(price_return_w, macro_aligned)
+        corr_by_lead[:, i] = np.where(n >= 10, corr, np.nan)
+        pvalue_by_lead[:, i] = np.where(n >= 10, p_value, np.nan)
+    
+    lead_table = pd.DataFrame(corr_by_lead, index=pd.Index(suburbs, name='suburb'),
+                              columns=pd.Index(leads, name='lead_weeks'))
+    
+    # Best lead = highest correlation, for suburbs with at least one usable lead
+    has_corr = ~np.isnan(corr_by_lead).all(axis=1)
+    best = np.nanargmax(np.where(has_corr[:, None], corr_by_lead, 0.0), axis=1)
+    rows = np.arange(len(suburbs))
+    best_leads = pd.DataFrame({
+        'suburb': suburbs,
+        'best_lead_weeks': np.asarray(leads)[best],
+        'MLA': corr_by_lead[rows, best],
+        'MLA_pvalue': pvalue_by_lead[rows, best]
+    })[has_corr].reset_index(drop=True)
+    best_leads['MLA_significant'] = best_leads['MLA_pvalue'] < 0.10
+    
+    return lead_table, best_leads
@@ -0,0 +1,55 @@
+"""
+MLAPS v2: Suburb × quarter price panel
+- Built once per run and shared by DDR and MLA
+- Helpers to lay panel columns out as padded NumPy matrices
+"""
+
+import numpy as np
+import pandas as pd
+
+def build_quarterly_panel(transactions_df, lower_q=0.05, upper_q=0.95):
+    """
+    Suburb × quarter price panel shared by DDR and MLA
+    - Built in one groupby over (suburb, year_quarter)
+    - price: quarterly median, n_sales: quarterly sales count
+    - price_winsorized: quarterly median after 5/95 winsorization per suburb
+    - suburb_sales: total sales per suburb (minimum-sample filter)
+    - Works on a copy, the caller's frame is not modified
+    """
+    df = transactions_df[['suburb', 'dat', 'price']].copy()
+    df['year_quarter'] = df['dat'].dt.to_period('Q')
+    
+    # Winsorize prices per suburb
+    by_suburb = df.groupby('suburb', observed=True)['price']
+    lower = by_suburb.transform('quantile', lower_q)
+    upper = by_suburb.transform('quantile', upper_q)
+    df['price_winsorized'] = df['price'].clip(lower, upper)
+    
+    panel = df.groupby(['suburb', 'year_quarter'], observed=True).agg(
+        price=('price', 'median'),
+        price_winsorized=('price_winsorized', 'median'),
+        n_sales=('price', 'size')
+    ).reset_index()
+    panel['suburb_sales'] = panel.groupby('suburb', observed=True)['n_sales'].transform('sum')
+    
+    return panel
+
+def quarter_ordinal(year_quarter):
+    """Consecutive integer per quarter, so quarters can index NumPy arrays"""
+    return (year_quarter.dt.year * 4 + year_quarter.dt.quarter - 1).to_numpy()
+
+def pack_panel(panel, column):
+    """
+    Lay one panel column out as a padded suburb × quarter matrix
+    - Each row holds one suburb's quarters in order, left-aligned
+    - Rows shorter than the longest suburb are padded with NaN
+    - Returns (suburbs, quarters per suburb, matrix)
+    """
+    codes, suburbs = pd.factorize(panel['suburb'])
+    lengths = np.bincount(codes, minlength=len(suburbs))
+    position = panel.groupby(codes, sort=False).cumcount().to_numpy()
+    
+    matrix = np.full((len(suburbs), lengths.max(initial=0)), np.nan)
+    matrix[codes, position] = panel[column].to_numpy(dtype=float)
+    
+    return np.asarray(suburbs), lengths, matrix
@@ -0,0 +1,273 @@
+"""
+MLAPS v2: Seven-step scoring pipeline
+- load_data: step 1 (transactions + dwelling stock proxy)
+- run_pipeline: steps 2-6 (components and composite)
+- run_pipeline_streaming: steps 1-6 for transaction files larger than memory
+- run_pipeline_update: steps 1-6 for new sales appended to a persisted store
+- print_report: results summary as printed by the original script
+"""
+
+from pathlib import Path
+
+import pandas as pd
+
+from .composite import combine_components, score_mlaps
+from .defaults import DATA_DIR
+from .loaders import read_transactions, require_transactions
+from .macro import get_macro_proxy
+from .metrics import calculate_drawdown_v2, dwelling_stock
+from .mla import calculate_mla_v2
+from .scheduler import STAGE_PARAMS, compute_stage, run_stages
+from .stock import load_dwelling_stock
+from .store import changed_macro_quarters, extend_macro, sources_to_load, splice
+from .streaming import BATCH_ROWS, stream_components
+
+def _quiet(*args, **kwargs):
+    pass
+
+def load_data(data_dir=DATA_DIR, verbose=True, start=None, end=None, suburbs=None, rebuild_stock=False):
+    """
+    Step 1: load transactions (sorted by date) and the dwelling stock proxy
+    - Only the columns the pipeline uses are read (see loaders)
+    - start / end / suburbs are pushed down to the parquet reader; a
+      ValueError names them when no transaction matches
+    - Dwelling stock comes from the persisted index (see stock), GNAF
+      itself is only read when the index is missing or stale
+    """
+    log = print if verbose else _quiet
+    data_dir = Path(data_dir)
+    
+    log("\n[1/7] Loading property data...")
+    
+    transactions_path = data_dir / 'transactions.parquet'
+    transactions = read_transactions(transactions_path, start=start, end=end, suburbs=suburbs)
+    require_transactions(len(transactions), transactions_path, start, end, suburbs)
+    transactions = transactions.sort_values('dat')
+    
+    stock = load_dwelling_stock(data_dir / 'gnaf_prop.parquet', suburbs=suburbs, rebuild=rebuild_stock)
+    
+    log(f"  ✓ Loaded {len(transactions):,} transactions")
+    log(f"  ✓ Loaded {int(stock['dwelling_stock'].sum()):,} properties (dwelling stock proxy)")
+    log(f"  ✓ Date range: {transactions['dat'].min().date()} to {transactions['dat'].max().date()}")
+    
+    return transactions, stock
+
+def run_pipeline(transactions, gnaf, macro_proxy=None, verbose=True, cache=None, workers=None, shards=None):
+    """
+    Steps 2-6: LML, MOM, DDR, MLA and the MLAPS composite
+    - gnaf: GNAF addresses or the dwelling stock index from load_data
+    - macro_proxy defaults to the seeded synthetic weekly series from
+      get_macro_proxy; pass a real index from macro.read_macro_file instead
+    - cache: optional StageCache; stage outputs are reused when inputs and
+      parameters are unchanged, only the composite is always recomputed
+    - workers: processes for the metric stages (see scheduler.run_stages); by
+      default in-process below scheduler.PARALLEL_MIN_ROWS transactions
+    - shards: hash-partition suburbs into this many shards, each computing
+      every stage; normalisation and ranking stay global
+    - Returns a dict of stage outputs: lml, mom, panel, ddr, macro, mla, mlaps, weighting
+    """
+    log = print if verbose else _quiet
+    
+    if macro_proxy is None:
+        macro_proxy = get_macro_proxy(transactions)
+    stages = run_stages(transactions, gnaf, macro_proxy, cache=cache, workers=workers, shards=shards)
+    return score_stages(stages, macro_proxy, log, cache)
+
+def run_pipeline_streaming(transactions_path, gnaf, macro_proxy=None, verbose=True, batch_rows=BATCH_ROWS,
+                           start=None, end=None, suburbs=None, relative_error=None):
+    """
+    Steps 1-6 without loading transactions into memory
+    - LML, MOM and the panel come from streaming.stream_components;
+      DDR and MLA then run on the panel as usual
+    - relative_error: approximate panel from quantile sketches (see sketches)
+    - gnaf: GNAF addresses or the dwelling stock index (see stock)
+    - Returns the same dict as run_pipeline
+    """
+    log = print if verbose else _quiet
+    
+    log("\n[1/7] Streaming property data...")
+    stages, summary = stream_components(transactions_path, gnaf, min_sales=STAGE_PARAMS['mom']['min_sales'],
+                                        batch_rows=batch_rows, start=start, end=end, suburbs=suburbs,
+                                        relative_error=relative_error)
+    log(f"  ✓ Streamed {summary['transactions']:,} transactions in {summary['batches']} batches")
+    if relative_error is not None:
+        log(f"  ✓ Quarterly medians and winsorization bounds from sketches (±{relative_error:.2%})")
+    log(f"  ✓ Loaded {int(dwelling_stock(gnaf)['dwelling_stock'].sum()):,} properties (dwelling stock proxy)")
+    if summary['transactions'] > 0:
+        log(f"  ✓ Date range: {summary['first_sale'].date()} to {summary['last_sale'].date()}")
+    
+    if macro_proxy is None:
+        macro_proxy = get_macro_proxy(pd.DataFrame({'dat': [summary['first_sale'], summary['last_sale']]}))
+    stages['ddr'] = calculate_drawdown_v2(None, panel=stages['panel'], **STAGE_PARAMS['ddr'])
+    stages['mla'] = calculate_mla_v2(None, macro_proxy, panel=stages['panel'], **STAGE_PARAMS['mla'])
+    return score_stages(stages, macro_proxy, log)
+
+def run_pipeline_update(store, new_paths, gnaf, seed_path=None, verbose=True):
+    """
+    Steps 1-6 for daily loads: new transactions are appended to the store and
+    only the suburbs they touch are recomputed
+    - An empty store is seeded from seed_path with one full run
+    - MOM, panel and DDR: recomputed for touched suburbs from their full
+      stored history (a new sale moves the suburb's winsorization bounds, so
+      every quarter of a touched suburb is rebuilt, not just the new ones)
+    - MLA: touched suburbs, plus suburbs observed in quarters whose macro
+      mean changed when the proxy was extended to the new sale dates
+    - LML: every suburb, from a date-filtered read of the last 12 months
+      (the window end moves with the latest sale)
+    - The composite reruns on the stored per-suburb raw metrics
+    - Returns the same dict as run_pipeline
+    """
+    log = print if verbose else _quiet
+    
+    log("\n[1/7] Updating transaction store...")
+    if not store.initialised:
+        if seed_path is None:
+            raise ValueError(f"store {store.store_dir} is empty; give seed_path to build it")
+        store.create()
+        pending = sources_to_load(store, [seed_path])
+        store.append(read_transactions(seed_path), *pending[0])
+        transactions = store.read_transactions()
+        macro_proxy = get_macro_proxy(transactions)
+        store.save(run_stages(transactions, gnaf, macro_proxy), macro_proxy)
+        log(f"  ✓ Seeded store with {len(transactions):,} transactions from {Path(seed_path).name}")
+        del transactions
+    
+    new = []
+    for path, sha256 in sources_to_load(store, new_paths):
+        df = read_transactions(path)
+        store.append(df, path, sha256)
+        new.append(df)
+        log(f"  ✓ Appended {len(df):,} transactions from {path.name}")
+    if len(new) < len(new_paths):
+        log(f"  ✓ Skipped {len(new_paths) - len(new)} file(s) already in the store")
+    
+    stages, macro_proxy = store.load()
+    new = pd.concat(new, ignore_index=True) if new else pd.DataFrame(columns=['dat', 'suburb', 'price'])
+    touched = sorted(set(new['suburb'].astype(str)))
+    if touched:
+        touched_quarters = new[['suburb']].astype(str).assign(year_quarter=new['dat'].dt.to_period('Q'))
+        log(f"  ✓ {len(new):,} new sales touch {len(touched)} suburbs, "
+            f"{len(touched_quarters.drop_duplicates()):,} suburb-quarters")
+        
+        # Extend the macro proxy to the new sale dates; stored weeks keep their values
+        fresh_macro = get_macro_proxy(pd.DataFrame({'dat': [pd.Timestamp(store.meta['first_sale']),
+                                                            store.last_sale]}))
+        extended = extend_macro(macro_proxy, fresh_macro)
+        changed = changed_macro_quarters(macro_proxy, extended, STAGE_PARAMS['mla']['lead_weeks'])
+        macro_proxy = extended
+        
+        data = {'transactions': store.read_transactions(suburbs=touched), 'macro': macro_proxy}
+        panel = compute_stage('panel', data)
+        stages['mom'] = splice(stages['mom'], compute_stage('mom', data), touched)
+        stages['ddr'] = splice(stages['ddr'], compute_stage('ddr', data, panel=panel), touched)
+        stages['panel'] = splice(stages['panel'], panel, touched, sort_by=('suburb', 'year_quarter'))
+        
+        stored_panel = stages['panel']
+        realigned = set(stored_panel.loc[stored_panel['year_quarter'].isin(changed), 'suburb'].astype(str))
+        mla_suburbs = sorted(set(touched) | realigned)
+        mla_panel = stored_panel[stored_panel['suburb'].astype(str).isin(mla_suburbs)]
+        stages['mla'] = splice(stages['mla'], compute_stage('mla', data, panel=mla_panel), mla_suburbs)
+        log(f"  ✓ Recomputed MOM, DDR for {len(touched)} suburbs, MLA for {len(mla_suburbs)} suburbs")
+        
+        as_of = store.last_sale
+        recent = store.read_transactions(columns=['dat', 'suburb'], start=as_of - pd.DateOffset(months=12))
+        stages['lml'] = compute_stage('lml', {'transactions': recent, 'stock': gnaf, 'as_of': as_of})
+        store.save(stages, macro_proxy)
+    
+    parts = store.meta['parts']
+    log(f"  ✓ Store: {sum(part['rows'] for part in parts):,} transactions in {len(parts)} parts")
+    if store.last_sale is not None:
+        log(f"  ✓ Date range: {pd.Timestamp(store.meta['first_sale']).date()} to {store.last_sale.date()}")
+    return score_stages(stages, macro_proxy, log)
+
+def score_stages(stages, macro_proxy, log=print, cache=None):
+    """
+    Step messages for the computed stages, then the MLAPS composite
+    - Returns the run_pipeline result dict
+    """
+    lml_data, mom_data, quarterly_panel, ddr_data, mla_data = (
+        stages[stage] for stage in ('lml', 'mom', 'panel', 'ddr', 'mla'))
+    
+    log("\n[2/7] Calculating Local Market Liquidity (LML)...")
+    log(f"  ✓ Calculated LML for {len(lml_data)} suburbs")
+    log(f"  ✓ LML range: {lml_data['LML'].min():.2f}% to {lml_data['LML'].max():.2f}% per year")
+    log(f"  ✓ Reliable suburbs (≥5 sales): {lml_data['lml_reliable'].sum()}")
+    
+    log("\n[3/7] Calculating Price Momentum (MOM) with outlier controls...")
+    log(f"  ✓ Calculated MOM for {len(mom_data)} suburbs")
+    log(f"  ✓ MOM range: {mom_data['MOM'].min():.2f}% to {mom_data['MOM'].max():.2f}% p.a.")
+    
+    log("\n[4/7] Calculating Drawdown Risk (DDR) with smoothing...")
+    log(f"  ✓ Built quarterly panel: {len(quarterly_panel):,} suburb-quarters")
+    log(f"  ✓ Calculated DDR for {len(ddr_data)} suburbs")
+    log(f"  ✓ DDR range: {ddr_data['DDR'].min():.2f}% to {ddr_data['DDR'].max():.2f}%")
+    log(f"  ✓ Note: Capped at -35% floor, smoothed with 3Q MA")
+    
+    log("\n[5/7] Calculating Macro Liquidity Alignment (MLA) with stats...")
+    log(f"  ✓ Generated macro liquidity proxy with {len(macro_proxy)} weekly observations")
+    log(f"  ✓ Calculated MLA for {len(mla_data)} suburbs")
+    if len(mla_data) > 0:
+        log(f"  ✓ MLA range: {mla_data['MLA'].min():.3f} to {mla_data['MLA'].max():.3f}")
+        log(f"  ✓ Significant (p<0.10): {mla_data['MLA_significant'].sum()}/{len(mla_data)} suburbs")
+    
+    log("\n[6/7] Creating MLAPS v2 Composite Score...")
+    mlaps = combine_components(lml_data, mom_data, ddr_data, mla_data)
+    log(f"  ✓ Combined data for {len(mlaps)} suburbs")
+    
+    mlaps, weighting_used = score_mlaps(mlaps)
+    if cache is not None:
+        log(f"  ✓ Stage cache: reused {len(cache.hits)} of {len(cache.hits) + len(cache.misses)} stages"
+            + (f" ({', '.join(cache.hits)})" if cache.hits else ""))
+    
+    return {
+        'lml': lml_data,
+        'mom': mom_data,
+        'panel': quarterly_panel,
+        'ddr': ddr_data,
+        'macro': macro_proxy,
+        'mla': mla_data,
+        'mlaps': mlaps,
+        'weighting': weighting_used
+    }
+
+def print_report(mlaps, weighting_used, top_n=10):
+    """
+    Top suburbs, score distribution and methodology notes
+    """
+    has_mla = mlaps['MLA'].notna().sum() > 0
+    
+    # Display top suburbs
+    print("\n📊 TOP SUBURBS BY MLAPS v2 SCORE:")
+    print("=" * 80)
+    
+    for idx, row in mlaps.head(min(top_n, len(mlaps))).iterrows():
+        print(f"\n#{int(row['rank'])} - {row['suburb']}")
+        print(f"  MLAPS Score:      {row['MLAPS']:.1f}/100")
+        print(f"  ├─ Liquidity:     {row['LML']:.2f}% per year ({int(row['sales_12m'])} sales)")
+        print(f"  ├─ Momentum:      {row['MOM']:.1f}% p.a.")
+        print(f"  ├─ Drawdown:      {row['DDR']:.1f}% (smoothed, capped)")
+        if has_mla and pd.notna(row.get('MLA')):
+            sig_flag = "✓ sig" if row.get('MLA_significant', False) else "NS"
+            print(f"  └─ Macro Align:   {row['MLA']:.3f} ({sig_flag}, n={int(row.get('MLA_n', 0))})")
+        print(f"  Current Price:    ${row['latest_price']:,.0f}")
+    
+    # Summary statistics
+    print("\n" + "=" * 80)
+    print("SCORE DISTRIBUTION:")
+    print("=" * 80)
+    summary_cols = ['MLAPS', 'LML', 'MOM', 'DDR']
+    if 'MLA' in mlaps.columns:
+        summary_cols.append('MLA')
+    print(mlaps[summary_cols].describe())
+    
+    # Methodology note
+    print("\n" + "=" * 80)
+    print("METHODOLOGY IMPROVEMENTS (v2):")
+    print("=" * 80)
+    print(f"✓ Weighting: {weighting_used}")
+    print(f"✓ Liquidity: 12-month turnover (% per year)")
+    print(f"✓ Momentum: Annualized growth with 2.5/97.5 winsorization")
+    print(f"✓ Drawdown: 3-quarter MA smoothing, capped at -35%")
+    print(f"✓ Macro Align: Rolling corr (lead=10w), with significance testing (p<0.10)")
+    print(f"✓ Normalization: Z-scores capped at ±2.5σ, then scaled to 0-100")
+    print(f"✓ Reliability flags: Minimum sample requirements enforced")
@@ -0,0 +1,147 @@
+"""
+MLAPS v2: Typed results output
+- Scores as Parquet partitioned by run date (mlaps_results/runs/run_date=YYYY-MM-DD/),
+  so earlier runs are kept instead of overwritten
+- latest.arrow: the newest run as an uncompressed Arrow IPC file that readers
+  can memory-map
+- Explicit schema: counts and ranks as integers, reliability flags as booleans
+- Optional state column (most common state of the suburb's sales) for filtering
+- mlaps_scores_v2.csv is still written for existing tools
+"""
+
+import json
+import os
+from datetime import date
+from pathlib import Path
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+RESULTS_DIRNAME = 'mlaps_results'
+RUNS_DIRNAME = 'runs'
+LATEST_FILENAME = 'latest.arrow'
+CSV_FILENAME = 'mlaps_scores_v2.csv'
+_META_KEY = b'mlaps.results'
+
+# Written as nulls when the scores do not have them
+OPTIONAL_COLUMNS = ('state',)
+
+RESULTS_SCHEMA = pa.schema([
+    pa.field('suburb', pa.string(), nullable=False),
+    pa.field('state', pa.string()),
+    pa.field('LML', pa.float64()),
+    pa.field('sales_12m', pa.int64()),
+    pa.field('dwelling_stock', pa.int64()),
+    pa.field('lml_reliable', pa.bool_()),
+    pa.field('MOM', pa.float64()),
+    pa.field('latest_price', pa.float64()),
+    pa.field('mom_reliable', pa.bool_()),
+    pa.field('DDR', pa.float64()),
+    pa.field('lookback_quarters', pa.int64()),
+    pa.field('ddr_reliable', pa.bool_()),
+    pa.field('MLA', pa.float64()),
+    pa.field('MLA_pvalue', pa.float64()),
+    pa.field('MLA_significant', pa.bool_()),
+    pa.field('MLA_n', pa.int64()),
+    pa.field('LML_score', pa.float64()),
+    pa.field('MOM_score', pa.float64()),
+    pa.field('DDR_score', pa.float64()),
+    pa.field('MLA_score', pa.float64()),
+    pa.field('MLAPS', pa.float64()),
+    pa.field('rank', pa.int32(), nullable=False),
+])
+
+def results_table(mlaps_df, run_date, weighting=None):
+    """
+    Scores as an Arrow table with RESULTS_SCHEMA
+    - Missing values (e.g. MLA for a suburb without enough quarters) and missing
+      OPTIONAL_COLUMNS become nulls
+    - run_date and the weighting go in the schema metadata
+    """
+    missing = [name for name in RESULTS_SCHEMA.names
+               if name not in mlaps_df.columns and name not in OPTIONAL_COLUMNS]
+    if missing:
+        raise ValueError(f"scores are missing columns: {', '.join(missing)}")
+    
+    df = mlaps_df.reindex(columns=RESULTS_SCHEMA.names).assign(suburb=mlaps_df['suburb'].astype(str))
+    for name in OPTIONAL_COLUMNS:
+        df[name] = df[name].astype(object)
+    table = pa.Table.from_pandas(df, schema=RESULTS_SCHEMA, preserve_index=False)
+    meta = {'run_date': str(run_date), 'weighting': weighting}
+    return table.replace_schema_metadata({_META_KEY: json.dumps(meta).encode()})
+
+def _run_date(run_date):
+    return date.today() if run_date is None else pd.Timestamp(run_date).date()
+
+def _replace(path, write):
+    tmp_path = path.with_name(f'.{path.name}.{os.getpid()}.tmp')
+    write(tmp_path)
+    os.replace(tmp_path, path)
+
+def write_results(mlaps_df, output_dir, run_date=None, weighting=None, csv=True):
+    """
+    Write one run's scores
+    - <output_dir>/mlaps_results/runs/run_date=<date>/part-0.parquet (a rerun on
+      the same date replaces that partition)
+    - <output_dir>/mlaps_results/latest.arrow (replaced atomically)
+    - <output_dir>/mlaps_scores_v2.csv when csv is true
+    - Returns the paths written
+    """
+    output_dir = Path(output_dir)
+    run_date = _run_date(run_date)
+    table = results_table(mlaps_df, run_date, weighting)
+    
+    partition_dir = output_dir / RESULTS_DIRNAME / RUNS_DIRNAME / f'run_date={run_date.isoformat()}'
+    partition_dir.mkdir(parents=True, exist_ok=True)
+    parquet_path = partition_dir / 'part-0.parquet'
+    _replace(parquet_path, lambda path: pq.write_table(table, path))
+    
+    latest_path = output_dir / RESULTS_DIRNAME / LATEST_FILENAME
+    def write_latest(path):
+        with pa.OSFile(str(path), 'wb') as sink, pa.ipc.new_file(sink, table.schema) as writer:
+            writer.write_table(table)
+    _replace(latest_path, write_latest)
+    
+    paths = {'parquet': parquet_path, 'arrow': latest_path}
+    if csv:
+        paths['csv'] = output_dir / CSV_FILENAME
+        mlaps_df.to_csv(paths['csv'], index=False)
+    return paths
+
+def read_latest(output_dir, columns=None, memory_map=True):
+    """
+    The newest run's scores as a DataFrame, typed as in RESULTS_SCHEMA
+    - memory_map: map latest.arrow instead of reading it into memory; only the
+      selected columns are copied out
+    - df.attrs['run_date'] / ['weighting'] come from the file metadata
+    """
+    path = Path(output_dir) / RESULTS_DIRNAME / LATEST_FILENAME
+    source = pa.memory_map(str(path)) if memory_map else pa.OSFile(str(path))
+    with source:
+        table = pa.ipc.open_file(source).read_all()
+        if columns is not None:
+            table = table.select(list(columns))
+        df = table.to_pandas()
+    
+    df.attrs.update(json.loads(table.schema.metadata[_META_KEY]))
+    return df
+
+def read_results_history(output_dir, start=None, end=None, columns=None):
+    """
+    Scores of every saved run, with a run_date column
+    - start / end (dates, inclusive) prune partitions before any file is read
+    """
+    filters = []
+    if start is not None:
+        filters.append(('run_date', '>=', pd.Timestamp(start).date().isoformat()))
+    if end is not None:
+        filters.append(('run_date', '<=', pd.Timestamp(end).date().isoformat()))
+    
+    if columns is not None:
+        columns = list(columns) + ['run_date', 'rank']
+        columns = list(dict.fromkeys(columns))
+    df = pd.read_parquet(Path(output_dir) / RESULTS_DIRNAME / RUNS_DIRNAME, columns=columns,
+                         filters=filters or None, partitioning='hive')
+    df['run_date'] = pd.to_datetime(df['run_date'].astype(str))
+    return df.sort_values(['run_date', 'rank'], kind='stable').reset_index(drop=True)
@@ -0,0 +1,361 @@
+"""
+MLAPS v2: Rolling monthly MLAPS history
+- Incremental LML, streaming MOM, sliding-window DDR/MLA
+- One composite per month-end for backtesting
+"""
+
+import numpy as np
+import pandas as pd
+
+from .composite import combine_components, score_mlaps
+from .metrics import calculate_drawdown_v2, dwelling_stock, momentum_from_windows
+from .mla import calculate_mla_v2
+from .panel import quarter_ordinal
+from .scheduler import STAGE_PARAMS
+
+def rolling_lml(transactions_df, gnaf_df, month_ends):
+    """
+    LML at every month-end from cumulative monthly sales counts
+    - sales_12m = sales up to t minus sales before t - 12 months
+    - Each sale is binned once per boundary, not rescanned per month
+    """
+    codes, suburbs = pd.factorize(transactions_df['suburb'])
+    dat = transactions_df['dat'].to_numpy()
+    n_months = len(month_ends)
+    cutoffs = month_ends - pd.DateOffset(months=12)
+    
+    def cumulative_counts(bins):
+        flat = np.bincount(codes * (n_months + 1) + bins, minlength=len(suburbs) * (n_months + 1))
+        return flat.reshape(len(suburbs), n_months + 1).cumsum(axis=1)[:, :n_months]
+    
+    # A sale counts from the first month-end on/after it, and expires once the cutoff passes it
+    counted = cumulative_counts(np.searchsorted(month_ends.values, dat, side='left'))
+    expired = cumulative_counts(np.searchsorted(cutoffs.values, dat, side='right'))
+    sales_12m = counted - expired
+    
+    lml_df = pd.DataFrame({
+        'as_of': np.tile(month_ends.values, len(suburbs)),
+        'suburb': np.repeat(np.asarray(suburbs), n_months),
+        'sales_12m': sales_12m.ravel()
+    })
+    lml_df = lml_df[lml_df['sales_12m'] > 0]
+    
+    lml_df = lml_df.merge(dwelling_stock(gnaf_df), on='suburb', how='left')
+    lml_df['dwelling_stock'] = lml_df['dwelling_stock'].fillna(lml_df['sales_12m'] * 10)
+    lml_df['LML'] = (lml_df['sales_12m'] / lml_df['dwelling_stock']) * 100
+    lml_df['lml_reliable'] = lml_df['sales_12m'] >= 5
+    
+    return lml_df[['as_of', 'suburb', 'LML', 'sales_12m', 'dwelling_stock', 'lml_reliable']]
+
+# Columns of build_quarterly_panel
+PANEL_COLUMNS = ['suburb', 'year_quarter', 'price', 'price_winsorized', 'n_sales', 'suburb_sales']
+
+def _ranges(starts, stops):
+    """Concatenated np.arange(start, stop) for every pair"""
+    lengths = stops - starts
+    offsets = np.repeat(starts - np.cumsum(lengths) + lengths, lengths)
+    return np.arange(lengths.sum()) + offsets
+
+class _PresenceTree:
+    """
+    Fenwick tree of present flags over a fixed sorted key array
+    - Batch inserts/removals, prefix counts and k-th present position in
+      O(log n) vector steps each, with no copy of the key array
+    """
+    
+    def __init__(self, size):
+        # Padded to a power of two, so a descent never steps past the end
+        self.top = 1 << size.bit_length()
+        self.tree = np.zeros(self.top + 1, dtype=np.int64)
+    
+    def add(self, positions, delta):
+        i = positions + 1
+        while len(i):
+            np.add.at(self.tree, i, delta)
+            i = i + (i & -i)
+            i = i[i < len(self.tree)]
+    
+    def prefix(self, positions):
+        """Present count in [0, position) for each position"""
+        i = np.array(positions, dtype=np.int64)
+        total = np.zeros(len(i), dtype=np.int64)
+        while i.any():
+            total += self.tree[i]
+            i -= i & -i
+        return total
+    
+    def select(self, ranks):
+        """Position of the present key with each 0-based rank (size or more past the last)"""
+        position = np.zeros(len(ranks), dtype=np.int64)
+        remaining = np.asarray(ranks, dtype=np.int64) + 1
+        step = self.top >> 1
+        while step:
+            count = self.tree[position + step]
+            take = count < remaining
+            position += step * take
+            remaining -= count * take
+            step >>= 1
+        return position
+
+def rolling_momentum(transactions_df, month_ends, min_sales=15):
+    """
+    MOM at every month-end, updated one month of sales at a time
+    - Same result as calculate_momentum_v2 on the sales up to each month-end
+    - Every sale's (suburb, price rank) key has a fixed place in one sorted array;
+      all sales and the first/last 30% windows are presence trees over it, so a
+      month's sales enter (and leave) in O(log n) vector steps and order
+      statistics come from tree descents, with no per-sale Python loop
+    - Only suburbs with new sales are re-evaluated, as one batch per month
+    - Suburbs without new sales carry their previous value forward
+    """
+    columns = ['as_of', 'suburb', 'MOM', 'latest_price', 'time_span_years', 'mom_reliable']
+    codes, suburbs = pd.factorize(transactions_df['suburb'])
+    dat_ns = transactions_df['dat'].to_numpy().astype('datetime64[ns]').view('i8')
+    prices = transactions_df['price'].to_numpy(dtype=float)
+    month_end_rows = np.searchsorted(transactions_df['dat'].to_numpy(), month_ends.values, side='right')
+    n_rows, n_suburbs = len(codes), len(suburbs)
+    
+    # Sales laid out per suburb in date order: suburb s's p-th sale is at suburb_start[s] + p
+    by_suburb = np.argsort(codes, kind='stable')
+    suburb_count = np.bincount(codes, minlength=n_suburbs)
+    suburb_start = np.cumsum(suburb_count) - suburb_count
+    dates = dat_ns[by_suburb]
+    
+    # Unique sortable key per sale: suburb first, then price; missing prices keep their
+    # position in the windows but have no key
+    price_order = np.argsort(prices, kind='stable')
+    price_rank = np.empty(n_rows, dtype=np.int64)
+    price_rank[price_order] = np.arange(n_rows)
+    keys = (codes.astype(np.int64) * n_rows + price_rank)[by_suburb]
+    valid = ~np.isnan(prices[by_suburb])
+    sorted_keys = np.sort(keys[valid])
+    key_position = np.searchsorted(sorted_keys, keys)
+    # Price per key position, NaN past the end (only read where a suburb has no prices)
+    position_price = np.append(prices[price_order][sorted_keys % n_rows], np.nan)
+    segment_start = np.searchsorted(sorted_keys, np.arange(n_suburbs, dtype=np.int64) * n_rows)
+    segment_end = np.searchsorted(sorted_keys, np.arange(1, n_suburbs + 1, dtype=np.int64) * n_rows)
+    
+    def positions_at(suburb, lo, hi):
+        index = _ranges(suburb_start[suburb] + lo, suburb_start[suburb] + hi)
+        return key_position[index[valid[index]]]
+    
+    def segments(tree, suburb):
+        """Present keys before each suburb's segment, and in it"""
+        before = tree.prefix(segment_start[suburb])
+        return before, tree.prefix(segment_end[suburb]) - before
+    
+    def ranked_prices(tree, before, m, ranks):
+        """Prices at rows of in-segment ranks, one tree descent for all; NaN where a segment is empty"""
+        ranks = np.array(ranks)
+        position = np.minimum(tree.select((before + ranks).ravel()), len(sorted_keys))
+        return np.where(m > 0, position_price[position].reshape(ranks.shape), np.nan)
+    
+    def interpolation(m, q):
+        """Ranks either side of quantile q of m values, and the weight of the upper one"""
+        h = (m - 1) * q
+        lo = np.floor(h).astype(np.int64)
+        return lo, np.minimum(lo + 1, m - 1), h - lo
+    
+    def clipped_median(x_lo, x_hi, lower, upper):
+        """Median from the two middle prices after clipping to [lower, upper] (clipping is monotone)"""
+        return (np.clip(x_lo, lower, upper) + np.clip(x_hi, lower, upper)) / 2
+    
+    def median(tree, suburb, lower, upper):
+        before, m = segments(tree, suburb)
+        return clipped_median(*ranked_prices(tree, before, m, [(m - 1) // 2, m // 2]), lower, upper)
+    
+    def twice_median_date(suburb, lo, hi):
+        """2 × median sale date of positions [lo, hi), exact in integer nanoseconds"""
+        m = hi - lo
+        first = suburb_start[suburb] + lo
+        return dates[first + (m - 1) // 2] + dates[first + m // 2]
+    
+    all_sales, older, recent = (_PresenceTree(len(sorted_keys)) for _ in range(3))
+    n_sales = np.zeros(n_suburbs, dtype=np.int64)
+    # Window medians per suburb as of the latest month it was evaluated
+    recent_median, older_median, time_span_ns = (np.full(n_suburbs, np.nan) for _ in range(3))
+    has_value = np.zeros(n_suburbs, dtype=bool)
+    rows = {name: [] for name in ('month', 'suburb', 'recent_median', 'older_median', 'time_span_ns')}
+    row = 0
+    
+    for month, end in enumerate(month_end_rows):
+        month_codes = codes[row:end]
+        row = end
+        touched = np.unique(month_codes)
+        n_prev = n_sales[touched]
+        n_sales += np.bincount(month_codes, minlength=n_suburbs)
+        n = n_sales[touched]
+        k_prev, k = (n_prev * 0.3).astype(np.int64), (n * 0.3).astype(np.int64)
+        
+        # All sales gain the month; the older window grows from k_prev to k; the recent
+        # window [n - k, n) drops sales it slid past and gains those it now reaches
+        all_sales.add(positions_at(touched, n_prev, n), 1)
+        older.add(positions_at(touched, k_prev, k), 1)
+        recent.add(positions_at(touched, n_prev - k_prev, np.minimum(n - k, n_prev)), -1)
+        recent.add(positions_at(touched, np.maximum(n - k, n_prev), n), 1)
+        
+        ready = n >= min_sales
+        suburb, n, k = touched[ready], n[ready], k[ready]
+        if len(suburb):
+            # Linear-interpolated 2.5/97.5 percentiles and the two middle prices of all sales
+            before, m = segments(all_sales, suburb)
+            lower_lo, lower_hi, lower_weight = interpolation(m, 0.025)
+            upper_lo, upper_hi, upper_weight = interpolation(m, 0.975)
+            x = ranked_prices(all_sales, before, m, [lower_lo, lower_hi, upper_lo, upper_hi, (m - 1) // 2, m // 2])
+            lower = x[0] + lower_weight * (x[1] - x[0])
+            upper = x[2] + upper_weight * (x[3] - x[2])
+            
+            # iloc[-0:] selects every sale, as in calculate_momentum_v2
+            recent_median[suburb] = np.where(k > 0, median(recent, suburb, lower, upper),
+                                             clipped_median(x[4], x[5], lower, upper))
+            older_median[suburb] = median(older, suburb, lower, upper)
+            
+            recent_lo = np.where(k > 0, n - k, 0)
+            twice_span = twice_median_date(suburb, recent_lo, n) - twice_median_date(suburb, 0, np.maximum(k, 1))
+            time_span_ns[suburb] = np.where(k > 0, twice_span / 2, np.nan)
+            has_value[suburb] = True
+        
+        valued = np.flatnonzero(has_value)
+        for name, values in (('month', np.full(len(valued), month)), ('suburb', valued),
+                             ('recent_median', recent_median[valued]), ('older_median', older_median[valued]),
+                             ('time_span_ns', time_span_ns[valued])):
+            rows[name].append(values)
+    
+    if not len(month_ends):
+        return pd.DataFrame(columns=columns)
+    
+    # One MOM evaluation over every (month-end, suburb) row
+    rows = {name: np.concatenate(values) for name, values in rows.items()}
+    mom_df = momentum_from_windows(np.asarray(suburbs)[rows['suburb']], rows['recent_median'],
+                                   rows['older_median'], rows['time_span_ns'])
+    mom_df.insert(0, 'as_of', month_ends[rows['month']])
+    
+    return mom_df[columns]
+
+def quarter_middles(transactions_df, codes, year_quarter):
+    """
+    Suburb × quarter panel of the full history, for slicing into windows
+    - price / n_sales as in build_quarterly_panel (window-independent)
+    - lower_mid / upper_mid: the two middle prices of the quarter (equal for odd
+      counts); clipping is monotone, so a window's winsorized median is the mean
+      of the clipped middles
+    - Rows in (suburb, quarter) order; codes from pd.factorize(sort=True),
+      year_quarter from dat.dt.to_period('Q')
+    """
+    quarters = quarter_ordinal(year_quarter)
+    prices = transactions_df['price'].to_numpy(dtype=float)
+    
+    # NaN prices sort last within their quarter, after the counted ones
+    order = np.lexsort((prices, quarters, codes))
+    cell_code, cell_quarter, sorted_prices = codes[order], quarters[order], prices[order]
+    starts = np.flatnonzero(np.diff(cell_code, prepend=-1) | np.diff(cell_quarter, prepend=-1))
+    n_sales = np.diff(np.append(starts, len(order)))
+    n_valid = np.add.reduceat(~np.isnan(sorted_prices), starts)
+    
+    first = order[starts]
+    panel = pd.DataFrame({
+        'suburb': transactions_df['suburb'].to_numpy()[first],
+        'year_quarter': year_quarter.array[first],
+        'lower_mid': sorted_prices[starts + np.maximum(n_valid - 1, 0) // 2],
+        'upper_mid': sorted_prices[starts + n_valid // 2],
+        'n_sales': n_sales
+    })
+    panel['price'] = (panel['lower_mid'] + panel['upper_mid']) / 2
+    
+    return panel, cell_code[starts], cell_quarter[starts]
+
+def rolling_drawdown_mla(transactions_df, macro_df, quarter_ends, window_months=36):
+    """
+    DDR and MLA at every quarter-end over a sliding window of completed quarters
+    - Window = the window_months // 3 quarters up to quarter_end
+    - One panel for the whole history, sliced per window; only the per-suburb
+      5/95 winsorization bounds and suburb_sales depend on the window
+    - Same panel as build_quarterly_panel on the window's sales
+    """
+    if window_months % 3:
+        raise ValueError(f"window_months must be whole quarters, got {window_months}")
+    
+    codes, _ = pd.factorize(transactions_df['suburb'], sort=True)
+    n_suburbs = codes.max(initial=-1) + 1
+    year_quarter = transactions_df['dat'].dt.to_period('Q')
+    sale_quarter = quarter_ordinal(year_quarter)
+    prices = pd.Series(transactions_df['price'].to_numpy(dtype=float))
+    history, cell_code, cell_quarter = quarter_middles(transactions_df, codes, year_quarter)
+    
+    last_quarter = quarter_ordinal(pd.Series(quarter_ends.to_period('Q')))
+    first_quarter = last_quarter - window_months // 3 + 1
+    window_start = np.searchsorted(sale_quarter, first_quarter, side='left')
+    window_end = np.searchsorted(sale_quarter, last_quarter, side='right')
+    
+    ddr_frames, mla_frames = [], []
+    
+    for quarter_end, q_lo, q_hi, lo, hi in zip(quarter_ends, first_quarter, last_quarter, window_start, window_end):
+        # Winsorization bounds from the window's sales, per suburb
+        window_codes = codes[lo:hi]
+        by_suburb = prices.iloc[lo:hi].groupby(window_codes)
+        lower, upper = np.full(n_suburbs, np.nan), np.full(n_suburbs, np.nan)
+        for bounds, q in ((lower, 0.05), (upper, 0.95)):
+            quantiles = by_suburb.quantile(q)
+            bounds[quantiles.index] = quantiles.to_numpy()
+        
+        cells = (cell_quarter >= q_lo) & (cell_quarter <= q_hi)
+        code = cell_code[cells]
+        panel = history[cells]
+        panel = panel.assign(
+            price_winsorized=(panel['lower_mid'].clip(lower[code], upper[code])
+                              + panel['upper_mid'].clip(lower[code], upper[code])) / 2,
+            suburb_sales=np.bincount(window_codes, minlength=n_suburbs)[code]
+        )[PANEL_COLUMNS]
+        
+        ddr_frames.append(calculate_drawdown_v2(None, panel=panel).assign(quarter_end=quarter_end))
+        mla_frames.append(calculate_mla_v2(None, macro_df, lead_weeks=STAGE_PARAMS['mla']['lead_weeks'],
+                                           panel=panel).assign(quarter_end=quarter_end))
+    
+    return pd.concat(ddr_frames, ignore_index=True), pd.concat(mla_frames, ignore_index=True)
+
+def calculate_mlaps_rolling(transactions_df, gnaf_df, macro_df, window_months=36, min_sales=15, start=None):
+    """
+    Monthly MLAPS history for backtesting, built incrementally
+    - LML: sliding 12-month sales counts
+    - MOM: streaming medians, updated only for suburbs with new sales
+    - DDR/MLA: rolling window_months of completed quarters, stepped per quarter
+    - Composite rescored per month-end with the snapshot weighting
+    """
+    df = transactions_df[['suburb', 'dat', 'price']].dropna(subset=['suburb', 'dat'])
+    df = df.sort_values('dat', kind='stable').reset_index(drop=True)
+    
+    first_month = start if start is not None else df['dat'].min() + pd.DateOffset(months=12)
+    month_ends = pd.date_range(first_month, df['dat'].max(), freq=pd.offsets.MonthEnd(), normalize=True)
+    quarter_ends = pd.date_range(month_ends[0] - pd.offsets.QuarterEnd(), month_ends[-1],
+                                 freq=pd.offsets.QuarterEnd(), normalize=True)
+    
+    lml_hist = rolling_lml(df, gnaf_df, month_ends)
+    mom_hist = rolling_momentum(df, month_ends, min_sales=min_sales)
+    ddr_hist, mla_hist = rolling_drawdown_mla(df, macro_df, quarter_ends, window_months=window_months)
+    
+    # Month-ends read DDR/MLA from the latest completed quarter
+    quarter_for_month = quarter_ends[np.searchsorted(quarter_ends.values, month_ends.values, side='right') - 1]
+    
+    lml_by_month = dict(tuple(lml_hist.groupby('as_of')))
+    mom_by_month = dict(tuple(mom_hist.groupby('as_of')))
+    ddr_by_quarter = dict(tuple(ddr_hist.groupby('quarter_end')))
+    mla_by_quarter = dict(tuple(mla_hist.groupby('quarter_end')))
+    
+    history = []
+    for as_of, quarter_end in zip(month_ends, quarter_for_month):
+        if as_of not in lml_by_month:
+            continue
+        combined = combine_components(
+            lml_by_month[as_of],
+            mom_by_month.get(as_of, mom_hist.iloc[:0]),
+            ddr_by_quarter.get(quarter_end, ddr_hist.iloc[:0]),
+            mla_by_quarter.get(quarter_end, mla_hist.iloc[:0])
+        )
+        if len(combined) > 0:
+            history.append(score_mlaps(combined.drop(columns='as_of'))[0].assign(as_of=as_of))
+    
+    if not history:
+        return pd.DataFrame()
+    
+    history = pd.concat(history, ignore_index=True)
+    return history[['as_of'] + [c for c in history.columns if c != 'as_of']]
@@ -1,16 +1,37 @@
 """
-Simple HTTP server to run the MLAPS Dashboard
-Usage: python run_dashboard.py
+HTTP server for the MLAPS Dashboard and its JSON scores API
+Usage: python run_dashboard.py [--port 8000] [--results-dir DIR] [--no-browser]
 Then open: http://localhost:8000/mlaps_dashboard.html
+
+Threaded: every request gets its own thread. The latest scores are loaded once
+(see mlaps.api) and served as JSON with ETag and gzip:
+    /api/meta                      run date, weighting, columns, row count
+    /api/top?n=10                  best-ranked suburbs
+    /api/suburb/<name>             one suburb (case-insensitive)
+    /api/scores?page=1&page_size=50&sort=MLAPS&order=desc&q=cove&min_MLAPS=40&lml_reliable=true
+    /api/charts?top=15&bins=20&state=NSW  chart data pre-aggregated for the dashboard
+    /api/score?w_MLA=0.2&w_MOM=0.3&cap_z=2&min_sales=5  ranking with custom weights
+    /api/events                    Server-Sent Events: a "snapshot" notice naming the changed
+                                   suburbs whenever a new run lands in the results directory
 """
 
+import argparse
 import http.server
-import socketserver
+import queue
+import sys
+import threading
 import webbrowser
 import os
 from pathlib import Path
+from urllib.parse import parse_qs, unquote, urlsplit
+
+# Make the package importable when run as a script from inside mlaps/
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from mlaps.api import ScoresAPI, etag_matches, sse_message
 
 PORT = 8000
+HEARTBEAT_SECONDS = 15
 
 class CustomHTTPRequestHandler(http.server.SimpleHTTPRequestHandler):
     def end_headers(self):
@@ -20,6 +41,69 @@ class CustomHTTPRequestHandler(http.server.SimpleHTTPRequestHandler):
         self.send_header('Access-Control-Allow-Headers', 'Content-Type')
         super().end_headers()
 
+class DashboardRequestHandler(CustomHTTPRequestHandler):
+    """Static dashboard files plus /api/... JSON from a shared ScoresAPI"""
+    # Keep-alive, so a client paging through results reuses its connection
+    protocol_version = 'HTTP/1.1'
+    api = None
+    
+    def do_GET(self):
+        url = urlsplit(self.path)
+        if url.path == '/api/events':
+            self.send_events()
+        elif url.path == '/api' or url.path.startswith('/api/'):
+            self.send_api(unquote(url.path), parse_qs(url.query))
+        else:
+            super().do_GET()
+    
+    def send_api(self, path, query):
+        response = self.api.get(path, query)
+        if etag_matches(self.headers.get('If-None-Match'), response.etag):
+            self.send_response(304)
+            self.send_header('ETag', response.etag)
+            self.end_headers()
+            return
+        
+        accepts_gzip = 'gzip' in self.headers.get('Accept-Encoding', '')
+        body = response.gzip_body if accepts_gzip and response.gzip_body is not None else response.body
+        self.send_response(response.status)
+        self.send_header('Content-Type', 'application/json; charset=utf-8')
+        self.send_header('Content-Length', str(len(body)))
+        self.send_header('Vary', 'Accept-Encoding')
+        if body is response.gzip_body:
+            self.send_header('Content-Encoding', 'gzip')
+        if response.etag is not None:
+            self.send_header('ETag', response.etag)
+            # Cache, but revalidate: a rerun of the analysis changes the ETag
+            self.send_header('Cache-Control', 'no-cache')
+        self.end_headers()
+        self.wfile.write(body)
+    
+    def send_events(self):
+        """Hold the connection open and forward snapshot events as they are published"""
+        subscription = self.api.subscribe()
+        self.close_connection = True
+        try:
+            self.send_response(200)
+            self.send_header('Content-Type', 'text/event-stream')
+            self.send_header('Cache-Control', 'no-cache')
+            self.end_headers()
+            # The client compares this with the version it loaded, e.g. after a reconnect
+            self.wfile.write(b'retry: 3000\n\n' + sse_message('hello', {'version': self.api.version}))
+            self.wfile.flush()
+            while True:
+                try:
+                    event = subscription.get(timeout=HEARTBEAT_SECONDS)
+                    message = sse_message('snapshot', event, event['version'])
+                except queue.Empty:
+                    message = b': keep-alive\n\n'
+                self.wfile.write(message)
+                self.wfile.flush()
+        except (BrokenPipeError, ConnectionResetError):
+            pass
+        finally:
+            self.api.unsubscribe(subscription)
+
 def find_free_port(start_port=8000):
     """Find a free port starting from start_port"""
     import socket
@@ -35,11 +119,22 @@ def find_free_port(start_port=8000):
     return None
 
 def main():
+    parser = argparse.ArgumentParser(description='Serve the MLAPS dashboard and scores API')
+    parser.add_argument('--port', type=int, default=PORT, help='first port to try (default: 8000)')
+    parser.add_argument('--results-dir', type=Path, default=None,
+                        help='directory with mlaps_results/ or mlaps_scores_v2.csv (default: this directory)')
+    parser.add_argument('--no-browser', action='store_true', help='do not open the dashboard in a browser')
+    args = parser.parse_args()
+    
     # Change to script directory
     os.chdir(Path(__file__).parent)
+    DashboardRequestHandler.api = ScoresAPI((args.results_dir or Path('.')).resolve())
+    
+    # Watch the results directory and push new runs to connected dashboards
+    threading.Thread(target=DashboardRequestHandler.api.watch, daemon=True).start()
     
     # Find free port
-    port = find_free_port(PORT)
+    port = find_free_port(args.port)
     if not port:
         print("❌ Could not find a free port!")
         return
@@ -53,23 +148,24 @@ def main():
     print(f"   - mlaps_dashboard.html (Interactive Dashboard)")
     print(f"   - mlaps_scores_v2.csv (Latest Results)")
     print(f"   - mlaps_analysis_v2.py (Analysis Code)")
+    print(f"\n🔌 Scores API: http://localhost:{port}/api/top?n=10  (also /api/scores, /api/suburb/<name>, /api/meta)")
     print("\n⌨️  Press Ctrl+C to stop the server")
     print("=" * 70)
     
     # Try to open browser automatically
-    try:
-        webbrowser.open(f'http://localhost:{port}/mlaps_dashboard.html')
-        print("\n🌐 Opening dashboard in your browser...")
-    except:
-        print("\n💡 Please open the URL manually in your browser")
+    if not args.no_browser:
+        try:
+            webbrowser.open(f'http://localhost:{port}/mlaps_dashboard.html')
+            print("\n🌐 Opening dashboard in your browser...")
+        except:
+            print("\n💡 Please open the URL manually in your browser")
     
-    # Start server
+    # Start server (one thread per request)
     try:
-        with socketserver.TCPServer(("", port), CustomHTTPRequestHandler) as httpd:
+        with http.server.ThreadingHTTPServer(("", port), DashboardRequestHandler) as httpd:
             httpd.serve_forever()
     except KeyboardInterrupt:
         print("\n\n👋 Server stopped. Goodbye!")
 
 if __name__ == "__main__":
     main()
-
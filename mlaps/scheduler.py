@@ -0,0 +1,243 @@
+"""
+MLAPS v2: Metric stage scheduler
+- LML, MOM and the quarterly panel run concurrently on a process pool; DDR
+  and MLA follow on the one panel
+- Inputs (and the panel) are shared as memory-mapped Arrow IPC files, not
+  pickled per task
+- Small inputs stay in-process (PARALLEL_MIN_ROWS)
+- Cached stages (see cache) are never dispatched
+- Sharded mode: suburbs hash-partitioned across workers, every stage per shard
+"""
+
+import multiprocessing as mp
+import os
+import tempfile
+import zlib
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+
+from .metrics import calculate_drawdown_v2, calculate_lml_v2, calculate_momentum_v2
+from .mla import calculate_mla_v2
+from .panel import build_quarterly_panel
+
+# Parameters and input frames per stage (also the stage cache key)
+STAGE_PARAMS = {
+    'lml': {},
+    'mom': {'min_sales': 15},
+    'panel': {},
+    'ddr': {'min_quarters': 8, 'smooth_window': 3},
+    'mla': {'lead_weeks': 10, 'window_months': 36}
+}
+STAGE_INPUTS = {
+    'lml': ('transactions', 'stock'),
+    'mom': ('transactions',),
+    'panel': ('transactions',),
+    'ddr': ('transactions',),
+    'mla': ('transactions', 'macro')
+}
+
+# Below this many transactions the default is to run in-process: pool start-up,
+# the shared files and pickled outputs cost ~0.2-0.7 s, more than running the
+# stages concurrently saves
+PARALLEL_MIN_ROWS = 500_000
+
+# Stages that read the quarterly panel
+PANEL_STAGES = ('ddr', 'mla')
+
+# Input frames attached by each worker process at start-up
+_stage_data = {}
+
+def compute_stage(stage, data, panel=None):
+    """
+    One stage from the input frames in data (transactions, stock, macro)
+    - data['as_of'] (optional) pins the LML window end, as for shards
+    - DDR and MLA reuse panel when given, else build their own
+    """
+    params = STAGE_PARAMS[stage]
+    transactions = data['transactions']
+    
+    if stage == 'lml':
+        return calculate_lml_v2(transactions, data['stock'], as_of=data.get('as_of'), **params)
+    if stage == 'mom':
+        return calculate_momentum_v2(transactions, **params)
+    if stage == 'panel':
+        return build_quarterly_panel(transactions, **params)
+    if panel is None:
+        panel = build_quarterly_panel(transactions)
+    if stage == 'ddr':
+        return calculate_drawdown_v2(transactions, panel=panel, **params)
+    if stage == 'mla':
+        return calculate_mla_v2(transactions, data['macro'], panel=panel, **params)
+    raise ValueError(f"unknown stage: {stage!r}")
+
+def write_shared(frames, directory):
+    """Write each frame to an uncompressed Arrow IPC file; returns {name: path}"""
+    paths = {}
+    for name, df in frames.items():
+        path = Path(directory) / f'{name}.arrow'
+        table = pa.Table.from_pandas(df, preserve_index=False)
+        with pa.OSFile(str(path), 'wb') as sink, pa.ipc.new_file(sink, table.schema) as writer:
+            writer.write_table(table)
+        paths[name] = path
+    return paths
+
+def read_shared(path):
+    """
+    Memory-map an Arrow IPC file written by write_shared
+    - split_blocks: numeric and date columns without nulls are read-only views
+      of the mapping, so every worker shares one copy through the page cache
+    - Arrow-backed strings (pandas >= 3) are views too; with object strings
+      each worker materialises the text columns (8 bytes per row plus one
+      object per distinct suburb)
+    """
+    return pa.ipc.open_file(pa.memory_map(str(path))).read_all().to_pandas(split_blocks=True)
+
+def _attach(paths):
+    """Worker initializer: map the shared inputs once per worker"""
+    for name, path in paths.items():
+        _stage_data[name] = read_shared(path)
+
+def _run_stage(stage, panel_path=None):
+    """Worker task; DDR and MLA map the panel the parent shared"""
+    panel = None if panel_path is None else read_shared(panel_path)
+    return compute_stage(stage, _stage_data, panel=panel)
+
+def _run_pool(pool, pending, results, tmp_dir):
+    """
+    Pending stages on the pool
+    - LML, MOM and the panel start at once; DDR and MLA start when the panel
+      is ready and read it from a shared file, so it is built only once
+    - Returns {stage: output}
+    """
+    futures = {stage: pool.submit(_run_stage, stage) for stage in pending if stage not in PANEL_STAGES}
+    outputs = {}
+    if any(stage in PANEL_STAGES for stage in pending):
+        panel = futures.pop('panel').result() if 'panel' in futures else results['panel']
+        if 'panel' in pending:
+            outputs['panel'] = panel
+        panel_path = write_shared({'panel': panel}, tmp_dir)['panel']
+        futures.update({stage: pool.submit(_run_stage, stage, panel_path)
+                        for stage in pending if stage in PANEL_STAGES})
+    outputs.update({stage: future.result() for stage, future in futures.items()})
+    return outputs
+
+def shard_of(suburbs, shards):
+    """Shard number per suburb: CRC-32 of the name, stable across runs and processes"""
+    names = pd.Series(suburbs).astype(str)
+    unique_names, inverse = np.unique(names.to_numpy(), return_inverse=True)
+    shard = np.array([zlib.crc32(name.encode()) % shards for name in unique_names], dtype=int)
+    return shard[inverse]
+
+def _compute_shard(data, stages):
+    """Every requested stage for one shard's suburbs, in order (panel first)"""
+    results = {}
+    for stage in stages:
+        results[stage] = compute_stage(stage, data, panel=results.get('panel'))
+    return results
+
+def _run_shard(paths, stages, as_of):
+    """Worker task: map the shard's inputs, then compute its stages"""
+    data = {name: read_shared(path) for name, path in paths.items()}
+    return _compute_shard(dict(data, as_of=as_of), stages)
+
+def _merge_shards(shard_results, stages):
+    """Concatenate per-shard outputs, ordered by suburb like the unsharded stages"""
+    merged = {}
+    for stage in stages:
+        parts = [results[stage] for results in shard_results if len(results[stage]) > 0]
+        if not parts:
+            merged[stage] = shard_results[0][stage]
+            continue
+        sort_by = ['suburb', 'year_quarter'] if stage == 'panel' else ['suburb']
+        merged[stage] = (pd.concat(parts, ignore_index=True)
+                         .sort_values(sort_by, kind='stable').reset_index(drop=True))
+    return merged
+
+def run_sharded(data, stages, shards, workers=None):
+    """
+    Compute stages with suburbs hash-partitioned into shards
+    - Each shard's transactions go to their own Arrow IPC file; a worker maps
+      only its shard (plus the stock and macro frames)
+    - LML keeps the global window end, every other stage is per suburb
+    - Shard outputs are concatenated; cross-sectional normalisation happens
+      later on the merged frame, so it stays global
+    """
+    transactions = data['transactions']
+    shard = shard_of(transactions['suburb'], shards)
+    as_of = transactions['dat'].max()
+    stages = list(stages)
+    if any(stage in PANEL_STAGES for stage in stages):
+        stages = ['panel'] + [stage for stage in stages if stage != 'panel']
+    workers = min(shards, workers or os.cpu_count() or 1)
+    
+    if workers <= 1:
+        shard_results = [_compute_shard(dict(data, transactions=transactions[shard == part], as_of=as_of), stages)
+                         for part in range(shards)]
+        return _merge_shards(shard_results, stages)
+    
+    with tempfile.TemporaryDirectory(prefix='mlaps_') as tmp_dir:
+        shared = write_shared({'stock': data['stock'], 'macro': data['macro']}, tmp_dir)
+        shard_paths = []
+        for part in range(shards):
+            path = write_shared({f'transactions_{part}': transactions[shard == part]}, tmp_dir)
+            shard_paths.append(dict(shared, transactions=path[f'transactions_{part}']))
+        
+        context = mp.get_context('fork' if 'fork' in mp.get_all_start_methods() else 'spawn')
+        with ProcessPoolExecutor(max_workers=workers, mp_context=context) as pool:
+            shard_results = list(pool.map(_run_shard, shard_paths, [stages] * shards, [as_of] * shards))
+    return _merge_shards(shard_results, stages)
+
+def run_stages(transactions, stock, macro, cache=None, workers=None, shards=None):
+    """
+    LML, MOM, panel, DDR and MLA outputs as a dict
+    - Stages found in the cache are loaded, the rest are computed
+    - shards > 1: pending stages run per suburb shard (see run_sharded) on
+      up to min(shards, workers or CPU count) processes
+    - Otherwise workers > 1 runs pending stages on a process pool (see
+      _run_pool); else they run in order, sharing one panel
+    - workers=None: one per pending stage up to the CPU count, or in-process
+      below PARALLEL_MIN_ROWS transactions
+    """
+    data = {'transactions': transactions, 'stock': stock, 'macro': macro}
+    results, keys = {}, {}
+    
+    for stage in STAGE_PARAMS:
+        if cache is None:
+            continue
+        inputs = [data[name] for name in STAGE_INPUTS[stage]]
+        keys[stage] = cache.key(stage, inputs, STAGE_PARAMS[stage])
+        cached = cache.get(keys[stage])
+        if cached is not None:
+            cache.hits.append(stage)
+            results[stage] = cached
+    
+    pending = [stage for stage in STAGE_PARAMS if stage not in results]
+    if workers is None and len(transactions) < PARALLEL_MIN_ROWS:
+        stage_workers = 1
+    else:
+        stage_workers = min(len(pending), workers or os.cpu_count() or 1)
+    
+    if shards and shards > 1 and pending:
+        # Parallel over shards, not stages: up to one worker per shard (see run_sharded)
+        results.update(run_sharded(data, pending, shards, workers))
+    elif stage_workers > 1:
+        with tempfile.TemporaryDirectory(prefix='mlaps_') as tmp_dir:
+            paths = write_shared(data, tmp_dir)
+            context = mp.get_context('fork' if 'fork' in mp.get_all_start_methods() else 'spawn')
+            with ProcessPoolExecutor(max_workers=stage_workers, mp_context=context,
+                                     initializer=_attach, initargs=(paths,)) as pool:
+                results.update(_run_pool(pool, pending, results, tmp_dir))
+    else:
+        for stage in pending:
+            results[stage] = compute_stage(stage, data, panel=results.get('panel'))
+    
+    if cache is not None:
+        for stage in pending:
+            cache.misses.append(stage)
+            cache.put(keys[stage], results[stage])
+    
+    return results
@@ -0,0 +1,246 @@
+"""
+MLAPS v2: Mergeable quantile sketches
+- Relative-error log-bucket sketches (DDSketch style) for many groups at once
+- Used by the approximate streaming mode for winsorisation bounds and quarterly medians
+- Mergeable (bucket counts add up) and serialisable, so shards and incremental
+  loads can be combined
+- At most max_buckets buckets per group: the lowest are collapsed into the
+  lowest kept one, so a group's size is bounded whatever its spread
+- sketch_benchmark: accuracy against the exact pandas path
+"""
+
+import io
+import json
+import time
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+
+DEFAULT_RELATIVE_ERROR = 0.005
+DEFAULT_MAX_BUCKETS = 2048
+_ZERO_BUCKET = np.iinfo(np.int32).min
+_META_KEY = b'mlaps.sketch'
+
+def sum_counts(frame, keys, group_keys=None):
+    """
+    frame['count'] summed per distinct keys, sorted by keys (as a sorted groupby)
+    - One lexsort over the key columns (non-integer keys factorized first), so
+      merging millions of rows needs a few bytes per row, not a hash table
+    - Rows with a missing key are dropped, as groupby does
+    - Returns (frame of keys + count (int32), start row of each distinct value of
+      the first group_keys keys)
+    """
+    columns = []
+    keep = np.ones(len(frame), dtype=bool)
+    for key in keys:
+        values = frame[key].to_numpy()
+        if not np.issubdtype(values.dtype, np.integer):
+            values = pd.factorize(frame[key], sort=True)[0]
+            keep &= values >= 0
+        columns.append(values)
+    
+    order = np.lexsort(columns[::-1])
+    if not keep.all():
+        order = order[keep[order]]
+    
+    # A new row starts wherever any key changes; a new group wherever one of the first group_keys does
+    changed = np.zeros(len(order), dtype=bool)
+    group_start = None
+    for i, values in enumerate(columns):
+        if i == group_keys:
+            group_start = np.flatnonzero(np.r_[True, changed[1:]]) if len(order) else np.zeros(0, dtype=np.int64)
+        values = values[order]
+        changed[1:] |= values[1:] != values[:-1]
+    starts = np.flatnonzero(np.r_[True, changed[1:]]) if len(order) else np.zeros(0, dtype=np.int64)
+    
+    total = np.add.reduceat(frame['count'].to_numpy()[order], starts) if len(starts) else np.zeros(0)
+    first = order[starts]
+    del order, changed
+    
+    counts = pd.DataFrame({key: frame[key].to_numpy()[first] if isinstance(frame[key].dtype, np.dtype)
+                           else frame[key].array.take(first) for key in keys}, copy=False)
+    counts['count'] = total.astype(np.int32)
+    if group_start is not None:
+        group_start = np.searchsorted(starts, group_start)
+    return counts, group_start
+
+class QuantileSketch:
+    """
+    Quantile sketches for every group (e.g. suburb or suburb-quarter)
+    - A value x > 0 goes to bucket ceil(log_γ(x)), γ = (1 + α) / (1 - α);
+      zero and negative values share one bucket, NaN is skipped
+    - Every quantile (and interpolation between two) is within relative error α,
+      except quantiles that fall in collapsed buckets
+    - Size per group is bounded by the spread of its values (and max_buckets), not their count
+    - max_buckets: a group with more buckets keeps its highest max_buckets - 1 and
+      folds the rest into one; low quantiles of such a group read that bucket
+      (with α = 0.005 and 2048 buckets, a price range of about 1:7·10^8 fits uncollapsed)
+    - counts: one row per (keys..., bucket) with the number of values (int32)
+    """
+    
+    def __init__(self, counts, keys, relative_error=DEFAULT_RELATIVE_ERROR, max_buckets=DEFAULT_MAX_BUCKETS):
+        self.counts = counts
+        self.keys = list(keys)
+        self.relative_error = relative_error
+        self.max_buckets = max_buckets
+        self._log_gamma = np.log((1 + relative_error) / (1 - relative_error))
+    
+    @classmethod
+    def from_values(cls, keys, values, relative_error=DEFAULT_RELATIVE_ERROR, max_buckets=DEFAULT_MAX_BUCKETS):
+        """Sketch values grouped by the columns of the keys frame"""
+        sketch = cls(None, keys.columns, relative_error, max_buckets)
+        values = np.asarray(values, dtype=float)
+        observed = ~np.isnan(values)
+        
+        frame = keys[observed].reset_index(drop=True)
+        frame['bucket'] = sketch._bucket(values[observed])
+        sketch.counts = sketch._sum(frame.assign(count=np.ones(len(frame), dtype=np.int32)))
+        return sketch
+    
+    def _bucket(self, values):
+        bucket = np.full(len(values), _ZERO_BUCKET, dtype=np.int32)
+        positive = values > 0
+        bucket[positive] = np.ceil(np.log(values[positive]) / self._log_gamma)
+        return bucket
+    
+    def _value(self, bucket):
+        # Bucket b covers (γ^(b-1), γ^b]; its midpoint in relative terms
+        gamma = np.exp(self._log_gamma)
+        with np.errstate(over='ignore'):
+            value = 2 * np.exp(bucket * self._log_gamma) / (gamma + 1)
+        return np.where(bucket == _ZERO_BUCKET, 0.0, value)
+    
+    def _sum(self, frame, keys=None):
+        """Bucket counts summed per (keys..., bucket), then each group collapsed to max_buckets"""
+        keys = self.keys if keys is None else keys
+        counts, group_start = sum_counts(frame, keys + ['bucket'], group_keys=len(keys))
+        
+        # Rows are sorted by group then bucket: a group's lowest buckets are the first
+        # rows past its last max_buckets - 1
+        group_n = np.diff(np.append(group_start, len(counts)))
+        if group_n.max(initial=0) <= self.max_buckets:
+            return counts
+        group_end = np.repeat(group_start + group_n, group_n)
+        collapse = (np.arange(len(counts)) < group_end - (self.max_buckets - 1)) & np.repeat(group_n > self.max_buckets, group_n)
+        
+        floor_bucket = counts['bucket'].to_numpy()[np.maximum(group_end - self.max_buckets, 0)]
+        counts['bucket'] = np.where(collapse, floor_bucket, counts['bucket'].to_numpy())
+        return sum_counts(counts, keys + ['bucket'])[0]
+    
+    def merge(self, other):
+        """Combined sketch of both inputs (same keys and relative error)"""
+        return QuantileSketch.merge_all([self, other])
+    
+    @staticmethod
+    def merge_all(sketches):
+        """Combined sketch of many inputs in one pass"""
+        first = sketches[0]
+        if any(s.keys != first.keys or s.relative_error != first.relative_error
+               or s.max_buckets != first.max_buckets for s in sketches):
+            raise ValueError("sketches must share keys, relative_error and max_buckets to merge")
+        merged = pd.concat([s.counts for s in sketches], ignore_index=True)
+        return QuantileSketch(first._sum(merged), first.keys, first.relative_error, first.max_buckets)
+    
+    def rollup(self, keys):
+        """Sketch over coarser groups, e.g. suburb-quarter -> suburb"""
+        return QuantileSketch(self._sum(self.counts, list(keys)), keys, self.relative_error, self.max_buckets)
+    
+    def count(self):
+        """Values per group"""
+        return self.counts.groupby(self.keys, observed=True, sort=True)['count'].sum()
+    
+    def quantile(self, q, lower=None, upper=None):
+        """
+        Approximate quantile per group, interpolated like pandas' linear quantile
+        - lower / upper (optional, aligned to the group index): clip the
+          values first, e.g. a median of winsorized prices
+        - Returns a Series indexed by the group keys
+        """
+        counts = self.counts
+        n = self.count()
+        if len(n) == 0:
+            return pd.Series(dtype=float, index=n.index)
+        
+        # Rows are sorted by group, so each group's cumulative counts end where the next begins
+        cumulative = counts['count'].to_numpy(dtype=np.int64).cumsum()
+        group_end = np.cumsum(n.to_numpy(dtype=np.int64))
+        group_start = group_end - n.to_numpy()
+        
+        rank = q * (n.to_numpy() - 1)
+        below = np.floor(rank).astype(np.int64)
+        above = np.ceil(rank).astype(np.int64)
+        buckets = counts['bucket'].to_numpy()
+        lower = None if lower is None else lower.reindex(n.index).to_numpy()
+        upper = None if upper is None else upper.reindex(n.index).to_numpy()
+        
+        def value_at(order_stat):
+            row = np.searchsorted(cumulative, group_start + order_stat, side='right')
+            value = self._value(buckets[row])
+            if lower is not None:
+                value = np.maximum(value, lower)
+            if upper is not None:
+                value = np.minimum(value, upper)
+            return value
+        
+        value_below, value_above = value_at(below), value_at(above)
+        return pd.Series(value_below + (value_above - value_below) * (rank - below), index=n.index)
+    
+    def to_bytes(self):
+        """Arrow IPC bytes, with the keys and relative error in the schema metadata"""
+        table = pa.Table.from_pandas(self.counts, preserve_index=False)
+        meta = {'keys': self.keys, 'relative_error': self.relative_error, 'max_buckets': self.max_buckets}
+        table = table.replace_schema_metadata({**(table.schema.metadata or {}),
+                                               _META_KEY: json.dumps(meta).encode()})
+        sink = io.BytesIO()
+        with pa.ipc.new_stream(sink, table.schema) as writer:
+            writer.write_table(table)
+        return sink.getvalue()
+    
+    @classmethod
+    def from_bytes(cls, data):
+        table = pa.ipc.open_stream(data).read_all()
+        meta = json.loads(table.schema.metadata[_META_KEY])
+        return cls(table.to_pandas(), meta['keys'], meta['relative_error'],
+                   meta.get('max_buckets', DEFAULT_MAX_BUCKETS))
+
+def sketch_benchmark(transactions_df, relative_errors=(0.001, 0.005, 0.01, 0.02)):
+    """
+    Sketch accuracy against the exact pandas quantiles
+    - Suburb winsorisation bounds (2.5/5/95/97.5%) and suburb-quarter medians
+    - One row per relative error and statistic: max / mean relative error,
+      sketch rows per value and build time
+    """
+    df = transactions_df[['suburb', 'dat', 'price']].copy()
+    df['year_quarter'] = df['dat'].dt.to_period('Q')
+    
+    by_suburb = df.groupby('suburb', observed=True)['price']
+    by_quarter = df.groupby(['suburb', 'year_quarter'], observed=True)['price']
+    exact = {f'suburb_q{q * 100:g}': by_suburb.quantile(q) for q in (0.025, 0.05, 0.95, 0.975)}
+    exact['quarter_median'] = by_quarter.median()
+    
+    rows = []
+    for relative_error in relative_errors:
+        start = time.perf_counter()
+        quarter_sketch = QuantileSketch.from_values(df[['suburb', 'year_quarter']], df['price'], relative_error)
+        suburb_sketch = quarter_sketch.rollup(['suburb'])
+        build_seconds = time.perf_counter() - start
+        
+        for stat, expected in exact.items():
+            if stat == 'quarter_median':
+                estimate = quarter_sketch.quantile(0.5)
+            else:
+                estimate = suburb_sketch.quantile(float(stat[len('suburb_q'):]) / 100)
+            estimate.index = estimate.index.set_names(expected.index.names)
+            expected = expected.dropna()
+            error = ((estimate.reindex(expected.index) - expected) / expected).abs()
+            rows.append({
+                'relative_error': relative_error,
+                'statistic': stat,
+                'groups': len(expected),
+                'max_error': error.max(),
+                'mean_error': error.mean(),
+                'sketch_rows_per_value': len(quarter_sketch.counts) / max(df['price'].notna().sum(), 1),
+                'build_seconds': build_seconds
+            })
+    return pd.DataFrame(rows)
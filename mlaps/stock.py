@@ -0,0 +1,111 @@
+"""
+MLAPS v2: Persisted dwelling-stock index
+- GNAF address counts per locality, built once and stored as a small parquet file
+- Rebuilt only when the GNAF file changes (size/mtime, then SHA-256)
+- Optionally split by a GNAF column (e.g. primary_secondary)
+"""
+
+import hashlib
+import json
+import os
+from pathlib import Path
+
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+from .loaders import read_gnaf
+
+INDEX_VERSION = 1
+_META_KEY = b'mlaps.stock_index'
+
+def file_sha256(path, block_size=1 << 20):
+    """SHA-256 of a file, read in 1 MiB blocks"""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(block_size), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+def index_path_for(gnaf_path, split_by=None):
+    """Default index location: next to the GNAF file"""
+    suffix = f'_{split_by}' if split_by else ''
+    return Path(gnaf_path).with_name(f'dwelling_stock{suffix}.parquet')
+
+def _source_stat(gnaf_path):
+    stat = os.stat(gnaf_path)
+    return {'size': stat.st_size, 'mtime_ns': stat.st_mtime_ns}
+
+def _write_index(table, index_path, meta):
+    """Write atomically, with the source metadata in the parquet schema"""
+    metadata = dict(table.schema.metadata or {})
+    metadata[_META_KEY] = json.dumps(meta).encode()
+    tmp_path = Path(f'{index_path}.tmp')
+    pq.write_table(table.replace_schema_metadata(metadata), tmp_path)
+    os.replace(tmp_path, index_path)
+
+def build_stock_index(gnaf_path, index_path=None, split_by=None):
+    """
+    Count GNAF addresses per locality and persist the counts
+    - Reads only locality_name (and split_by) from GNAF
+    - Stores the source size, mtime and SHA-256 with the index
+    - Returns the index frame: suburb, [split_by], dwelling_stock
+    """
+    index_path = Path(index_path) if index_path else index_path_for(gnaf_path, split_by)
+    keys = ['locality_name'] + ([split_by] if split_by else [])
+    
+    gnaf = read_gnaf(gnaf_path, columns=keys)
+    stock = gnaf.groupby(keys, observed=True, dropna=False).size().reset_index(name='dwelling_stock')
+    stock = stock.rename(columns={'locality_name': 'suburb'})
+    stock['suburb'] = stock['suburb'].astype(str)
+    
+    meta = dict(_source_stat(gnaf_path), sha256=file_sha256(gnaf_path),
+                split_by=split_by, version=INDEX_VERSION)
+    _write_index(pa.Table.from_pandas(stock, preserve_index=False), index_path, meta)
+    return stock
+
+def _current_index(index_path, gnaf_path, split_by):
+    """
+    The stored index table if it was built from the current GNAF file, else None
+    - Same size and mtime: current without reading GNAF
+    - Same size, new mtime: compare content hashes; on a match the stored
+      mtime is refreshed so the next run takes the fast path again
+    """
+    try:
+        table = pq.read_table(index_path, memory_map=True)
+        meta = json.loads(table.schema.metadata[_META_KEY])
+    except (OSError, KeyError, TypeError, ValueError, pa.ArrowInvalid):
+        return None
+    if meta.get('version') != INDEX_VERSION or meta.get('split_by') != split_by:
+        return None
+    
+    source = _source_stat(gnaf_path)
+    if meta['size'] != source['size']:
+        return None
+    if meta['mtime_ns'] == source['mtime_ns']:
+        return table
+    if meta['sha256'] != file_sha256(gnaf_path):
+        return None
+    
+    meta['mtime_ns'] = source['mtime_ns']
+    _write_index(table, index_path, meta)
+    return table
+
+def load_dwelling_stock(gnaf_path, index_path=None, split_by=None, suburbs=None, rebuild=False):
+    """
+    Dwelling stock per suburb from the persisted index
+    - Builds the index on first use and whenever GNAF has changed
+    - split_by=None: suburb, dwelling_stock (as metrics.dwelling_stock)
+    - split_by=column: one row per suburb and value of that column
+    - suburbs: keep only these suburbs
+    """
+    index_path = Path(index_path) if index_path else index_path_for(gnaf_path, split_by)
+    
+    table = None if rebuild else _current_index(index_path, gnaf_path, split_by)
+    if table is None:
+        stock = build_stock_index(gnaf_path, index_path, split_by)
+    else:
+        stock = table.to_pandas()
+    
+    if suburbs is not None:
+        stock = stock[stock['suburb'].isin(set(suburbs))].reset_index(drop=True)
+    return stock
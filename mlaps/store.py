@@ -0,0 +1,144 @@
+"""
+MLAPS v2: Incremental update store
+- Transactions kept as append-only parquet parts, one per loaded file
+- Raw per-suburb stage outputs (LML, MOM, panel, DDR, MLA) and the macro
+  proxy persisted next to them, so a daily update only recomputes the
+  suburbs with new sales
+- Loaded files are recorded by SHA-256; loading the same file twice is a no-op
+"""
+
+import json
+import os
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from .defaults import STORE_DIR
+from .loaders import TRANSACTION_COLUMNS, read_transactions
+from .macro import macro_quarterly
+from .scheduler import STAGE_PARAMS
+from .stock import file_sha256
+
+# Bump when the layout or a stage's stored output changes
+STORE_VERSION = 1
+
+class TransactionStore:
+    """
+    Append-only transactions plus the latest raw stage outputs
+    - transactions/part-NNNNN.parquet: one part per append (dat, suburb, price)
+    - stages/<stage>.parquet and macro.parquet: outputs of the last run
+    - store.json: parts with their source file hash, and the sale date range
+    """
+    
+    def __init__(self, store_dir=STORE_DIR):
+        self.store_dir = Path(store_dir)
+        self.parts_dir = self.store_dir / 'transactions'
+        self.stages_dir = self.store_dir / 'stages'
+        self.meta_path = self.store_dir / 'store.json'
+        self.meta = self._read_meta()
+    
+    def _read_meta(self):
+        try:
+            meta = json.loads(self.meta_path.read_text())
+        except (OSError, ValueError):
+            return None
+        return meta if meta.get('version') == STORE_VERSION else None
+    
+    def _write_meta(self):
+        tmp_path = self.meta_path.with_suffix(f'.{os.getpid()}.tmp')
+        tmp_path.write_text(json.dumps(self.meta, indent=2))
+        os.replace(tmp_path, self.meta_path)
+    
+    @staticmethod
+    def _write_frame(df, path):
+        tmp_path = path.with_suffix(f'.{os.getpid()}.tmp')
+        df.to_parquet(tmp_path, index=False)
+        os.replace(tmp_path, path)
+    
+    @property
+    def initialised(self):
+        return self.meta is not None and (self.stages_dir / 'mla.parquet').exists()
+    
+    def create(self):
+        """Start an empty store (existing parts and stages are discarded)"""
+        for directory in (self.parts_dir, self.stages_dir):
+            directory.mkdir(parents=True, exist_ok=True)
+            for path in directory.glob('*.parquet'):
+                path.unlink()
+        self.meta = {'version': STORE_VERSION, 'parts': [], 'first_sale': None, 'last_sale': None}
+        self._write_meta()
+    
+    def has_source(self, sha256):
+        return any(part['sha256'] == sha256 for part in self.meta['parts'])
+    
+    def append(self, transactions, source, sha256):
+        """Add transactions as a new part and record the source file"""
+        df = transactions[TRANSACTION_COLUMNS].copy()
+        df['suburb'] = df['suburb'].astype(str)
+        
+        path = self.parts_dir / f"part-{len(self.meta['parts']):05d}.parquet"
+        self._write_frame(df, path)
+        self.meta['parts'].append({'file': path.name, 'rows': len(df), 'source': str(source), 'sha256': sha256})
+        
+        if len(df) > 0:
+            dates = [df['dat'].min(), df['dat'].max()] + [
+                pd.Timestamp(self.meta[key]) for key in ('first_sale', 'last_sale') if self.meta[key]]
+            self.meta['first_sale'], self.meta['last_sale'] = str(min(dates)), str(max(dates))
+        self._write_meta()
+    
+    def read_transactions(self, columns=TRANSACTION_COLUMNS, start=None, end=None, suburbs=None):
+        """Stored transactions (filters pushed down to every part), stably sorted by date"""
+        df = read_transactions(self.parts_dir, columns=columns, start=start, end=end, suburbs=suburbs)
+        return df.sort_values('dat', kind='stable').reset_index(drop=True)
+    
+    @property
+    def last_sale(self):
+        return pd.Timestamp(self.meta['last_sale']) if self.meta['last_sale'] else None
+    
+    def load(self):
+        """(stages, macro) from the last run"""
+        stages = {stage: pd.read_parquet(self.stages_dir / f'{stage}.parquet') for stage in STAGE_PARAMS}
+        return stages, pd.read_parquet(self.store_dir / 'macro.parquet')
+    
+    def save(self, stages, macro):
+        self._write_frame(macro, self.store_dir / 'macro.parquet')
+        for stage in STAGE_PARAMS:
+            self._write_frame(stages[stage], self.stages_dir / f'{stage}.parquet')
+
+def splice(stored, fresh, suburbs, sort_by=('suburb',)):
+    """Stored rows for every suburb not in suburbs, plus the fresh rows, ordered like a full run"""
+    kept = stored[~stored['suburb'].astype(str).isin(suburbs)]
+    parts = [df for df in (kept, fresh) if len(df) > 0]
+    if not parts:
+        return fresh
+    df = pd.concat(parts, ignore_index=True)
+    df['suburb'] = df['suburb'].astype(str)
+    return df.sort_values(list(sort_by), kind='stable').reset_index(drop=True)
+
+def extend_macro(macro, fresh):
+    """
+    Stored weekly macro proxy plus the weeks of fresh that it does not cover
+    - Weeks already stored keep their values, so untouched suburbs keep their MLA
+    """
+    new_weeks = fresh[~fresh['date'].isin(macro['date'])]
+    if len(new_weeks) == 0:
+        return macro
+    return pd.concat([macro, new_weeks], ignore_index=True).sort_values('date').reset_index(drop=True)
+
+def changed_macro_quarters(macro, extended, lead_weeks):
+    """Quarters whose lead-shifted macro mean differs between two macro series"""
+    before = macro_quarterly(macro, lead_weeks).set_index('year_quarter')['macro_return']
+    after = macro_quarterly(extended, lead_weeks).set_index('year_quarter')['macro_return']
+    before = before.reindex(after.index)
+    changed = ~np.isclose(before.to_numpy(), after.to_numpy(), rtol=0, atol=0, equal_nan=True)
+    return set(after.index[changed])
+
+def sources_to_load(store, paths):
+    """(path, sha256) for each file not yet in the store, in the given order"""
+    pending = []
+    for path in paths:
+        sha256 = file_sha256(path)
+        if not store.has_source(sha256) and sha256 not in {s for _, s in pending}:
+            pending.append((Path(path), sha256))
+    return pending
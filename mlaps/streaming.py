@@ -0,0 +1,396 @@
+"""
+MLAPS v2: Out-of-core streaming ingestion
+- Reads transactions.parquet batch by batch (row groups), never as one frame
+- Pass 1: sales count per suburb and the date range (suburb, dat only)
+- Pass 2: per-suburb accumulators updated batch by batch
+  - 12-month sales counts (LML)
+  - exact mode: (suburb, date, price) spilled to disk in suburb partitions of
+    about batch_rows sales, then read back one partition at a time for the
+    panel (DDR and MLA) and the first/last 30% windows (MOM)
+  - approximate mode: mergeable quantile sketches for the panel and
+    first/last 30% window buffers for MOM
+- Exact mode holds one batch or one partition at a time, plus the results;
+  memory does not grow with the length of the history
+"""
+
+import tempfile
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import pyarrow.parquet as pq
+
+from .loaders import require_transactions
+from .metrics import lml_from_sales, momentum_from_windows
+from .sketches import QuantileSketch, sum_counts
+
+BATCH_ROWS = 1_000_000
+_WINDOW_FIELDS = ('code', 'dat', 'seq', 'price')
+_SPILL_DTYPE = np.dtype([('code', np.int64), ('dat', np.int64), ('seq', np.int64), ('price', np.float64)])
+
+class SuburbCodes:
+    """Integer code per suburb name, stable across batches"""
+    
+    def __init__(self):
+        self._codes = {}
+    
+    def __len__(self):
+        return len(self._codes)
+    
+    def encode(self, suburbs):
+        codes, uniques = pd.factorize(suburbs)
+        lookup = np.array([self._codes.setdefault(name, len(self._codes)) for name in uniques], dtype=np.int64)
+        return lookup[codes]
+    
+    @property
+    def names(self):
+        return np.array(list(self._codes), dtype=object)
+
+def iter_batches(path, columns, batch_rows=BATCH_ROWS, start=None, end=None, suburbs=None):
+    """
+    Transactions one parquet batch at a time, as small pandas frames
+    - Only the given columns are read
+    - Rows without a suburb or sale date are skipped
+    - start / end / suburbs filter each batch as it arrives
+    """
+    parquet = pq.ParquetFile(path)
+    for batch in parquet.iter_batches(batch_size=batch_rows, columns=columns):
+        df = batch.to_pandas()
+        df['dat'] = pd.to_datetime(df['dat'])
+        
+        keep = df['suburb'].notna() & df['dat'].notna()
+        if start is not None:
+            keep &= df['dat'] >= pd.Timestamp(start)
+        if end is not None:
+            keep &= df['dat'] <= pd.Timestamp(end)
+        if suburbs is not None:
+            keep &= df['suburb'].isin(set(suburbs))
+        yield df[keep]
+
+def _counts(total, codes, size):
+    """Add bincount(codes) to a running count array that may need to grow"""
+    total = np.pad(total, (0, size - len(total)))
+    return total + np.bincount(codes, minlength=size)
+
+class WindowBuffer:
+    """
+    Each suburb's first limit[code] sales by (date, file order), or its last
+    limit[code] sales when latest is True
+    - Batches are pre-filtered against each full suburb's current edge date
+    - Candidates are merged (one sort) only once they outnumber the buffer,
+      so sorting cost stays proportional to the data, not batches × buffer
+    """
+    
+    def __init__(self, limit, latest=False):
+        self.limit = limit
+        self.sign = -1 if latest else 1
+        self.edge = np.full(len(limit), np.iinfo(np.int64).max)
+        self.chunks = []
+        self.size = 0
+        self.pending = 0
+    
+    def add(self, batch):
+        # sign * date beyond the edge can never make the window
+        keep = self.sign * batch['dat'] <= self.edge[batch['code']]
+        if keep.any():
+            self.chunks.append({field: values[keep] for field, values in batch.items()})
+            self.pending += int(keep.sum())
+        if self.pending > max(self.size, BATCH_ROWS):
+            self.compact()
+    
+    def compact(self):
+        if not self.chunks:
+            return
+        merged = {field: np.concatenate([chunk[field] for chunk in self.chunks]) for field in _WINDOW_FIELDS}
+        order = np.lexsort((self.sign * merged['seq'], self.sign * merged['dat'], merged['code']))
+        merged = {field: values[order] for field, values in merged.items()}
+        
+        code = merged['code']
+        starts = np.flatnonzero(np.r_[True, code[1:] != code[:-1]]) if len(code) else np.zeros(0, dtype=int)
+        group_n = np.diff(np.r_[starts, len(code)])
+        rank = np.arange(len(code)) - np.repeat(starts, group_n)
+        keep = rank < self.limit[code]
+        merged = {field: values[keep] for field, values in merged.items()}
+        
+        # Full windows: the last kept sale is the new edge
+        code = merged['code']
+        is_last = np.r_[code[1:] != code[:-1], True] if len(code) else np.zeros(0, dtype=bool)
+        last_code = code[is_last]
+        full = np.bincount(code, minlength=len(self.limit))[last_code] >= self.limit[last_code]
+        self.edge[last_code[full]] = self.sign * merged['dat'][is_last][full]
+        
+        self.chunks = [merged]
+        self.size = len(code)
+        self.pending = 0
+    
+    def window(self):
+        self.compact()
+        return self.chunks[0] if self.chunks else {field: np.zeros(0, dtype=float if field == 'price' else np.int64)
+                                                   for field in _WINDOW_FIELDS}
+
+class SuburbSpill:
+    """
+    Pass-2 sales spilled to disk, one file per partition of suburbs
+    - Suburbs are grouped in code order into partitions of about max_rows sales
+      (from the pass-1 counts); a larger suburb shares its partition with nothing
+      after it
+    - Reading a partition back gives every sale of its suburbs, so suburb-wide
+      quantiles stay exact while only one partition is in memory
+    - A file is opened (append) only while a batch is written to it, so the
+      partition count is not limited by the open-file limit
+    """
+    
+    def __init__(self, counts, max_rows, directory):
+        _, self.partition = np.unique((np.cumsum(counts) - counts) // max(max_rows, 1), return_inverse=True)
+        n_partitions = self.partition.max(initial=-1) + 1
+        self.paths = [Path(directory) / f'partition_{i}.bin' for i in range(n_partitions)]
+    
+    def add(self, batch):
+        part = self.partition[batch['code']]
+        order = np.argsort(part, kind='stable')
+        records = np.empty(len(order), dtype=_SPILL_DTYPE)
+        for field in _WINDOW_FIELDS:
+            records[field] = batch[field][order]
+        edges = np.searchsorted(part[order], np.arange(len(self.paths) + 1))
+        for i in np.flatnonzero(np.diff(edges)):
+            with open(self.paths[i], 'ab') as file:
+                records[edges[i]:edges[i + 1]].tofile(file)
+    
+    def __iter__(self):
+        """Each partition's sales in file order, as {field: array}; files are removed once read"""
+        for path in self.paths:
+            if not path.exists():
+                continue
+            records = np.fromfile(path, dtype=_SPILL_DTYPE)
+            path.unlink()
+            yield {field: records[field] for field in _WINDOW_FIELDS}
+
+def _quarter(dat_ns):
+    """Quarter ordinal (year * 4 + quarter - 1) of datetime64[ns] values given as int64"""
+    dat = dat_ns.view('datetime64[ns]')
+    year = dat.astype('datetime64[Y]').astype(np.int64) + 1970
+    month = dat.astype('datetime64[M]').astype(np.int64) % 12
+    return (year * 4 + month // 3).astype(np.int32)
+
+def _group_median(values, groups, n_groups):
+    """NaN-skipping median per group, NaN for empty groups"""
+    return pd.Series(values).groupby(groups).median().reindex(np.arange(n_groups)).to_numpy()
+
+def _group_quantile(values, groups, n_groups, q):
+    return pd.Series(values).groupby(groups).quantile(q).reindex(np.arange(n_groups)).to_numpy()
+
+CELL_KEYS = ['code', 'quarter']
+
+class QuarterSketches:
+    """Suburb-quarter price sketches and sale counts, merged as batches arrive"""
+    
+    def __init__(self, relative_error):
+        self.relative_error = relative_error
+        self.sketches = []
+        self.cell_counts = []
+        self.size = 0
+        self.pending = 0
+    
+    def add(self, code, quarter, price):
+        keys = pd.DataFrame({'code': code.astype(np.int32), 'quarter': quarter})
+        self.sketches.append(QuantileSketch.from_values(keys, price, self.relative_error))
+        self.cell_counts.append(sum_counts(keys.assign(count=np.ones(len(keys), dtype=np.int32)), CELL_KEYS)[0])
+        self.pending += len(self.sketches[-1].counts)
+        if self.pending > max(self.size, BATCH_ROWS):
+            self.compact()
+    
+    def compact(self):
+        if len(self.sketches) > 1:
+            self.sketches = [QuantileSketch.merge_all(self.sketches)]
+            self.cell_counts = [sum_counts(pd.concat(self.cell_counts, ignore_index=True), CELL_KEYS)[0]]
+        self.size = len(self.sketches[0].counts) if self.sketches else 0
+        self.pending = 0
+
+_QUANTILES = (0.05, 0.95, 0.025, 0.975)
+
+def _exact_partition(sales, older_k, recent_k, bounds, medians):
+    """
+    Panel cells of one spilled partition (every sale of its suburbs)
+    - Fills its suburbs' winsorization bounds and MOM window medians in place
+    - MOM windows by (date, file order): the first older_k and last recent_k sales
+    """
+    code, price = sales['code'], sales['price']
+    by_suburb = pd.Series(price).groupby(code)
+    for q in _QUANTILES:
+        quantiles = by_suburb.quantile(q)
+        bounds[q][quantiles.index] = quantiles.to_numpy()
+    
+    cells = pd.DataFrame({
+        'code': code,
+        'quarter': _quarter(sales['dat']),
+        'price': price,
+        'price_winsorized': np.clip(price, bounds[0.05][code], bounds[0.95][code])
+    })
+    panel = cells.groupby(['code', 'quarter']).agg(
+        price=('price', 'median'),
+        price_winsorized=('price_winsorized', 'median'),
+        n_sales=('price', 'size')
+    ).reset_index()
+    
+    # Position of each sale in its suburb's (date, file order), as the window buffers keep them
+    order = np.lexsort((sales['seq'], sales['dat'], code))
+    code, dat, price = code[order], sales['dat'][order], price[order]
+    starts = np.flatnonzero(np.diff(code, prepend=-1))
+    group_n = np.diff(np.append(starts, len(code)))
+    position = np.arange(len(code)) - np.repeat(starts, group_n)
+    
+    price = np.clip(price, bounds[0.025][code], bounds[0.975][code])
+    windows = {'older': position < older_k[code],
+               'recent': position >= np.repeat(group_n, group_n) - recent_k[code]}
+    for name, in_window in windows.items():
+        window = pd.DataFrame({'price': price[in_window], 'dat': dat[in_window]}).groupby(code[in_window]).median()
+        medians[f'{name}_price'][window.index] = window['price'].to_numpy()
+        medians[f'{name}_dat'][window.index] = window['dat'].to_numpy()
+    
+    return panel
+
+def _empty_panel():
+    empty = np.zeros(0, np.int64)
+    return pd.DataFrame({'code': empty, 'quarter': empty, 'price': [], 'price_winsorized': [], 'n_sales': empty})
+
+def _sketch_panel(quarter_sketches, n_suburbs):
+    """Winsorization bounds and panel cells from the suburb-quarter sketches"""
+    quarter_sketches.compact()
+    if not quarter_sketches.sketches:
+        return {q: np.full(n_suburbs, np.nan) for q in _QUANTILES}, _empty_panel()
+    
+    sketch = quarter_sketches.sketches[0]
+    n_sales = quarter_sketches.cell_counts[0].set_index(CELL_KEYS)['count'].astype(np.int64)
+    suburb_sketch = sketch.rollup(['code'])
+    bounds = {q: suburb_sketch.quantile(q).reindex(np.arange(n_suburbs)).to_numpy() for q in _QUANTILES}
+    
+    cell_code = n_sales.index.get_level_values('code')
+    lower = pd.Series(bounds[0.05][cell_code], index=n_sales.index)
+    upper = pd.Series(bounds[0.95][cell_code], index=n_sales.index)
+    panel = pd.DataFrame({
+        'price': sketch.quantile(0.5).reindex(n_sales.index),
+        'price_winsorized': sketch.quantile(0.5, lower, upper).reindex(n_sales.index),
+        'n_sales': n_sales
+    }).reset_index()
+    return bounds, panel
+
+def stream_components(path, gnaf_df, min_sales=15, batch_rows=BATCH_ROWS, start=None, end=None,
+                      suburbs=None, relative_error=None):
+    """
+    LML, MOM and the quarterly panel from a transactions file too large for memory
+    - Two passes over the parquet batches; no full frame, no global sort
+    - Same results as calculate_lml_v2, calculate_momentum_v2 and
+      build_quarterly_panel on the loaded file; sales on the same date at a
+      MOM window edge are taken in file order
+    - Exact mode spills (suburb, date, price) to the temp directory (TMPDIR),
+      about 32 bytes per sale, and reads it back one partition of about
+      batch_rows sales at a time
+    - relative_error: approximate mode; quarterly medians and winsorization
+      bounds come from mergeable sketches (see sketches), with nothing spilled
+    - ValueError after pass 1 when no transaction matches the filters
+    - Returns ({'lml', 'mom', 'panel'}, summary) where summary holds the
+      transaction count, batch count and first/last sale date
+    """
+    codes = SuburbCodes()
+    filters = dict(batch_rows=batch_rows, start=start, end=end, suburbs=suburbs)
+    
+    # Pass 1: sales per suburb and the date range
+    counts = np.zeros(0, dtype=np.int64)
+    first_sale = last_sale = None
+    n_batches = 0
+    for df in iter_batches(path, ['suburb', 'dat'], **filters):
+        n_batches += 1
+        counts = _counts(counts, codes.encode(df['suburb']), len(codes))
+        if len(df) > 0:
+            first_sale = df['dat'].min() if first_sale is None else min(first_sale, df['dat'].min())
+            last_sale = df['dat'].max() if last_sale is None else max(last_sale, df['dat'].max())
+    
+    require_transactions(counts.sum(), path, start, end, suburbs)
+    n_suburbs = len(codes)
+    summary = {'transactions': int(counts.sum()), 'batches': n_batches,
+               'first_sale': first_sale, 'last_sale': last_sale}
+    cutoff_ns = (last_sale - pd.DateOffset(months=12)).value if last_sale is not None else 0
+    
+    # MOM windows: first / last 30% of sales, all sales as "recent" when that rounds to 0
+    older_k = np.where(counts >= min_sales, (counts * 0.3).astype(int), 0)
+    recent_k = np.where(counts >= min_sales, np.where(older_k > 0, older_k, counts), 0)
+    bounds = {q: np.full(n_suburbs, np.nan) for q in _QUANTILES}
+    medians = {name: np.full(n_suburbs, np.nan) for name in ('recent_price', 'recent_dat', 'older_price', 'older_dat')}
+    
+    # Pass 2: accumulators (exact mode spills the sales and reads them back by partition)
+    sales_12m = np.zeros(n_suburbs, dtype=np.int64)
+    with tempfile.TemporaryDirectory(prefix='mlaps_stream_') as spill_dir:
+        if relative_error is None:
+            spill = SuburbSpill(counts, batch_rows, spill_dir)
+        else:
+            quarter_sketches = QuarterSketches(relative_error)
+            older, recent = WindowBuffer(older_k), WindowBuffer(recent_k, latest=True)
+        seq = 0
+        for df in iter_batches(path, ['suburb', 'dat', 'price'], **filters):
+            code = codes.encode(df['suburb'])
+            dat_ns = df['dat'].to_numpy().astype('datetime64[ns]').view('i8')
+            price = df['price'].to_numpy(dtype=float)
+            
+            sales_12m += np.bincount(code[dat_ns >= cutoff_ns], minlength=n_suburbs)
+            
+            if relative_error is None:
+                spill.add({'code': code, 'dat': dat_ns, 'seq': seq + np.arange(len(df)), 'price': price})
+            else:
+                quarter_sketches.add(code, _quarter(dat_ns), price)
+                eligible = recent_k[code] > 0
+                batch = {'code': code[eligible], 'dat': dat_ns[eligible],
+                         'seq': seq + np.flatnonzero(eligible), 'price': price[eligible]}
+                older.add(batch)
+                recent.add(batch)
+            seq += len(df)
+        
+        # Per-suburb winsorization bounds, the panel and the MOM window medians
+        if relative_error is None:
+            cells = [_exact_partition(sales, older_k, recent_k, bounds, medians) for sales in spill]
+            panel = pd.concat(cells, ignore_index=True) if cells else _empty_panel()
+            del cells
+        else:
+            bounds, panel = _sketch_panel(quarter_sketches, n_suburbs)
+            for name, buffer in (('recent', recent), ('older', older)):
+                window = buffer.window()
+                code = window['code']
+                price = np.clip(window['price'], bounds[0.025][code], bounds[0.975][code])
+                medians[f'{name}_price'] = _group_median(price, code, n_suburbs)
+                medians[f'{name}_dat'] = _group_median(window['dat'], code, n_suburbs)
+            del quarter_sketches, older, recent
+    
+    # Suburbs in name order, as groupby on the loaded frame returns them
+    names = codes.names
+    name_order = np.argsort(names.astype(str), kind='stable')
+    name_rank = np.empty(n_suburbs, dtype=np.int64)
+    name_rank[name_order] = np.arange(n_suburbs)
+    categories = pd.Index(names[name_order].astype(str))
+    
+    # LML
+    has_recent = np.flatnonzero(sales_12m > 0)
+    has_recent = has_recent[np.argsort(name_rank[has_recent])]
+    lml = lml_from_sales(pd.DataFrame({
+        'suburb': pd.Categorical.from_codes(name_rank[has_recent], categories=categories),
+        'sales_12m': sales_12m[has_recent]
+    }), gnaf_df)
+    
+    # Panel in (name, quarter) order
+    panel['rank'] = name_rank[panel['code'].to_numpy()]
+    panel = panel.sort_values(['rank', 'quarter']).reset_index(drop=True)
+    quarter = panel['quarter'].to_numpy()
+    quarter_start = pd.to_datetime(pd.DataFrame({'year': quarter // 4, 'month': quarter % 4 * 3 + 1, 'day': 1}))
+    panel.insert(0, 'suburb', pd.Categorical.from_codes(panel['rank'].to_numpy(), categories=categories))
+    panel.insert(1, 'year_quarter', quarter_start.dt.to_period('Q'))
+    panel = panel[['suburb', 'year_quarter', 'price', 'price_winsorized', 'n_sales']]
+    panel['suburb_sales'] = panel.groupby('suburb', observed=True)['n_sales'].transform('sum')
+    
+    # MOM from the window medians, prices winsorized at the suburb's 2.5/97.5 percentiles
+    mom_suburbs = np.flatnonzero(recent_k > 0)
+    mom_suburbs = mom_suburbs[np.argsort(name_rank[mom_suburbs])]
+    mom = momentum_from_windows(
+        pd.Categorical.from_codes(name_rank[mom_suburbs], categories=categories),
+        medians['recent_price'][mom_suburbs], medians['older_price'][mom_suburbs],
+        medians['recent_dat'][mom_suburbs] - medians['older_dat'][mom_suburbs]
+    )
+    
+    return {'lml': lml, 'mom': mom, 'panel': panel}, summary
@@ -0,0 +1,22 @@
+"""
+Scores API tests: conditional requests
+"""
+
+import pytest
+
+from mlaps.api import etag_matches
+
+ETAG = '"0123456789abcdef0123"'
+
+@pytest.mark.parametrize('header, matches', [
+    (ETAG, True),
+    ('W/' + ETAG, True),
+    ('"other", ' + ETAG, True),
+    ('*', True),
+    ('"0123456789abcdef0123456"', False),
+    ('"x' + ETAG[1:], False),
+    ('', False),
+    (None, False),
+])
+def test_etag_matches(header, matches):
+    assert etag_matches(header, ETAG) == matches
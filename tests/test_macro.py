@@ -0,0 +1,31 @@
+"""
+Macro file loader tests: date and value column detection
+"""
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from mlaps.macro import read_macro_file
+
+def monthly_index(n=36):
+    """Monthly index levels growing 1% a month"""
+    return pd.DataFrame({'date': pd.date_range('2020-01-31', periods=n, freq='ME').strftime('%Y-%m-%d'),
+                         'm2': 100 * 1.01 ** np.arange(n)})
+
+@pytest.mark.parametrize('columns', [['date', 'm2'], ['m2', 'date']])
+def test_read_macro_file_detects_columns_in_either_order(tmp_path, columns):
+    path = tmp_path / 'm2.csv'
+    monthly_index()[columns].to_csv(path, index=False)
+    macro = read_macro_file(path)
+    
+    pd.testing.assert_frame_equal(macro, read_macro_file(path, date_column='date', value_column='m2'))
+    assert len(macro) > 150
+    # Weekly changes of a 1% monthly growth, interpolated in time
+    assert macro['macro_return'].between(0.001, 0.004).all()
+
+def test_read_macro_file_without_date_column(tmp_path):
+    path = tmp_path / 'm2.csv'
+    monthly_index().assign(date=np.arange(36)).to_csv(path, index=False)
+    with pytest.raises(ValueError, match='no date column among date, m2'):
+        read_macro_file(path)
@@ -0,0 +1,96 @@
+"""
+MOM regression test: the grouped single-pass calculate_momentum_v2 against
+the original per-suburb loop
+- The loop sorted each suburb with the default (unstable) quicksort, so sales on
+  the same date could land on either side of the 30% windows; the grouped pass
+  keeps them in input order. Ties are compared against the loop with a stable sort
+"""
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from mlaps.metrics import calculate_momentum_v2
+
+def legacy_momentum(transactions_df, min_sales=15, sort_kind='quicksort'):
+    """The per-suburb loop calculate_momentum_v2 replaced (reference only; quicksort is the pandas default)"""
+    momentum_list = []
+    
+    for suburb in transactions_df['suburb'].unique():
+        suburb_data = transactions_df[transactions_df['suburb'] == suburb].copy()
+        suburb_data = suburb_data.sort_values('dat', kind=sort_kind)
+        
+        if len(suburb_data) >= min_sales:
+            lower = suburb_data['price'].quantile(0.025)
+            upper = suburb_data['price'].quantile(0.975)
+            suburb_data['price_winsorized'] = suburb_data['price'].clip(lower, upper)
+            
+            n = len(suburb_data)
+            recent_sales = suburb_data.iloc[-int(n*0.3):]
+            older_sales = suburb_data.iloc[:int(n*0.3)]
+            
+            recent_median = recent_sales['price_winsorized'].median()
+            older_median = older_sales['price_winsorized'].median()
+            
+            time_span_days = (recent_sales['dat'].median() - older_sales['dat'].median()).days
+            time_span_years = max(time_span_days / 365.25, 0.5)
+            
+            total_growth = (recent_median / older_median) - 1
+            annualized_growth = ((1 + total_growth) ** (1 / time_span_years)) - 1
+            
+            momentum_list.append({
+                'suburb': suburb,
+                'MOM': annualized_growth * 100,
+                'latest_price': recent_median,
+                'time_span_years': time_span_years,
+                'mom_reliable': True
+            })
+    
+    return pd.DataFrame(momentum_list)
+
+def synthetic_transactions(seed=0, n_suburbs=40, same_day_sales=False):
+    """
+    Seeded sales: suburb sizes from 1 to ~300 (many below min_sales), outlier
+    prices, and rows not in suburb order
+    - same_day_sales: weekly dates, so dates repeat within suburbs; otherwise
+      every sale in a suburb has its own date
+    """
+    rng = np.random.default_rng(seed)
+    sizes = np.concatenate([np.arange(1, 20), rng.integers(20, 300, n_suburbs - 19)])
+    suburb = np.repeat([f'SUBURB {i:02d}' for i in range(n_suburbs)], sizes)
+    n = len(suburb)
+    if same_day_sales:
+        days = rng.integers(0, 365 * 8, n) // 7 * 7
+    else:
+        days = np.concatenate([rng.choice(365 * 8, size, replace=False) for size in sizes])
+    dat = pd.Timestamp('2015-01-01') + pd.to_timedelta(days, unit='D')
+    price = np.exp(13.5 + 0.25 * rng.standard_normal(n) + days / 365 * 0.04)
+    price[rng.random(n) < 0.01] *= 20
+    order = rng.permutation(n)
+    return pd.DataFrame({'dat': dat[order], 'suburb': suburb[order], 'price': price[order]})
+
+@pytest.mark.parametrize('seed', [0, 1, 2])
+@pytest.mark.parametrize('min_sales', [15, 5])
+def test_momentum_matches_legacy_loop(seed, min_sales):
+    transactions = synthetic_transactions(seed)
+    expected = legacy_momentum(transactions, min_sales=min_sales)
+    result = calculate_momentum_v2(transactions, min_sales=min_sales)
+    
+    counts = transactions['suburb'].value_counts()
+    assert set(result['suburb']) == set(counts.index[counts >= min_sales])
+    pd.testing.assert_frame_equal(result.reset_index(drop=True), expected, check_dtype=False,
+                                  rtol=1e-12, atol=0)
+
+@pytest.mark.parametrize('seed', [0, 1, 2])
+def test_momentum_same_day_sales(seed):
+    transactions = synthetic_transactions(seed, same_day_sales=True)
+    expected = legacy_momentum(transactions, sort_kind='stable')
+    result = calculate_momentum_v2(transactions)
+    pd.testing.assert_frame_equal(result.reset_index(drop=True), expected, check_dtype=False,
+                                  rtol=1e-12, atol=0)
+
+def test_momentum_without_enough_sales():
+    transactions = synthetic_transactions(0)
+    result = calculate_momentum_v2(transactions, min_sales=10_000)
+    assert len(result) == 0
+    assert list(result.columns) == ['suburb', 'MOM', 'latest_price', 'time_span_years', 'mom_reliable']
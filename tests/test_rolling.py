@@ -0,0 +1,49 @@
+"""
+Rolling history regression test: the incremental month/quarter updates against
+the one-shot metrics on the same window of sales
+"""
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from mlaps.macro import get_macro_proxy
+from mlaps.metrics import calculate_drawdown_v2, calculate_momentum_v2
+from mlaps.panel import build_quarterly_panel
+from mlaps.rolling import rolling_drawdown_mla, rolling_momentum
+
+def dated_sales(seed=0, n_suburbs=30, n=6000):
+    """Seeded sales sorted by date (as calculate_mlaps_rolling passes them), some without a price"""
+    rng = np.random.default_rng(seed)
+    days = np.sort(rng.integers(0, 365 * 8, n))
+    dat = pd.Timestamp('2015-01-01') + pd.to_timedelta(days, unit='D')
+    suburb = np.array([f'SUBURB {i:02d}' for i in range(n_suburbs)])[rng.integers(0, n_suburbs, n)]
+    price = np.exp(13.5 + 0.25 * rng.standard_normal(n) + days / 365 * 0.04)
+    price[rng.random(n) < 0.02] = np.nan
+    return pd.DataFrame({'dat': dat, 'suburb': suburb, 'price': price})
+
+@pytest.mark.parametrize('min_sales', [15, 3])
+def test_rolling_momentum_matches_snapshot(min_sales):
+    transactions = dated_sales()
+    month_ends = pd.date_range('2016-01-31', '2022-12-31', freq=pd.offsets.MonthEnd())
+    history = rolling_momentum(transactions, month_ends, min_sales=min_sales)
+    
+    for as_of in month_ends[::7]:
+        expected = calculate_momentum_v2(transactions[transactions['dat'] <= as_of], min_sales=min_sales)
+        result = history[history['as_of'] == as_of].drop(columns='as_of')
+        pd.testing.assert_frame_equal(result.sort_values('suburb').reset_index(drop=True),
+                                      expected.sort_values('suburb').reset_index(drop=True),
+                                      check_dtype=False, rtol=1e-12)
+
+def test_rolling_drawdown_matches_window_panel():
+    transactions = dated_sales()
+    quarter_ends = pd.date_range('2017-12-31', '2022-12-31', freq=pd.offsets.QuarterEnd())
+    ddr_hist, _ = rolling_drawdown_mla(transactions, get_macro_proxy(transactions, seed=0), quarter_ends,
+                                       window_months=36)
+    
+    for quarter_end in quarter_ends[::5]:
+        window = transactions[(transactions['dat'] > quarter_end - pd.DateOffset(months=36))
+                              & (transactions['dat'] <= quarter_end)]
+        expected = calculate_drawdown_v2(window, panel=build_quarterly_panel(window))
+        result = ddr_hist[ddr_hist['quarter_end'] == quarter_end].drop(columns='quarter_end')
+        pd.testing.assert_frame_equal(result.reset_index(drop=True), expected, check_dtype=False, rtol=1e-12)
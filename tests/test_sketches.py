@@ -0,0 +1,45 @@
+"""
+Quantile sketch tests: relative error, bucket bound and merging
+"""
+
+import numpy as np
+import pandas as pd
+
+from mlaps.sketches import QuantileSketch
+
+def spread_prices(seed=0, n=4000, n_groups=5):
+    """Prices spanning 1:10^6 in a few groups"""
+    rng = np.random.default_rng(seed)
+    keys = pd.DataFrame({'group': rng.integers(0, n_groups, n).astype(np.int32)})
+    return keys, np.exp(rng.uniform(np.log(1e3), np.log(1e9), n))
+
+def test_quantiles_within_relative_error():
+    keys, prices = spread_prices()
+    sketch = QuantileSketch.from_values(keys, prices, relative_error=0.005)
+    
+    for q in (0.025, 0.5, 0.975):
+        expected = pd.Series(prices).groupby(keys['group']).quantile(q)
+        error = sketch.quantile(q).to_numpy() / expected.to_numpy() - 1
+        assert np.abs(error).max() <= 0.005
+
+def test_max_buckets_collapses_lowest_buckets():
+    keys, prices = spread_prices()
+    sketch = QuantileSketch.from_values(keys, prices, relative_error=0.005, max_buckets=100)
+    
+    assert sketch.counts.groupby('group').size().max() == 100
+    assert (sketch.count() == keys.groupby('group').size()).all()
+    
+    # Quantiles above the collapsed buckets keep the relative error
+    expected = pd.Series(prices).groupby(keys['group']).quantile(0.99)
+    assert np.abs(sketch.quantile(0.99).to_numpy() / expected.to_numpy() - 1).max() <= 0.005
+
+def test_merge_equals_sketch_of_all_values():
+    keys, prices = spread_prices()
+    whole = QuantileSketch.from_values(keys, prices, max_buckets=100)
+    parts = [QuantileSketch.from_values(keys.iloc[i:i + 1000].reset_index(drop=True), prices[i:i + 1000],
+                                        max_buckets=100)
+             for i in range(0, len(prices), 1000)]
+    merged = QuantileSketch.merge_all(parts)
+    
+    assert (merged.count() == whole.count()).all()
+    pd.testing.assert_series_equal(merged.quantile(0.99), whole.quantile(0.99))
@@ -0,0 +1,61 @@
+"""
+Streaming regression test: the two-pass out-of-core components against the
+in-memory stages on the same file
+- Small batches spill more suburb partitions than the open-file limit allows
+  open at once (lowered for the test where the platform has one)
+"""
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+import pytest
+
+from mlaps.metrics import calculate_lml_v2, calculate_momentum_v2
+from mlaps.panel import build_quarterly_panel
+from mlaps.streaming import stream_components
+
+def write_sales(path, seed=0, n_suburbs=400, per_suburb=20):
+    """Seeded sales in file order, distinct dates per suburb so MOM windows have no ties"""
+    rng = np.random.default_rng(seed)
+    n = n_suburbs * per_suburb
+    suburb = np.array([f'SUBURB {i:04d}' for i in range(n_suburbs)]).repeat(per_suburb)
+    days = rng.permutation(365 * 6)[:per_suburb]
+    dat = pd.Timestamp('2018-01-01') + pd.to_timedelta(np.tile(days, n_suburbs), unit='D')
+    price = np.exp(13.5 + 0.25 * rng.standard_normal(n))
+    order = rng.permutation(n)
+    sales = pd.DataFrame({'suburb': suburb[order], 'dat': dat[order], 'price': price[order]})
+    pq.write_table(pa.Table.from_pandas(sales, preserve_index=False), path, row_group_size=1000)
+    return sales
+
+@pytest.fixture
+def file_limit():
+    """Soft open-file limit of 256 for the test (no-op without the resource module)"""
+    resource = pytest.importorskip('resource')
+    soft, hard = resource.getrlimit(resource.RLIMIT_NOFILE)
+    resource.setrlimit(resource.RLIMIT_NOFILE, (min(256, soft), hard))
+    yield
+    resource.setrlimit(resource.RLIMIT_NOFILE, (soft, hard))
+
+def test_stream_components_match_in_memory_stages(tmp_path, file_limit):
+    path = tmp_path / 'transactions.parquet'
+    sales = write_sales(path)
+    stock = pd.DataFrame({'suburb': sales['suburb'].unique()[::2], 'dwelling_stock': 500})
+    
+    components, summary = stream_components(path, stock, batch_rows=20)
+    assert summary['transactions'] == len(sales)
+    
+    sales = sales.sort_values('dat', kind='stable')
+    expected = {'lml': calculate_lml_v2(sales, stock),
+                'mom': calculate_momentum_v2(sales),
+                'panel': build_quarterly_panel(sales)}
+    for name, frame in expected.items():
+        frame = frame.sort_values([c for c in ('suburb', 'year_quarter') if c in frame]).reset_index(drop=True)
+        pd.testing.assert_frame_equal(components[name].reset_index(drop=True), frame,
+                                      check_categorical=False, check_dtype=False, rtol=1e-12)
+
+def test_stream_components_without_matching_transactions(tmp_path):
+    path = tmp_path / 'transactions.parquet'
+    write_sales(path, n_suburbs=5)
+    with pytest.raises(ValueError, match='match start=2099-01-01'):
+        stream_components(path, pd.DataFrame({'suburb': [], 'dwelling_stock': []}), start='2099-01-01')